@@ -0,0 +1,12 @@
+import logging
+import os
+import sys
+
+from aiohttp import web
+
+from broker.brokerapi.async_broker_api import create_app
+
+if __name__ == '__main__':
+    logging.basicConfig(stream=sys.stdout, level=logging.INFO)
+
+    web.run_app(create_app(), host='0.0.0.0', port=int(os.environ.get('ASYNC_BROKER_PORT', 5001)))
@@ -0,0 +1,118 @@
+"""
+Compares the throughput of cold submission summaries on the threaded summary service, with the ingest client, against
+the asyncio summary service, with the non-blocking client, both fetching from a stand-in ingest API that answers each
+request after a fixed latency.
+
+The threaded path summarises as many submissions at once as it has workers, as a threaded server would with one
+request per thread. The async path summarises every requested submission at once on one thread.
+
+    python -m benchmarks.async_summary_benchmark --submissions 200 --entities 500 --latency 0.05 --threads 16
+"""
+import argparse
+import asyncio
+import threading
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+
+import aiohttp
+from aiohttp import web
+
+from benchmarks.stand_in_ingest_api import generate_project
+from broker.service.async_ingest_api import AsyncIngestApi
+from broker.service.async_summary_service import AsyncSummaryService
+from broker.service.summary_service import SummaryService
+
+
+def serve_in_background(stand_in) -> str:
+    """
+    :return: the URL of the stand-in ingest API, served from its own event loop on a daemon thread
+    """
+    loop = asyncio.new_event_loop()
+    started = threading.Event()
+    url = []
+
+    async def start():
+        runner = web.AppRunner(stand_in.create_app(), access_log=None)
+        await runner.setup()
+        site = web.TCPSite(runner, '127.0.0.1', 0, backlog=1024)
+        await site.start()
+        (host, port) = runner.addresses[0][:2]
+        url.append('http://{0}:{1}'.format(host, port))
+
+    def run():
+        loop.run_until_complete(start())
+        started.set()
+        loop.run_forever()
+
+    threading.Thread(target=run, daemon=True).start()
+    started.wait()
+    return url[0]
+
+
+def run_threaded(ingest_url, submission_uuids, threads) -> list:
+    from ingest.api.ingestapi import IngestApi
+
+    ingest_api = IngestApi(ingest_url)
+    summary_service = SummaryService(ingest_api)
+
+    def summarise(submission_uuid):
+        submission = ingest_api.getSubmissionByUuid(submission_uuid)
+        return summary_service.encoded_summary_for_submission(submission)
+
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        return list(executor.map(summarise, submission_uuids))
+
+
+async def run_async(ingest_url, submission_uuids, max_connections) -> list:
+    async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=max_connections)) as session:
+        ingest_api = AsyncIngestApi(session, ingest_url)
+        summary_service = AsyncSummaryService(ingest_api)
+
+        async def summarise(submission_uuid):
+            submission = await ingest_api.get_submission_by_uuid(submission_uuid)
+            return await summary_service.encoded_summary_for_submission(submission)
+
+        return await asyncio.gather(*[summarise(submission_uuid) for submission_uuid in submission_uuids])
+
+
+def measure(label, function, submissions):
+    start = time.perf_counter()
+    summaries = function()
+    elapsed = time.perf_counter() - start
+    print('{0:<40} {1:>8.2f}s {2:>10.1f} summaries/s'.format(label, elapsed, submissions / elapsed))
+    return summaries
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark threaded against asyncio submission summaries')
+    parser.add_argument('--submissions', type=int, default=200, help='distinct submissions summarised, all cold')
+    parser.add_argument('--entities', type=int, default=500, help='entities of each type per submission')
+    parser.add_argument('--latency', type=float, default=0.05, help='seconds the stand-in waits per request')
+    parser.add_argument('--threads', type=int, default=16, help='workers of the threaded path')
+    parser.add_argument('--max-connections', type=int, default=1000, help='connections of the async path')
+    args = parser.parse_args()
+
+    stand_in = generate_project(args.submissions, args.entities)
+    stand_in.latency = args.latency
+    ingest_url = serve_in_background(stand_in)
+    submission_uuids = sorted(stand_in.submissions)
+
+    print('{0} submissions of {1} entities per type, {2}s per ingest request'.format(
+        args.submissions, args.entities, args.latency))
+
+    async_summaries = measure('async', lambda: asyncio.run(run_async(ingest_url, submission_uuids,
+                                                                     args.max_connections)), args.submissions)
+
+    try:
+        threaded_summaries = measure('threaded ({0} workers)'.format(args.threads),
+                                     lambda: run_threaded(ingest_url, submission_uuids, args.threads),
+                                     args.submissions)
+    except ImportError:
+        print('threaded: skipped, the ingest client is not installed')
+    else:
+        assert [summary.body for summary in threaded_summaries] == [summary.body for summary in async_summaries]
+
+
+if __name__ == '__main__':
+    main()
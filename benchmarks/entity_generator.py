@@ -0,0 +1,154 @@
+"""
+Generates synthetic ingest entities shaped like the HCA metadata documents of a submission: biomaterials, files,
+protocols, processes and a project, each with the ingest envelope fields and the content the scrape directives read.
+Generation is seeded, so the same arguments always give the same documents.
+"""
+import random
+
+ENTITY_TYPES = ['biomaterials', 'projects', 'processes', 'protocols', 'files']
+SCHEMA_URL = 'https://schema.humancellatlas.org/type/{0}/{1}/{2}'
+INGEST_URL = 'http://localhost:8080'
+
+ORGANS = ['brain', 'heart', 'kidney', 'liver', 'lung', 'pancreas', 'skin', 'spleen', 'bone marrow', 'blood']
+CELL_TYPES = ['neuron', 'astrocyte', 'cardiomyocyte', 'hepatocyte', 'T cell', 'B cell', 'monocyte', 'fibroblast']
+LIBRARY_APPROACHES = ['10X v2 sequencing', 'Smart-seq2', 'Drop-seq', 'inDrop']
+
+# the specific types of each entity type and how often each occurs in a submission
+SPECIFIC_TYPE_WEIGHTS = {
+    'biomaterials': [('donor_organism', 1), ('specimen_from_organism', 2), ('cell_suspension', 6), ('organoid', 0.5),
+                     ('cell_line', 0.5)],
+    'files': [('sequence_file', 9), ('supplementary_file', 0.5), ('analysis_file', 0.5)],
+    'protocols': [('library_preparation_protocol', 2), ('sequencing_protocol', 2), ('dissociation_protocol', 1),
+                  ('collection_protocol', 1), ('enrichment_protocol', 1)],
+    'processes': [('process', 1)],
+    'projects': [('project', 1)]
+}
+
+SCHEMA_TYPES = {'biomaterials': 'biomaterial', 'files': 'file', 'protocols': 'protocol', 'processes': 'process',
+                'projects': 'project'}
+
+
+def _ontology(text, rng):
+    return {'text': text, 'ontology': 'UBERON:{0:07d}'.format(rng.randrange(10 ** 7))}
+
+
+def _biomaterial_content(specific_type, index, rng) -> dict:
+    content = {
+        'biomaterial_core': {
+            'biomaterial_id': '{0}_{1}'.format(specific_type, index),
+            'biomaterial_name': 'Biomaterial {0}'.format(index),
+            'ncbi_taxon_id': [9606]
+        },
+        'genus_species': [{'text': 'Homo sapiens', 'ontology': 'NCBITaxon:9606'}]
+    }
+    if specific_type == 'donor_organism':
+        content['is_living'] = rng.choice(['yes', 'no'])
+        content['sex'] = rng.choice(['female', 'male'])
+        content['organism_age'] = str(rng.randrange(18, 90))
+        content['development_stage'] = {'text': 'adult'}
+    elif specific_type == 'specimen_from_organism':
+        content['organ'] = _ontology(rng.choice(ORGANS), rng)
+        content['organ_part'] = _ontology('{0} part'.format(content['organ']['text']), rng)
+    elif specific_type == 'cell_suspension':
+        content['total_estimated_cells'] = rng.randrange(1000, 20000)
+        content['selected_cell_type'] = [_ontology(rng.choice(CELL_TYPES), rng)]
+    elif specific_type == 'organoid':
+        content['model_for_organ'] = _ontology(rng.choice(ORGANS), rng)
+        content['model_organ_part'] = _ontology('{0} part'.format(content['model_for_organ']['text']), rng)
+    return content
+
+
+def _file_content(specific_type, index, rng) -> dict:
+    content = {
+        'file_core': {
+            'file_name': '{0}_{1}.fastq.gz'.format(specific_type, index),
+            'file_format': 'fastq.gz' if specific_type == 'sequence_file' else 'txt'
+        }
+    }
+    if specific_type == 'sequence_file':
+        content['read_index'] = rng.choice(['read1', 'read2', 'index1'])
+        content['lane_index'] = rng.randrange(1, 9)
+        content['read_length'] = rng.choice([26, 98, 150])
+    return content
+
+
+def _protocol_content(specific_type, index, rng) -> dict:
+    content = {
+        'protocol_core': {
+            'protocol_id': '{0}_{1}'.format(specific_type, index),
+            'protocol_name': 'Protocol {0}'.format(index)
+        }
+    }
+    if specific_type == 'library_preparation_protocol':
+        content['library_construction_approach'] = _ontology(rng.choice(LIBRARY_APPROACHES), rng)
+        content['nucleic_acid_source'] = 'single cell'
+    elif specific_type == 'sequencing_protocol':
+        content['instrument_manufacturer_model'] = {'text': 'Illumina HiSeq 4000'}
+        content['paired_end'] = True
+    return content
+
+
+def _process_content(specific_type, index, rng) -> dict:
+    return {'process_core': {'process_id': 'process_{0}'.format(index)}}
+
+
+def _project_content(specific_type, index, rng) -> dict:
+    return {
+        'project_core': {
+            'project_short_name': 'project_{0}'.format(index),
+            'project_title': 'A single cell atlas of the human {0}'.format(rng.choice(ORGANS)),
+            'project_description': 'Synthetic project description. ' * 20
+        },
+        'contributors': [{'contact_name': 'Contributor {0}'.format(contributor),
+                          'email': 'contributor{0}@example.org'.format(contributor),
+                          'institution': 'Example Institute'} for contributor in range(rng.randrange(2, 8))]
+    }
+
+
+CONTENT_GENERATORS = {'biomaterials': _biomaterial_content, 'files': _file_content, 'protocols': _protocol_content,
+                      'processes': _process_content, 'projects': _project_content}
+
+
+def generate_entities(entity_type, count, seed=0) -> list:
+    """
+    :param entity_type: the entity type in a submission, e.g biomaterials
+    :param count: number of entities; a submission only ever has one project
+    :param seed: seeds the choice of specific types and content values
+    :return: the entity documents, as the ingest API returns them
+    """
+    rng = random.Random('{0}-{1}'.format(entity_type, seed))
+    (specific_types, weights) = zip(*SPECIFIC_TYPE_WEIGHTS[entity_type])
+    schema_type = SCHEMA_TYPES[entity_type]
+
+    entities = []
+    for index in range(min(count, 1) if entity_type == 'projects' else count):
+        specific_type = rng.choices(specific_types, weights)[0]
+        content = CONTENT_GENERATORS[entity_type](specific_type, index, rng)
+        content['describedBy'] = SCHEMA_URL.format(schema_type, '5.1.0', specific_type)
+        content['schema_type'] = schema_type
+
+        entity_uuid = '{0:08x}-0000-4000-8000-{1:012x}'.format(seed, len(entities))
+        entities.append({
+            'content': content,
+            'uuid': {'uuid': entity_uuid},
+            'submissionDate': '2018-07-18T10:00:00.000Z',
+            'updateDate': '2018-07-19T13:55:13.392Z',
+            'validationState': 'Valid',
+            '_links': {'self': {'href': '{0}/{1}/{2}'.format(INGEST_URL, entity_type, entity_uuid)}}
+        })
+    return entities
+
+
+def generate_submission(entity_count, seed=0) -> dict:
+    """
+    :param entity_count: total number of entities, split between the entity types as in a typical submission
+    :param seed: seeds the generated documents
+    :return: the entities of a submission by entity type
+    """
+    return {
+        'biomaterials': generate_entities('biomaterials', entity_count * 4 // 10, seed),
+        'files': generate_entities('files', entity_count * 4 // 10, seed),
+        'protocols': generate_entities('protocols', entity_count // 10, seed),
+        'processes': generate_entities('processes', entity_count // 10, seed),
+        'projects': generate_entities('projects', 1, seed)
+    }
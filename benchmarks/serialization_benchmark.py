@@ -0,0 +1,77 @@
+"""
+Compares encoding summaries with jsonpickle against the explicit JSON encoder, and against serving the bytes cached
+with a summary.
+
+    python -m benchmarks.serialization_benchmark --submissions 500 --specific-types 40
+"""
+import argparse
+import timeit
+
+import jsonpickle
+
+from broker.common.project_summary import ProjectSummary
+from broker.common.submission_summary import SubmissionSummary
+from broker.common.util.json_summary_util import JSONSummaryUtil
+from broker.service.submission_summary_cache import SubmissionSummaryCache
+
+
+def build_submission_summary(index, specific_types) -> SubmissionSummary:
+    submission_summary = SubmissionSummary()
+    for entity_summary in (submission_summary.biomaterial_summary, submission_summary.protocol_summary,
+                           submission_summary.process_summary, submission_summary.file_summary):
+        for type_index in range(specific_types):
+            entity_summary.add_entity('specific_type_{0}'.format(type_index), index + type_index + 1)
+
+    submission_summary.scrape_result = {
+        'project_title': ['Project {0}'.format(index)],
+        'organ': ['organ_{0}'.format(organ_index) for organ_index in range(specific_types)],
+        'total_cell_count': 1000 * index
+    }
+    submission_summary.submission_status = 'Valid'
+    submission_summary.create_date = '2018-05-01T10:00:00Z'
+    submission_summary.last_updated_date = '2018-05-02T10:00:00Z'
+    return submission_summary
+
+
+def measure(label, function, repeat):
+    seconds = min(timeit.repeat(function, number=repeat, repeat=3)) / repeat
+    print('{0:<40} {1:>10.1f} us'.format(label, seconds * 1e6))
+    return seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark summary serialization')
+    parser.add_argument('--submissions', type=int, default=500, help='submissions in the project')
+    parser.add_argument('--specific-types', type=int, default=40, help='specific types per entity type')
+    parser.add_argument('--repeat', type=int, default=200, help='encodings per measurement')
+    args = parser.parse_args()
+
+    submission_summaries = [build_submission_summary(index, args.specific_types) for index in range(args.submissions)]
+    project_summary = ProjectSummary()
+    for submission_summary in submission_summaries:
+        project_summary.addSubmissionSummary(submission_summary)
+
+    submission_summary = submission_summaries[-1]
+    assert JSONSummaryUtil.encode(submission_summary) == \
+        jsonpickle.encode(submission_summary, unpicklable=False).encode('utf-8')
+
+    cache = SubmissionSummaryCache()
+    cache.insert('submission-uuid', submission_summary)
+    cache.encoded('submission-uuid', submission_summary, JSONSummaryUtil.encode)
+
+    print('Submission summary')
+    pickled = measure('jsonpickle', lambda: jsonpickle.encode(submission_summary, unpicklable=False), args.repeat)
+    explicit = measure('JSONSummaryUtil', lambda: JSONSummaryUtil.encode(submission_summary), args.repeat)
+    cached = measure('cached bytes',
+                     lambda: cache.encoded('submission-uuid', submission_summary, JSONSummaryUtil.encode),
+                     args.repeat)
+    print('speedup: {0:.1f}x encoding, {1:.0f}x cached'.format(pickled / explicit, pickled / cached))
+
+    print('Project summary of {0} submissions'.format(args.submissions))
+    pickled = measure('jsonpickle', lambda: jsonpickle.encode(project_summary, unpicklable=False), args.repeat)
+    explicit = measure('JSONSummaryUtil', lambda: JSONSummaryUtil.encode(project_summary), args.repeat)
+    print('speedup: {0:.1f}x encoding'.format(pickled / explicit))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,163 @@
+"""
+A stand-in for the read-only parts of the ingest API that the summary endpoints use, serving synthetic submissions
+with HAL links and paging like the real API, after an optional artificial latency per request.
+
+    python -m benchmarks.stand_in_ingest_api --port 8080 --submissions 10 --entities 2000 --latency 0.05
+"""
+import argparse
+import asyncio
+
+from aiohttp import web
+
+from benchmarks.entity_generator import ENTITY_TYPES, generate_entities
+
+
+class StandInIngestApi:
+    """
+    Serves submissions, given as {submission uuid: {entity type: [entities]}}, and projects, given as
+    {project uuid: [submission uuids]}. Submission ids in URLs are their uuids
+    """
+
+    def __init__(self, submissions: dict, projects=None, latency=None, update_date=None):
+        """
+        :param submissions: the entities of each submission by entity type
+        :param projects: the submissions of each project
+        :param latency: seconds each request waits before being answered
+        :param update_date: the update date of every submission
+        """
+        self.submissions = submissions
+        self.projects = projects if projects else dict()
+        self.latency = 0 if not latency else latency
+        self.update_date = '2018-07-19T13:55:13.392Z' if not update_date else update_date
+        self.requests = 0
+
+    def create_app(self) -> web.Application:
+        app = web.Application(middlewares=[self._delay])
+        app.add_routes([
+            web.get('/', self.root),
+            web.get('/submissionEnvelopes/search', self.submission_search),
+            web.get('/submissionEnvelopes/search/findByUuid', self.find_submission),
+            web.get('/submissionEnvelopes/{submission_id}', self.get_submission),
+            web.get('/submissionEnvelopes/{submission_id}/{entity_type}', self.get_submission_entities),
+            web.get('/projects/search/findByUuid', self.find_project),
+            web.get('/projects/{project_uuid}/submissionEnvelopes', self.get_project_submissions)
+        ])
+        return app
+
+    @web.middleware
+    async def _delay(self, request, handler):
+        self.requests += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return await handler(request)
+
+    @staticmethod
+    def _base_url(request) -> str:
+        return str(request.url.origin())
+
+    def _submission_envelope(self, request, submission_uuid) -> dict:
+        submission_url = '{0}/submissionEnvelopes/{1}'.format(self._base_url(request), submission_uuid)
+        links = {entity_type: {'href': '{0}/{1}'.format(submission_url, entity_type)} for entity_type in ENTITY_TYPES}
+        links['self'] = {'href': submission_url}
+        return {
+            'uuid': {'uuid': submission_uuid},
+            'submissionState': 'Valid',
+            'submissionDate': '2018-07-18T10:00:00.000Z',
+            'updateDate': self.update_date,
+            '_links': links
+        }
+
+    async def root(self, request):
+        base_url = self._base_url(request)
+        return web.json_response({'_links': {
+            'submissionEnvelopes': {'href': base_url + '/submissionEnvelopes'},
+            'projects': {'href': base_url + '/projects'}
+        }})
+
+    async def submission_search(self, request):
+        find_url = '{0}/submissionEnvelopes/search/findByUuid{{?uuid}}'.format(self._base_url(request))
+        return web.json_response({'_links': {'findByUuid': {'href': find_url, 'templated': True}}})
+
+    async def find_submission(self, request):
+        return self._submission_response(request, request.query.get('uuid'))
+
+    async def get_submission(self, request):
+        return self._submission_response(request, request.match_info['submission_id'])
+
+    def _submission_response(self, request, submission_uuid):
+        if submission_uuid not in self.submissions:
+            raise web.HTTPNotFound()
+        return web.json_response(self._submission_envelope(request, submission_uuid))
+
+    async def get_submission_entities(self, request):
+        submission_uuid = request.match_info['submission_id']
+        entity_type = request.match_info['entity_type']
+        if submission_uuid not in self.submissions or entity_type not in ENTITY_TYPES:
+            raise web.HTTPNotFound()
+
+        return self._page(request, entity_type, self.submissions[submission_uuid].get(entity_type, []))
+
+    async def find_project(self, request):
+        project_uuid = request.query.get('uuid')
+        if project_uuid not in self.projects:
+            raise web.HTTPNotFound()
+
+        submissions_url = '{0}/projects/{1}/submissionEnvelopes'.format(self._base_url(request), project_uuid)
+        return web.json_response({
+            'uuid': {'uuid': project_uuid},
+            '_links': {'submissionEnvelopes': {'href': submissions_url}}
+        })
+
+    async def get_project_submissions(self, request):
+        project_uuid = request.match_info['project_uuid']
+        if project_uuid not in self.projects:
+            raise web.HTTPNotFound()
+
+        envelopes = [self._submission_envelope(request, submission_uuid)
+                     for submission_uuid in self.projects[project_uuid]]
+        return self._page(request, 'submissionEnvelopes', envelopes)
+
+    @staticmethod
+    def _page(request, entity_type, entities):
+        page = int(request.query.get('page', 0))
+        size = int(request.query.get('size', 20))
+        page_entities = entities[page * size:(page + 1) * size]
+
+        links = {'self': {'href': str(request.url)}}
+        if (page + 1) * size < len(entities):
+            links['next'] = {'href': str(request.url.update_query(page=page + 1, size=size))}
+
+        return web.json_response({
+            '_embedded': {entity_type: page_entities},
+            '_links': links,
+            'page': {'size': size, 'number': page, 'totalElements': len(entities)}
+        })
+
+
+def generate_project(submissions, entities) -> StandInIngestApi:
+    """
+    :param submissions: number of submissions in the project, whose uuid is project-uuid
+    :param entities: number of entities of each type in each submission
+    :return: a stand-in ingest API serving the project
+    """
+    submission_entities = {entity_type: generate_entities(entity_type, entities) for entity_type in ENTITY_TYPES}
+    submission_uuids = ['submission-{0}'.format(index) for index in range(submissions)]
+    return StandInIngestApi({submission_uuid: submission_entities for submission_uuid in submission_uuids},
+                            {'project-uuid': submission_uuids})
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve a stand-in ingest API')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--submissions', type=int, default=10, help='submissions in the project project-uuid')
+    parser.add_argument('--entities', type=int, default=1000, help='entities of each type per submission')
+    parser.add_argument('--latency', type=float, default=0, help='seconds each request waits to be answered')
+    args = parser.parse_args()
+
+    stand_in = generate_project(args.submissions, args.entities)
+    stand_in.latency = args.latency
+    web.run_app(stand_in.create_app(), port=args.port)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,210 @@
+"""
+Microbenchmarks of the summary and scrape hot paths, run offline over synthetic submissions of 1k, 10k and 100k
+entities. Each stage is timed, then run once more under tracemalloc for its peak memory. Results can be saved as a
+baseline, and later runs compared against it, so that a regression shows up in review.
+
+Project stages combine one submission summary per 100 entities of the scale, each of a 100-entity submission.
+
+    python -m benchmarks.summary_benchmark
+    python -m benchmarks.summary_benchmark --scales 1000 10000 --compare
+    python -m benchmarks.summary_benchmark --save-baseline
+"""
+import argparse
+import json
+import operator
+import os
+import platform
+import sys
+import timeit
+import tracemalloc
+import warnings
+
+from functools import reduce
+
+import jsonpickle
+
+from broker.common.entity_summary import EntitySummary
+from broker.common.project_summary import ProjectSummary
+from broker.common.util.json_summary_util import JSONSummaryUtil
+from broker.service.summary_service import SummaryService, SubmissionEntities, SubmissionScraper, \
+    SubmissionSummaryBuilder, SCRAPE_CONFIG_PATH
+from benchmarks.entity_generator import ENTITY_TYPES, generate_submission
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), 'baselines', 'summary_benchmark.json')
+DEFAULT_SCALES = [1000, 10000, 100000]
+# timings vary between runs on a busy machine far more than peak allocations do
+DEFAULT_TIME_TOLERANCE = 0.5
+DEFAULT_MEMORY_TOLERANCE = 0.1
+ENTITIES_PER_SUBMISSION = 100
+
+
+class Fixture:
+    """
+    The synthetic inputs of every stage at one scale, generated before anything is measured
+    """
+
+    def __init__(self, scale):
+        self.submission = generate_submission(scale)
+        self.submission_entities = SubmissionEntities(**self.submission)
+        self.scraper = SubmissionScraper.from_file(SCRAPE_CONFIG_PATH)
+
+        self.submission_summaries = [build_submission_summary(generate_submission(ENTITIES_PER_SUBMISSION, seed),
+                                                              self.scraper)
+                                     for seed in range(max(scale // ENTITIES_PER_SUBMISSION, 1))]
+        self.biomaterial_summaries = [submission_summary.biomaterial_summary
+                                      for submission_summary in self.submission_summaries]
+        self.submission_summary = build_submission_summary(self.submission, self.scraper)
+        self.project_summary = add_submission_summaries(self.submission_summaries)
+
+
+def build_submission_summary(submission, scraper):
+    summary_builder = SubmissionSummaryBuilder(scraper)
+    for entity_type in ENTITY_TYPES:
+        summary_builder.add_entities(entity_type, submission[entity_type])
+    return summary_builder.build()
+
+
+def add_submission_summaries(submission_summaries) -> ProjectSummary:
+    project_summary = ProjectSummary()
+    for submission_summary in submission_summaries:
+        project_summary.addSubmissionSummary(submission_summary)
+    return project_summary
+
+
+# each stage gives the function to measure over a fixture
+STAGES = [
+    ('generate_summary_for_entity',
+     lambda fixture: lambda: [SummaryService.generate_summary_for_entity(fixture.submission[entity_type])
+                              for entity_type in ENTITY_TYPES]),
+    ('SubmissionScraper.scrape', lambda fixture: lambda: fixture.scraper.scrape(fixture.submission_entities)),
+    ('SubmissionSummaryBuilder', lambda fixture: lambda: build_submission_summary(fixture.submission, fixture.scraper)),
+    ('EntitySummary.__add__', lambda fixture: lambda: reduce(operator.add, fixture.biomaterial_summaries)),
+    ('EntitySummary.merge', lambda fixture: lambda: EntitySummary.merge(fixture.biomaterial_summaries)),
+    ('ProjectSummary.addSubmissionSummary',
+     lambda fixture: lambda: add_submission_summaries(fixture.submission_summaries)),
+    ('jsonpickle submission summary',
+     lambda fixture: lambda: jsonpickle.encode(fixture.submission_summary, unpicklable=False)),
+    ('JSONSummaryUtil submission summary', lambda fixture: lambda: JSONSummaryUtil.encode(fixture.submission_summary)),
+    ('jsonpickle project summary',
+     lambda fixture: lambda: jsonpickle.encode(fixture.project_summary, unpicklable=False)),
+    ('JSONSummaryUtil project summary', lambda fixture: lambda: JSONSummaryUtil.encode(fixture.project_summary))
+]
+
+
+def check_fixture(fixture: Fixture):
+    # the stages being compared must agree, or the comparison means nothing
+    scrape_result = fixture.scraper.scrape(fixture.submission_entities)
+    assert scrape_result == fixture.submission_summary.scrape_result
+    for entity_type in ENTITY_TYPES:
+        entity_summary = SummaryService.generate_summary_for_entity(fixture.submission[entity_type])
+        assert entity_summary.to_dict() == getattr(fixture.submission_summary,
+                                                   SubmissionSummaryBuilder.SUMMARY_ATTRIBUTES[entity_type]).to_dict()
+
+    assert reduce(operator.add, fixture.biomaterial_summaries).to_dict() == \
+        EntitySummary.merge(fixture.biomaterial_summaries).to_dict()
+    assert JSONSummaryUtil.encode(fixture.project_summary) == \
+        jsonpickle.encode(fixture.project_summary, unpicklable=False).encode('utf-8')
+
+
+def measure(function, repeat) -> dict:
+    """
+    :param function: the stage to measure
+    :param repeat: number of timings, of which the fastest is kept
+    :return: the seconds the stage takes, and the peak bytes allocated while it runs
+    """
+    timer = timeit.Timer(function)
+    (number, _) = timer.autorange()
+    seconds = min(timer.repeat(repeat, number)) / number
+
+    tracemalloc.start()
+    try:
+        function()
+        (_, peak_bytes) = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {'seconds': seconds, 'peak_bytes': peak_bytes}
+
+
+def run(scales, repeat) -> dict:
+    results = dict()
+    for scale in scales:
+        print('{0} entities, {1} submission summaries per project'
+              .format(scale, max(scale // ENTITIES_PER_SUBMISSION, 1)))
+        fixture = Fixture(scale)
+        check_fixture(fixture)
+
+        results[str(scale)] = dict()
+        for (stage, stage_function) in STAGES:
+            result = measure(stage_function(fixture), repeat)
+            results[str(scale)][stage] = result
+            print('  {0:<38} {1:>12.1f} us {2:>12.1f} KiB'.format(stage, result['seconds'] * 1e6,
+                                                                  result['peak_bytes'] / 1024))
+    return results
+
+
+def compare(results, baseline, time_tolerance, memory_tolerance) -> list:
+    """
+    :param results: results of this run, by scale and stage
+    :param baseline: saved results to compare against
+    :param time_tolerance: how much slower a stage may be before it counts as a regression, e.g 0.5 for 50%
+    :param memory_tolerance: how much larger a stage's peak memory may be before it counts as a regression
+    :return: a description of each regression
+    """
+    regressions = []
+    print('Compared to the baseline from Python {0} on {1}'.format(baseline.get('python'), baseline.get('machine')))
+    for (scale, stages) in results.items():
+        for (stage, result) in stages.items():
+            baseline_result = baseline['results'].get(scale, {}).get(stage)
+            if not baseline_result:
+                continue
+
+            time_ratio = result['seconds'] / baseline_result['seconds']
+            memory_ratio = result['peak_bytes'] / max(baseline_result['peak_bytes'], 1)
+            regressed = time_ratio > 1 + time_tolerance or memory_ratio > 1 + memory_tolerance
+            print('  {0:>6} {1:<38} {2:>6.2f}x time {3:>6.2f}x memory{4}'
+                  .format(scale, stage, time_ratio, memory_ratio, '  REGRESSION' if regressed else ''))
+            if regressed:
+                regressions.append('{0} at {1} entities: {2:.2f}x time, {3:.2f}x peak memory'
+                                   .format(stage, scale, time_ratio, memory_ratio))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the summary and scrape hot paths over synthetic '
+                                                 'submissions, without an ingest API')
+    parser.add_argument('--scales', type=int, nargs='+', default=DEFAULT_SCALES, help='entities per submission')
+    parser.add_argument('--repeat', type=int, default=5, help='timings per stage, of which the fastest is kept')
+    parser.add_argument('--baseline', default=BASELINE_PATH, help='baseline file to save or compare against')
+    parser.add_argument('--save-baseline', action='store_true', help='save the results as the baseline')
+    parser.add_argument('--compare', action='store_true', help='compare the results against the baseline, exiting '
+                                                               'with 1 if any stage regressed')
+    parser.add_argument('--time-tolerance', type=float, default=DEFAULT_TIME_TOLERANCE,
+                        help='slowdown allowed before a stage counts as a regression, e.g 0.5 for 50%%')
+    parser.add_argument('--memory-tolerance', type=float, default=DEFAULT_MEMORY_TOLERANCE,
+                        help='growth in peak memory allowed before a stage counts as a regression')
+    args = parser.parse_args()
+
+    # jsonpickle warns on every encode that its defaults will change
+    warnings.simplefilter('ignore', DeprecationWarning)
+    results = run(args.scales, args.repeat)
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(os.path.abspath(args.baseline)), exist_ok=True)
+        with open(args.baseline, 'w') as baseline_file:
+            json.dump({'python': platform.python_version(), 'machine': platform.machine(), 'results': results},
+                      baseline_file, indent=2, sort_keys=True)
+            baseline_file.write('\n')
+        print('Saved the baseline to {0}'.format(args.baseline))
+
+    if args.compare:
+        with open(args.baseline) as baseline_file:
+            regressions = compare(results, json.load(baseline_file), args.time_tolerance,
+                                  args.memory_tolerance)
+        for regression in regressions:
+            print('Regression: {0}'.format(regression), file=sys.stderr)
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
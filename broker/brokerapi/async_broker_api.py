@@ -0,0 +1,162 @@
+import asyncio
+import os
+import logging
+
+import aiohttp
+from aiohttp import web
+
+from broker.common.util.date_util import DateUtil
+from broker.service.async_ingest_api import AsyncIngestApi
+from broker.service.async_summary_service import AsyncSummaryService, DEFAULT_ASYNC_PROJECT_CONCURRENCY
+from broker.service.submission_summary_cache import SubmissionSummaryCache
+from broker.service.submission_summary_store import SubmissionSummaryStore
+from broker.service.submission_watcher import AsyncSubmissionWatcherHub
+
+# max connections open to the ingest API at once; requests beyond it wait for a connection without holding a thread
+INGEST_MAX_CONNECTIONS = int(os.environ.get('INGEST_MAX_CONNECTIONS', 1000))
+# as for the Flask app, though more submissions of a project are summarised at once by default, as they hold no thread
+PROJECT_SUMMARY_CONCURRENCY = int(os.environ.get('PROJECT_SUMMARY_CONCURRENCY', DEFAULT_ASYNC_PROJECT_CONCURRENCY))
+PROJECT_SUMMARY_SUBMISSION_TIMEOUT = float(os.environ.get('PROJECT_SUMMARY_SUBMISSION_TIMEOUT', 30))
+# an open event stream holds no thread, so many more can be served at once than by the Flask app; each still ends after
+# SUBMISSION_EVENTS_MAX_AGE seconds, and the page reopens it, so that streams spread across servers
+SUBMISSION_EVENTS_MAX_STREAMS = int(os.environ.get('ASYNC_SUBMISSION_EVENTS_MAX_STREAMS', 10000))
+SUBMISSION_EVENTS_MAX_AGE = int(os.environ.get('SUBMISSION_EVENTS_MAX_AGE', 60 * 10))
+SUBMISSION_EVENTS_KEEP_ALIVE = 15  # seconds
+
+logger = logging.getLogger(__name__)
+
+ingest_api_key = web.AppKey('ingest_api', AsyncIngestApi)
+summary_service_key = web.AppKey('summary_service', AsyncSummaryService)
+ingest_session_key = web.AppKey('ingest_session', aiohttp.ClientSession)
+submission_watchers_key = web.AppKey('submission_watchers', AsyncSubmissionWatcherHub)
+
+routes = web.RouteTableDef()
+
+
+@routes.get('/submissions/{submission_uuid}/summary')
+async def submission_summary(request):
+    submission = await request.app[ingest_api_key].get_submission_by_uuid(request.match_info['submission_uuid'])
+    # looked up even for a conditional request, as a 304 carries the summary's entity tag; the summary of an unchanged
+    # submission is usually cached, along with its encoding
+    encoded_summary = await request.app[summary_service_key].encoded_summary_for_submission(submission)
+
+    return _conditional_summary_response(request, encoded_summary)
+
+
+@routes.get('/projects/{project_uuid}/summary')
+async def project_summary(request):
+    project = await request.app[ingest_api_key].get_project_by_uuid(request.match_info['project_uuid'])
+    encoded_summary = await request.app[summary_service_key].encoded_summary_for_project(project)
+
+    return _conditional_summary_response(request, encoded_summary)
+
+
+@routes.get('/submissions/{submission_id}/events')
+async def submission_events(request):
+    submission_watchers = request.app[submission_watchers_key]
+    # the submission pages are served by the Flask app, on another origin
+    headers = {'Access-Control-Allow-Origin': '*'}
+    if submission_watchers.subscriber_count() >= SUBMISSION_EVENTS_MAX_STREAMS:
+        # no content tells the page not to reconnect, so that it polls until it tries again later
+        return web.Response(status=204, headers=headers)
+
+    response = web.StreamResponse(headers=dict(headers, **{'Content-Type': 'text/event-stream',
+                                                           'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}))
+    subscription = submission_watchers.subscribe(request.match_info['submission_id'])
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + SUBMISSION_EVENTS_MAX_AGE
+    try:
+        await response.prepare(request)
+        await response.write('retry: {0}\n\n'.format(submission_watchers.poll_interval * 1000).encode('utf-8'))
+        while True:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                # the page opens a new stream
+                await response.write(b'event: end\ndata: {}\n\n')
+                break
+
+            event = await subscription.next_event(timeout=min(SUBMISSION_EVENTS_KEEP_ALIVE, remaining))
+            if subscription.closed:
+                break
+            # comments keep the connection open, and find out when the page has gone
+            await response.write((event.to_sse() if event else ': keep-alive\n\n').encode('utf-8'))
+    except ConnectionResetError:
+        pass
+    finally:
+        submission_watchers.unsubscribe(subscription)
+
+    return response
+
+
+@routes.get('/summaries/cache')
+async def summary_cache_stats(request):
+    return web.json_response(request.app[summary_service_key].submission_summary_cache.stats())
+
+
+def _conditional_summary_response(request, encoded_summary):
+    if request.if_none_match:
+        if any(etag.value in (encoded_summary.etag, '*') for etag in request.if_none_match):
+            return _not_modified(encoded_summary)
+    elif encoded_summary.last_modified and request.if_modified_since:
+        last_modified = DateUtil.parse_ingest_date(encoded_summary.last_modified)
+        if last_modified.replace(microsecond=0) <= DateUtil.to_naive_utc(request.if_modified_since):
+            return _not_modified(encoded_summary)
+
+    response = web.Response(body=encoded_summary.body, content_type='application/json')
+    _set_validators(response, encoded_summary)
+    return response
+
+
+def _not_modified(encoded_summary):
+    response = web.Response(status=304)
+    _set_validators(response, encoded_summary)
+    return response
+
+
+def _set_validators(response, encoded_summary):
+    response.etag = encoded_summary.etag
+    if encoded_summary.last_modified:
+        response.last_modified = DateUtil.parse_ingest_date(encoded_summary.last_modified)
+
+
+def _submission_summary_cache() -> SubmissionSummaryCache:
+    # configured as for the Flask app, so both can share a summary store
+    summary_store_path = os.environ.get('SUMMARY_STORE_PATH')
+    return SubmissionSummaryCache(store=SubmissionSummaryStore(summary_store_path) if summary_store_path else None,
+                                  stale_grace=int(os.environ.get('SUMMARY_STALE_GRACE', 60 * 5)))
+
+
+def create_app(ingest_url=None, submission_summary_cache=None, max_connections=None) -> web.Application:
+    """
+    :param ingest_url: root URL of the ingest API, defaults to the INGEST_API environment variable
+    :param submission_summary_cache: cache of computed submission summaries
+    :param max_connections: max connections open to the ingest API at once
+    :return: an aiohttp application serving the summary endpoints and submission event streams
+    """
+    app = web.Application()
+    app.add_routes(routes)
+
+    async def start_ingest_client(app):
+        connector = aiohttp.TCPConnector(limit=INGEST_MAX_CONNECTIONS if not max_connections else max_connections)
+        app[ingest_session_key] = aiohttp.ClientSession(connector=connector, raise_for_status=False)
+        app[ingest_api_key] = AsyncIngestApi(app[ingest_session_key], ingest_url)
+        app[summary_service_key] = AsyncSummaryService(app[ingest_api_key], submission_summary_cache
+                                                       if submission_summary_cache else _submission_summary_cache(),
+                                                       project_concurrency=PROJECT_SUMMARY_CONCURRENCY,
+                                                       submission_timeout=PROJECT_SUMMARY_SUBMISSION_TIMEOUT)
+        # each watched submission is polled once every SUBMISSION_POLL_INTERVAL seconds, however many pages watch it
+        app[submission_watchers_key] = AsyncSubmissionWatcherHub(
+            app[ingest_api_key].get_submission, app[ingest_api_key].get_submission_files,
+            poll_interval=int(os.environ.get('SUBMISSION_POLL_INTERVAL', 5)))
+
+    async def close_event_streams(app):
+        # open event streams would otherwise keep the server waiting on shutdown
+        app[submission_watchers_key].close()
+
+    async def close_ingest_client(app):
+        await app[ingest_session_key].close()
+
+    app.on_startup.append(start_ingest_client)
+    app.on_shutdown.append(close_event_streams)
+    app.on_cleanup.append(close_ingest_client)
+    return app
@@ -4,20 +4,34 @@ from ingest.importer.spreadsheetUploadError import SpreadsheetUploadError
 __author__ = "jupp"
 __license__ = "Apache 2.0"
 
-from flask import Flask, flash, request, render_template, redirect, url_for
+from flask import Flask, Request, flash, request, render_template, redirect, url_for
 from flask_cors import CORS, cross_origin
 from flask import json
-from ingest.api.ingestapi import IngestApi
-from ingest.importer.importer import XlsImporter
-from broker.service.summary_service import SummaryService
+from broker.service.summary_service import SummaryService, DEFAULT_PROJECT_CONCURRENCY
+from broker.service.ingest_client_factory import IngestClientFactory
+from broker.service.submission_watcher import SubmissionWatcherHub
+from broker.service.submission_summary_cache import SubmissionSummaryCache
+from broker.service.submission_summary_store import SubmissionSummaryStore
+from broker.service.single_flight import SingleFlight
+from broker.service.summary_refresher import SummaryRefresher
+from broker.service.batch_summarizer import BatchSummarizer
+from broker.service.spreadsheet_storage import SpreadsheetUpload, RecentUploads, remove_spreadsheet
+from broker.service.import_scheduler import ImportScheduler
+from broker.service.spreadsheet_import import run_import, import_spreadsheet
+from broker.service.import_trace import ImportTrace, ImportTraceHistory
+from broker.service.exception.spreadsheet_too_large_exception import SpreadsheetTooLargeException
+from broker.service.exception.import_queue_full_exception import ImportQueueFullException
+from broker.common.util.date_util import DateUtil
+from broker.common.util.tsv_summary_util import TSVSummaryUtil, SUMMARY_ROW_HEADERS
 
-from werkzeug.utils import secure_filename
 import os
-import tempfile
 import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from expiringdict import ExpiringDict
+from functools import partial
 import logging
 import traceback
-import jsonpickle
 
 STATUS_LABEL = {
     'Valid': 'label-success',
@@ -34,7 +48,33 @@ HTML_HELPER = {
     'default_status_label': DEFAULT_STATUS_LABEL
 }
 
+# uploaded spreadsheets are streamed to SPREADSHEET_UPLOAD_DIR, up to SPREADSHEET_MAX_SIZE bytes
+spreadsheet_upload_dir = os.environ.get('SPREADSHEET_UPLOAD_DIR')
+spreadsheet_max_size = int(os.environ.get('SPREADSHEET_MAX_SIZE', 100 * 1024 * 1024))
+# byte-identical re-uploads within DUPLICATE_UPLOAD_WINDOW seconds are answered with the submission already created
+recent_uploads = RecentUploads(int(os.environ.get('DUPLICATE_UPLOAD_WINDOW', 60 * 5)))
+# at most IMPORT_MAX_WORKERS imports run at once, with up to IMPORT_MAX_QUEUE more waiting; uploads beyond that are
+# turned away with a 503. Set IMPORT_EXECUTOR=process to run imports in worker processes rather than threads
+import_scheduler = ImportScheduler(max_workers=int(os.environ.get('IMPORT_MAX_WORKERS', 2)),
+                                   max_queue=int(os.environ.get('IMPORT_MAX_QUEUE', 20)),
+                                   retry_after=int(os.environ.get('IMPORT_RETRY_AFTER', 30)),
+                                   use_processes=os.environ.get('IMPORT_EXECUTOR', 'thread') == 'process')
+import_traces = ImportTraceHistory()
+
+
+class SpreadsheetUploadRequest(Request):
+    """
+    A request streaming each uploaded file into its own SpreadsheetUpload, rather than buffering it
+    """
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        upload = SpreadsheetUpload(filename, spreadsheet_upload_dir, spreadsheet_max_size)
+        self.__dict__.setdefault('spreadsheet_uploads', []).append(upload)
+        return upload
+
+
 app = Flask(__name__, static_folder='static')
+app.request_class = SpreadsheetUploadRequest
 app.secret_key = 'cells'
 cors = CORS(app)
 app.config['CORS_HEADERS'] = 'Content-Type'
@@ -43,28 +83,93 @@ logger = logging.getLogger(__name__)
 logger.setLevel(logging.DEBUG)
 logging.getLogger("IngestApi").setLevel(logging.DEBUG)
 
+# set SUMMARY_STORE_PATH to persist summaries in a SQLite file shared by the broker processes on a host
+summary_store_path = os.environ.get('SUMMARY_STORE_PATH')
+summary_store = SubmissionSummaryStore(summary_store_path) if summary_store_path else None
+# expired summaries are served as stale for SUMMARY_STALE_GRACE seconds while they are recomputed in the background
+summary_stale_grace = int(os.environ.get('SUMMARY_STALE_GRACE', 60 * 5))
+submission_summary_cache = SubmissionSummaryCache(store=summary_store, stale_grace=summary_stale_grace)
+summary_single_flight = SingleFlight()
+summary_refresher = SummaryRefresher()
+# clients share the Ingest API's root links, discovered on first use rather than when the app is imported
+ingest_clients = IngestClientFactory()
+summary_service = None
+summary_service_lock = threading.Lock()
+# a project is summarised PROJECT_SUMMARY_CONCURRENCY submissions at a time, and a submission taking longer than
+# PROJECT_SUMMARY_SUBMISSION_TIMEOUT seconds is left out of the project's summary, which is marked partial meanwhile
+project_summary_concurrency = int(os.environ.get('PROJECT_SUMMARY_CONCURRENCY', DEFAULT_PROJECT_CONCURRENCY))
+project_summary_submission_timeout = float(os.environ.get('PROJECT_SUMMARY_SUBMISSION_TIMEOUT', 30))
+# the summaries of a batch that aren't cached are computed on BATCH_SUMMARY_WORKERS workers, shared by all batches
+batch_summary_executor = ThreadPoolExecutor(max_workers=int(os.environ.get('BATCH_SUMMARY_WORKERS', 8)))
+BATCH_MAX_SIZE = int(os.environ.get('BATCH_MAX_SIZE', 1000))
+# the resources shown on a submission's page are fetched concurrently, and kept for SUBMISSION_VIEW_CACHE_TTL seconds
+submission_view_executor = ThreadPoolExecutor(max_workers=int(os.environ.get('SUBMISSION_VIEW_WORKERS', 12)))
+submission_view_cache = ExpiringDict(max_len=1000,
+                                     max_age_seconds=int(os.environ.get('SUBMISSION_VIEW_CACHE_TTL', 10)))
+# each watched submission is polled once every SUBMISSION_POLL_INTERVAL seconds, however many pages are watching it
+submission_watchers = SubmissionWatcherHub(
+    lambda submission_id: ingest_clients.client().getSubmissionIfModifiedSince(submission_id, None),
+    lambda submission_id: ingest_clients.client().getFiles(submission_id),
+    poll_interval=int(os.environ.get('SUBMISSION_POLL_INTERVAL', 5)))
+SUBMISSION_EVENTS_KEEP_ALIVE = 15  # seconds
+# submission pages open their event streams at SUBMISSION_EVENTS_URL, the root URL of the asyncio broker, which serves
+# them without holding a thread each; they are served by this app if it isn't set
+SUBMISSION_EVENTS_URL = os.environ.get('SUBMISSION_EVENTS_URL', '').rstrip('/')
+# every event stream served here holds one of the worker's threads, so a worker serves at most
+# SUBMISSION_EVENTS_MAX_STREAMS at once, each for at most SUBMISSION_EVENTS_MAX_AGE seconds before the page reopens it;
+# pages turned away poll for a while before trying again
+submission_event_streams = threading.BoundedSemaphore(int(os.environ.get('SUBMISSION_EVENTS_MAX_STREAMS', 4)))
+SUBMISSION_EVENTS_MAX_AGE = int(os.environ.get('SUBMISSION_EVENTS_MAX_AGE', 60 * 10))
+
 @app.route('/api_upload', methods=['POST'])
 @cross_origin()
 def upload_spreadsheet():
+    reservation = None
     try:
         logger.info("Uploading spreadsheet")
         token = _check_token()
-        path = _save_spreadsheet()
-        ingest_api = IngestApi()
-        ingest_api.set_token(token)
-        importer = XlsImporter(ingest_api)
+        # turn the upload away before reading it if it couldn't be imported anyway
+        reservation = import_scheduler.reserve()
+        trace = ImportTrace()
+        with trace.phase('save'):
+            upload = _save_spreadsheet()
+        trace.filename = upload.filename
+        ingest_api = ingest_clients.client_for_token(token)
 
-        project = _check_for_project(ingest_api)
+        with trace.phase('check_project'):
+            project = _check_for_project(ingest_api)
 
         project_uuid = None
         if project and project.get('uuid'):
             project_uuid = project.get('uuid').get('uuid')
 
-        submission_url = ingest_api.createSubmission(token)
-
-        _submit_spreadsheet_data(importer, path, submission_url, project_uuid)
+        upload_key = (upload.sha256, token, project_uuid)
+        submission_url = recent_uploads.get(upload_key)
+        if submission_url:
+            logger.info("Spreadsheet was already uploaded to " + submission_url)
+            return create_upload_success_response(submission_url)
+
+        with trace.phase('create_submission'):
+            submission_url = ingest_api.createSubmission(token)
+        trace.submission_url = submission_url
+        # registered and claimed before the import is queued, as it may be done, and clean up after itself, at once
+        recent_uploads.register(upload_key, submission_url)
+        path = upload.claim()
+        try:
+            _submit_spreadsheet_data(ingest_api, path, submission_url, project_uuid, upload_key, reservation, token,
+                                     trace)
+        except BaseException:
+            # the import was never queued, so it won't clean up after itself
+            recent_uploads.forget(upload_key)
+            remove_spreadsheet(path)
+            raise
 
         return create_upload_success_response(submission_url)
+    except ImportQueueFullException as queueFullError:
+        failure_response = create_upload_failure_response(503, "We are importing too many spreadsheets at the moment, "
+                                                               "please try again later", str(queueFullError))
+        failure_response.headers['Retry-After'] = str(queueFullError.retry_after)
+        return failure_response
     except SpreadsheetUploadError as spreadsheetUploadError:
         return create_upload_failure_response(spreadsheetUploadError.http_code, spreadsheetUploadError.message,
                                               spreadsheetUploadError.details)
@@ -72,44 +177,218 @@ def upload_spreadsheet():
         logger.error(traceback.format_exc())
         return create_upload_failure_response(500, "We experienced a problem while uploading your spreadsheet",
                                               str(err))
+    finally:
+        if reservation:
+            reservation.cancel()
 
 
 @app.route('/submissions/<submission_uuid>/summary', methods=['GET'])
 def submission_summary(submission_uuid):
-    submission = IngestApi().getSubmissionByUuid(submission_uuid)
-    summary = SummaryService().summary_for_submission(submission)
+    submission = ingest_clients.client().getSubmissionByUuid(submission_uuid)
+    # looked up even for a conditional request, as a 304 carries the summary's entity tag; the summary of an unchanged
+    # submission is usually cached, along with its encoding
+    encoded_summary = _summary_service().encoded_summary_for_submission(submission)
+
+    return _conditional_summary_response(encoded_summary)
+
+
+@app.route('/projects/<project_uuid>/summary', methods=['GET'])
+def project_summary(project_uuid):
+    project = ingest_clients.client().getProjectByUuid(project_uuid)
+    encoded_summary = _summary_service().encoded_summary_for_project(project)
+
+    return _conditional_summary_response(encoded_summary)
+
+
+@app.route('/submissions/<submission_uuid>/summary.tsv', methods=['GET'])
+def submission_summary_tsv(submission_uuid):
+    submission = ingest_clients.client().getSubmissionByUuid(submission_uuid)
+    summary = _summary_service().summary_for_submission(submission)
 
+    return _tsv_summary_response('submission', submission_uuid, summary)
+
+
+@app.route('/projects/<project_uuid>/summary.tsv', methods=['GET'])
+def project_summary_tsv(project_uuid):
+    project = ingest_clients.client().getProjectByUuid(project_uuid)
+    summary = _summary_service().summary_for_project(project)
+
+    return _tsv_summary_response('project', project_uuid, summary)
+
+
+def _tsv_summary_response(summary_type, uuid, summary):
+    rows = TSVSummaryUtil.summary_rows(summary_type, uuid, summary)
+
+    # without a content length, the rows are sent chunked as they are formatted
     return app.response_class(
-        response=jsonpickle.encode(summary, unpicklable=False),
+        response=TSVSummaryUtil.tsv_lines(rows, SUMMARY_ROW_HEADERS),
+        status=200,
+        mimetype='text/tab-separated-values',
+        headers={'Content-Disposition': 'attachment; filename="{0}-{1}-summary.tsv"'.format(summary_type, uuid)}
+    )
+
+
+def _summary_service() -> SummaryService:
+    # a single service for the app, so that its per-project summaries are kept between requests
+    global summary_service
+    with summary_service_lock:
+        if summary_service is None:
+            summary_service = SummaryService(ingest_api=ingest_clients.client(),
+                                             submission_summary_cache=submission_summary_cache,
+                                             single_flight=summary_single_flight,
+                                             summary_refresher=summary_refresher,
+                                             project_concurrency=project_summary_concurrency,
+                                             submission_timeout=project_summary_submission_timeout)
+        return summary_service
+
+
+@app.route('/summaries/batch', methods=['POST'])
+def batch_summaries():
+    batch = request.get_json(silent=True)
+    if not isinstance(batch, dict) or \
+            not all(isinstance(batch.get(key, []), list) for key in ('submissions', 'projects')):
+        return create_upload_failure_response(400, 'Invalid batch',
+                                              'Expected a JSON object with lists of "submissions" and/or "projects" '
+                                              'uuids')
+
+    submission_uuids = [str(uuid) for uuid in batch.get('submissions', [])]
+    project_uuids = [str(uuid) for uuid in batch.get('projects', [])]
+    if len(submission_uuids) + len(project_uuids) > BATCH_MAX_SIZE:
+        return create_upload_failure_response(400, 'Batch too large',
+                                              'At most {0} uuids can be summarised at once'.format(BATCH_MAX_SIZE))
+
+    results = BatchSummarizer(_summary_service(), batch_summary_executor).summarize(submission_uuids, project_uuids)
+
+    # one line per submission or project, sent as soon as its summary is ready
+    response = app.response_class(
+        response=(result.to_ndjson() for result in results),
+        status=200,
+        mimetype='application/x-ndjson'
+    )
+    response.call_on_close(results.close)
+    return response
+
+
+def prewarm_summaries(count, timeout=None) -> int:
+    """
+    Summarises the most recently created submissions into the summary cache, one at a time, e.g before the app starts
+    serving. Submissions that fail to summarise are logged and skipped.
+
+    The summaries are computed by a service of their own, sharing only the cache, which is shut down again before
+    returning, so that no threads are left behind if the process is about to fork workers
+    :param count: max number of submissions to summarise
+    :param timeout: seconds after which no more submissions are summarised
+    :return: the number of submissions summarised
+    """
+    deadline = None if timeout is None else time.monotonic() + timeout
+    submissions = (ingest_clients.client().getSubmissions() or [])[:count]
+    prewarm_service = SummaryService(ingest_api=ingest_clients.client(),
+                                     submission_summary_cache=submission_summary_cache)
+
+    summarised = 0
+    try:
+        for submission in submissions:
+            if deadline is not None and time.monotonic() >= deadline:
+                logger.warning('Pre-warming summaries timed out after {0}s'.format(timeout))
+                break
+
+            try:
+                prewarm_service.encoded_summary_for_submission(submission)
+                summarised += 1
+            except Exception:
+                logger.exception('Failed to pre-warm the summary of submission {0}'.format(
+                    SummaryService.uuid_from_submission(submission)))
+    finally:
+        prewarm_service.summary_refresher.shutdown()
+
+    logger.info('Pre-warmed the summaries of {0} submissions'.format(summarised))
+    return summarised
+
+
+def _conditional_summary_response(encoded_summary):
+    response = app.response_class(
+        response=encoded_summary.body,
         status=200,
         mimetype='application/json'
     )
+    response.set_etag(encoded_summary.etag)
+    if encoded_summary.last_modified:
+        response.last_modified = DateUtil.parse_ingest_date(encoded_summary.last_modified)
 
+    return response.make_conditional(request)
 
-@app.route('/projects/<project_uuid>/summary', methods=['GET'])
-def project_summary(project_uuid):
-    project = IngestApi().getProjectByUuid(project_uuid)
-    summary = SummaryService().summary_for_project(project)
 
+@app.route('/summaries/cache', methods=['GET'])
+def summary_cache_stats():
     return app.response_class(
-        response=jsonpickle.encode(summary, unpicklable=False),
+        response=json.dumps(submission_summary_cache.stats()),
         status=200,
         mimetype='application/json'
     )
 
 
-def _submit_spreadsheet_data(importer, path, submission_url, project_uuid):
+@app.teardown_request
+def _discard_unclaimed_uploads(error=None):
+    for upload in request.__dict__.get('spreadsheet_uploads', []):
+        if not upload.claimed:
+            upload.discard()
+
+
+def _submit_spreadsheet_data(ingest_api, path, submission_url, project_uuid, upload_key=None, reservation=None,
+                             token=None, trace=None):
 
     logger.info("Attempting submission...")
-    thread = threading.Thread(target=_do_import, args=(importer, path, submission_url, project_uuid))
-    thread.start()
-    logger.info("Spreadsheet upload started!")
+    submit = reservation.submit if reservation else import_scheduler.submit
+    if import_scheduler.use_processes:
+        # only picklable arguments can be passed to a worker process, which imports with a client of its own
+        future = submit(submission_url, run_import, path, submission_url, project_uuid, token)
+    else:
+        future = submit(submission_url, _do_import, ingest_api, path, submission_url, project_uuid)
+    future.add_done_callback(partial(_import_done, path, upload_key, trace))
+    logger.info("Spreadsheet upload queued!")
     return submission_url
 
 
-def _do_import(importer, path, submission_url, project_uuid):
-    importer.import_file(path, submission_url, project_uuid)
-    return
+def _do_import(ingest_api, path, submission_url, project_uuid):
+    return import_spreadsheet(ingest_api, path, submission_url, project_uuid)
+
+
+def _import_done(path, upload_key, trace, future):
+    remove_spreadsheet(path)
+    error = None if future.cancelled() else future.exception()
+    if future.cancelled() or error:
+        # so that uploading the spreadsheet again imports it again
+        recent_uploads.forget(upload_key)
+
+    if not trace:
+        return
+
+    # the row counting, parse and submit phases are traced where the import ran, possibly in a worker process
+    if error:
+        trace.error = str(error)
+        import_trace = getattr(error, 'trace', None)
+    else:
+        import_trace = None if future.cancelled() else future.result()
+
+    if import_trace:
+        trace.add_phases(import_trace)
+    import_traces.record(trace)
+
+
+# the traces of recent imports, most recent first, or slowest first with ?sort=wall_time
+@app.route('/imports/traces', methods=['GET'])
+def import_traces_report():
+    limit = request.args.get('limit', default=20, type=int)
+    if request.args.get('sort') == 'wall_time':
+        traces = import_traces.slowest(limit)
+    else:
+        traces = import_traces.recent(limit)
+
+    return app.response_class(
+        response=json.dumps([trace.to_dict() for trace in traces]),
+        status=200,
+        mimetype='application/json'
+    )
 
 
 def _check_for_project(ingest_api):
@@ -131,12 +410,14 @@ def _check_for_project(ingest_api):
 def _save_spreadsheet():
     logger.info("Saving file")
     try:
-        path = _save_file()
+        upload = _save_file()
+    except SpreadsheetTooLargeException as err:
+        raise SpreadsheetUploadError(413, "The spreadsheet is too large", str(err))
     except Exception as err:
         logger.error(traceback.format_exc())
         message = "We experienced a problem when saving your spreadsheet"
         raise SpreadsheetUploadError(500, message, str(err))
-    return path
+    return upload
 
 
 def _check_token():
@@ -149,16 +430,16 @@ def _check_token():
 
 
 def _save_file():
-    f = request.files['file']
-    filename = secure_filename(f.filename)
-    path = os.path.join(tempfile.gettempdir(), filename)
-    logger.info("Saved file to: " + path)
-    f.save(path)
-    return path
+    # the file has already been streamed to disk while the form was parsed, and is removed after the request unless
+    # claimed for importing
+    upload = request.files['file'].stream
+    upload.close()
+    logger.info("Saved file to: " + upload.path)
+    return upload
 
 
 def create_upload_success_response(submission_url):
-    ingest_api = IngestApi()
+    ingest_api = ingest_clients.client()
     submission_uuid = ingest_api.getObjectUuid(submission_url)
     display_id = submission_uuid or '<UUID not generated yet>'
     submission_id = submission_url.rsplit('/', 1)[-1]
@@ -199,7 +480,7 @@ def create_upload_failure_response(status_code, message, details):
 def index():
     submissions = []
     try:
-        submissions = IngestApi().getSubmissions()
+        submissions = ingest_clients.client().getSubmissions()
     except Exception as e:
         flash("Can't connect to Ingest API!!", "alert-danger")
     return render_template('index.html', submissions=submissions, helper=HTML_HELPER)
@@ -207,11 +488,14 @@ def index():
 
 @app.route('/submissions/<submission_id>')
 def get_submission_view(submission_id):
-    ingest_api = IngestApi()
+    ingest_api = ingest_clients.client()
     submission = ingest_api.getSubmissionIfModifiedSince(submission_id, None)
 
     if submission:
-        response = ingest_api.getProjects(submission_id)
+        (projects_response, files_response, bundle_manifests_response) = \
+            _get_submission_view_resources(ingest_api, submission_id, submission.get('updateDate'))
+
+        response = projects_response
 
         projects = []
 
@@ -222,19 +506,19 @@ def get_submission_view(submission_id):
 
         files = []
 
-        response = ingest_api.getFiles(submission_id)
+        response = files_response
         if '_embedded' in response and 'files' in response['_embedded']:
             files = response['_embedded']['files']
 
         file_page = None
         if 'page' in response:
-            file_page = response['page']
+            file_page = dict(response['page'])
             file_page['len'] = len(files)
 
         bundle_manifests = []
         bundle_manifest_obj = {}
 
-        response = ingest_api.getBundleManifests(submission_id)
+        response = bundle_manifests_response
         if '_embedded' in response and 'bundleManifests' in response['_embedded']:
             bundle_manifests = response['_embedded']['bundleManifests']
 
@@ -242,11 +526,12 @@ def get_submission_view(submission_id):
         bundle_manifest_obj['page'] = None
 
         if 'page' in response:
-            bundle_manifest_obj['page'] = response['page']
+            bundle_manifest_obj['page'] = dict(response['page'])
             bundle_manifest_obj['page']['len'] = len(bundle_manifests)
 
         return render_template('submission.html',
                                sub=submission,
+                               events_url='{0}/submissions/{1}/events'.format(SUBMISSION_EVENTS_URL, submission_id),
                                helper=HTML_HELPER,
                                project=project,
                                files=files,
@@ -257,9 +542,29 @@ def get_submission_view(submission_id):
         return redirect(url_for('index'))
 
 
+def _get_submission_view_resources(ingest_api, submission_id, update_date):
+    """
+    fetches the projects, files and bundle manifests of a submission concurrently, reusing those fetched for the same
+    version of the submission within the last SUBMISSION_VIEW_CACHE_TTL seconds
+    :return: tuple of the projects, files and bundle manifests responses
+    """
+    cache_key = (submission_id, update_date)
+    resources = submission_view_cache.get(cache_key) if update_date else None
+    if resources:
+        return resources
+
+    futures = [submission_view_executor.submit(fetch, submission_id)
+               for fetch in (ingest_api.getProjects, ingest_api.getFiles, ingest_api.getBundleManifests)]
+    resources = tuple(future.result() for future in futures)
+
+    if update_date:
+        submission_view_cache[cache_key] = resources
+    return resources
+
+
 @app.route('/submissions/<submission_id>/files')
 def get_submission_files(submission_id):
-    ingest_api = IngestApi()
+    ingest_api = ingest_clients.client()
     response = ingest_api.getFiles(submission_id)
     files = []
     if '_embedded' in response and 'files' in response['_embedded']:
@@ -274,10 +579,49 @@ def get_submission_files(submission_id):
                            helper=HTML_HELPER)
 
 
+@app.route('/submissions/<submission_id>/events')
+def get_submission_events(submission_id):
+    if not submission_event_streams.acquire(blocking=False):
+        # no content tells the page not to reconnect, so that it polls until it tries again later
+        return app.response_class(status=204)
+
+    subscription = submission_watchers.subscribe(submission_id)
+    deadline = time.monotonic() + SUBMISSION_EVENTS_MAX_AGE
+
+    def stream():
+        yield 'retry: {0}\n\n'.format(submission_watchers.poll_interval * 1000)
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                # the page opens a new stream, possibly on another worker
+                yield 'event: end\ndata: {}\n\n'
+                return
+
+            event = subscription.next_event(timeout=min(SUBMISSION_EVENTS_KEEP_ALIVE, remaining))
+            if subscription.closed:
+                return
+            # comments keep the connection open, and find out when the page has gone
+            yield event.to_sse() if event else ': keep-alive\n\n'
+
+    response = app.response_class(
+        response=stream(),
+        status=200,
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+    def close():
+        submission_watchers.unsubscribe(subscription)
+        submission_event_streams.release()
+
+    # called once the page has gone, even if the stream was never started
+    response.call_on_close(close)
+    return response
+
+
 @app.route('/submit', methods=['POST'])
 def submit_envelope():
     sub_url = request.form.get("submissionUrl")
-    ingest_api = IngestApi()
+    ingest_api = ingest_clients.client()
     if sub_url:
         ingest_api.finishSubmission(sub_url)
     return redirect(url_for('index'))
@@ -1,15 +1,17 @@
-$(document).ready(function() {
-    var POLL_INTERVAL = 5000; //in milliseconds
+var POLL_INTERVAL = 5000; //in milliseconds
+var EVENTS_RETRY_INTERVAL = 60000; //in milliseconds
 
+$(document).ready(function() {
     var url = $('#submission-url').attr('href');
 
     var env = /staging/.test(url) ? 'staging' : 'dev';
     console.log('Currently in ' + env);
 
-    setInterval(function(){
-        pollSubmission(url);
-        pollFiles(url);
-    }, POLL_INTERVAL)
+    if (window.EventSource) {
+        watchSubmission(url, $('#submission-url').data('events-url'));
+    } else {
+        pollSubmissionChanges(url);
+    }
 
     // $('#files').DataTable({searching: false, paging: false});
     // Requires Bootstrap 3 for functionality
@@ -50,6 +52,119 @@ function copyToClipboard(text, el) {
     }
 }
 
+// the broker polls the submission once for every page watching it, and sends only what changed
+function watchSubmission(url, eventsUrl){
+    var events = new EventSource(eventsUrl);
+
+    events.addEventListener('submission', function(event){
+        renderSubmissionChanges(url, JSON.parse(event.data));
+    });
+
+    events.addEventListener('files', function(event){
+        renderFileChanges(JSON.parse(event.data));
+    });
+
+    // the broker ends each stream after a while, so that streams spread across its workers, and the page opens another
+    events.addEventListener('end', function(){
+        events.close();
+        watchSubmission(url, eventsUrl);
+    });
+
+    // a stream turned away by a busy broker is closed rather than retried, and the page polls until trying again
+    events.onerror = function(){
+        if (events.readyState === EventSource.CLOSED) {
+            var polling = pollSubmissionChanges(url);
+            setTimeout(function(){
+                clearInterval(polling);
+                watchSubmission(url, eventsUrl);
+            }, EVENTS_RETRY_INTERVAL);
+        }
+    };
+}
+
+function pollSubmissionChanges(url){
+    return setInterval(function(){
+        pollSubmission(url);
+        pollFiles(url);
+    }, POLL_INTERVAL);
+}
+
+function renderFileChanges(data) {
+    var STATUS_LABEL = {
+        'Valid': 'label-success',
+        'Validating': 'label-info',
+        'Invalid': 'label-danger',
+        'Submitted': 'label-default',
+        'Complete': 'label-default'
+    }
+
+    var DEFAULT_STATUS_LABEL = 'label-warning';
+
+    var table = $('#files tbody');
+    if (!table.length) {
+        return;
+    }
+
+    data.changed.forEach(function(file){
+        var row = table.find('tr').filter(function(){
+            return $(this).data('file-url') === file.url;
+        });
+
+        if (!row.length) {
+            row = $(createFileRow(file));
+            table.append(row);
+        }
+
+        var status = row.find('.file-status');
+        status.text(file.validationState);
+        status.attr('class', 'file-status label ' + (STATUS_LABEL[file.validationState] || DEFAULT_STATUS_LABEL) + ' label-lg');
+    });
+
+    data.removed.forEach(function(fileUrl){
+        table.find('tr').filter(function(){
+            return $(this).data('file-url') === fileUrl;
+        }).remove();
+    });
+
+    var pageInfo = '';
+    var fileCount = table.find('tr').length;
+    if (data.page && fileCount !== data.page.totalElements) {
+        pageInfo = '*Showing ' + fileCount + ' of ' + data.page.totalElements;
+    }
+    $('#file-page-info').text(pageInfo);
+    console.log('Rendered submission file changes.');
+}
+
+function createFileRow(file){
+    var row = $(`
+        <tr>
+            <td class="file-uuid"></td>
+            <td class="file-name"></td>
+            <td><div class="text-left"><span class="file-status label label-lg"></span></div></td>
+            <td class="text-right">
+                <a class="file-url" title="Ingest API Link">
+                    <span class="glyphicon glyphicon-share" aria-hidden="true"></span>
+                </a>
+            </td>
+            <td class="text-right">
+                <a class="file-cloud-url" title="Cloud Url">
+                    <span class="glyphicon glyphicon-share" aria-hidden="true"></span>
+                </a>
+            </td>
+        </tr>`);
+
+    row.attr('data-file-url', file.url);
+    row.find('.file-uuid').text(file.uuid || '');
+    row.find('.file-name').text(file.fileName || '');
+    row.find('.file-url').attr('href', file.url);
+    if (file.cloudUrl) {
+        row.find('.file-cloud-url').attr('href', file.cloudUrl);
+    } else {
+        row.find('.file-cloud-url').remove();
+    }
+    return row;
+}
+
 function pollSubmission(url){
     var date = $('#submission-update-date').data('date');
 
@@ -1,26 +1,177 @@
-from collections import OrderedDict
+from collections import Counter
+from collections.abc import MutableMapping
+from sys import intern
+from typing import Iterable
+
+
+class BreakdownEntry(MutableMapping):
+    """
+    The {'count': n} entry of a specific type in an EntitySummary's breakdown, writing through to the summary's counts
+    """
+    __slots__ = ('_counts', '_specific_type')
+
+    def __init__(self, counts, specific_type):
+        self._counts = counts
+        self._specific_type = specific_type
+
+    def __getitem__(self, key):
+        if key != 'count':
+            raise KeyError(key)
+        return self._counts[self._specific_type]
+
+    def __setitem__(self, key, value):
+        if key != 'count':
+            raise KeyError(key)
+        self._counts[self._specific_type] = value
+
+    def __delitem__(self, key):
+        raise TypeError('an entity breakdown entry always has a count')
+
+    def __iter__(self):
+        return iter(('count',))
+
+    def __len__(self):
+        return 1
+
+    def __repr__(self):
+        return repr({'count': self['count']})
+
+
+class Breakdown(MutableMapping):
+    """
+    A view of an EntitySummary's counts in the {specific_type: {'count': n}} shape of the summary JSON
+    """
+    __slots__ = ('_counts',)
+
+    def __init__(self, counts):
+        self._counts = counts
+
+    def __getitem__(self, specific_type):
+        if specific_type not in self._counts:
+            raise KeyError(specific_type)
+        return BreakdownEntry(self._counts, specific_type)
+
+    def __setitem__(self, specific_type, value):
+        self._counts[intern(specific_type)] = value['count']
+
+    def __delitem__(self, specific_type):
+        del self._counts[specific_type]
+
+    def __iter__(self):
+        return iter(self._counts)
+
+    def __len__(self):
+        return len(self._counts)
+
+    def __repr__(self):
+        return repr(self.to_dict())
+
+    def to_dict(self) -> dict:
+        return {specific_type: {'count': count} for (specific_type, count) in self._counts.items()}
+
 
 class EntitySummary:
+    """
+    The count of entities of one entity type, broken down by the count of each specific type.
+
+    Counts are kept in a Counter keyed by interned specific type names. Summaries can be merged in place with +=,
+    which never modifies the summary being added, while + and - return new summaries
+    """
+    __slots__ = ('count', 'counts')
+
     def __init__(self):
         self.count = 0
-        self.breakdown = OrderedDict()
+        self.counts = Counter()
+
+    @property
+    def breakdown(self) -> Breakdown:
+        return Breakdown(self.counts)
+
+    @breakdown.setter
+    def breakdown(self, breakdown: dict):
+        self.counts = Counter({intern(specific_type): val['count'] for (specific_type, val) in breakdown.items()})
+
+    def add_entity(self, specific_type: str, count=1) -> 'EntitySummary':
+        """
+        counts entities of a specific type towards this summary
+        :param specific_type: the specific type of the entity (e.g donor, cell_suspension, ...)
+        :param count: the number of entities
+        :return: self
+        """
+        self.counts[intern(specific_type)] += count
+        self.count += count
+        return self
+
+    def copy(self) -> 'EntitySummary':
+        copied_summary = EntitySummary()
+        copied_summary.count = self.count
+        copied_summary.counts = Counter(self.counts)
+        return copied_summary
+
+    def __iadd__(self, other: 'EntitySummary') -> 'EntitySummary':
+        """
+        adds another EntitySummary into this one
+        :param other:
+        :return: self
+        """
+        self.count += other.count
+        self.counts.update(other.counts)
+        return self
 
     def __add__(self, other: 'EntitySummary') -> 'EntitySummary':
         """
         adds two EntitySummary together
         :param other:
+        :return: a new EntitySummary
+        """
+        combined_summary = self.copy()
+        combined_summary += other
+        return combined_summary
+
+    def __isub__(self, other: 'EntitySummary') -> 'EntitySummary':
+        """
+        subtracts another EntitySummary from this one, e.g to take a submission's counts back out of a project's.
+        Specific types whose count drops to zero are removed from the breakdown
+        :param other:
         :return: self
         """
-        # copy self into a new EntitySummary obj
-        combined_summary = EntitySummary()
-        combined_summary.count = self.count
-        combined_summary.breakdown = OrderedDict(self.breakdown)
-        
-        combined_summary.count += other.count
-        for (key, val) in other.breakdown.items():
-            if key in combined_summary.breakdown:  # ..do an add
-                combined_summary.breakdown[key]['count'] += val['count']
-            else:
-                combined_summary.breakdown[key] = val
+        self.count -= other.count
+        self.counts -= other.counts
+        return self
 
-        return combined_summary
+    def __sub__(self, other: 'EntitySummary') -> 'EntitySummary':
+        remaining_summary = self.copy()
+        remaining_summary -= other
+        return remaining_summary
+
+    def to_dict(self) -> dict:
+        return {'count': self.count, 'breakdown': self.breakdown.to_dict()}
+
+    def __getstate__(self):
+        return self.to_dict()
+
+    def __setstate__(self, state):
+        self.count = state['count']
+        self.breakdown = state['breakdown']
+
+    @staticmethod
+    def merge(summaries: Iterable['EntitySummary']) -> 'EntitySummary':
+        """
+        Adds up any number of summaries by pairwise (tree) reduction, without modifying them. As adding summaries is
+        associative and commutative, groups of summaries can also be merged in parallel and the results merged again
+        :param summaries:
+        :return: a new EntitySummary
+        """
+        summaries = list(summaries)
+        if not summaries:
+            return EntitySummary()
+
+        # the first level copies, so every later level can add in place into summaries it owns
+        merged = [summaries[i] + summaries[i + 1] if i + 1 < len(summaries) else summaries[i].copy()
+                  for i in range(0, len(summaries), 2)]
+
+        while len(merged) > 1:
+            merged = [merged[i].__iadd__(merged[i + 1]) if i + 1 < len(merged) else merged[i]
+                      for i in range(0, len(merged), 2)]
+
+        return merged[0]
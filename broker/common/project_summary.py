@@ -1,6 +1,8 @@
 from .entity_summary import EntitySummary
 from .submission_summary import SubmissionSummary
 
+import threading
+
 
 class ProjectSummary:
 
@@ -14,9 +16,12 @@ class ProjectSummary:
         self.create_date = None
         self.last_updated_date = None
 
+        # a summary that leaves out submissions which took too long to summarise
+        self.is_partial = False
+
     def addSubmissionSummary(self, submission_summary: 'SubmissionSummary') -> 'ProjectSummary':
         """
-        Adds a submission summary to this project summary
+        Adds a submission summary to this project summary, in place. The submission summary isn't modified
         :param submission_summary: SubmissionSummary to add to self
         :return: self
         """
@@ -26,3 +31,124 @@ class ProjectSummary:
         self.file_summary += submission_summary.file_summary
 
         return self
+
+    def subtractSubmissionSummary(self, submission_summary: 'SubmissionSummary') -> 'ProjectSummary':
+        """
+        Takes a previously added submission summary back out of this project summary
+        :param submission_summary: SubmissionSummary to subtract from self
+        :return: self
+        """
+        self.biomaterial_summary -= submission_summary.biomaterial_summary
+        self.protocol_summary -= submission_summary.protocol_summary
+        self.process_summary -= submission_summary.process_summary
+        self.file_summary -= submission_summary.file_summary
+
+        return self
+
+    def to_dict(self) -> dict:
+        return {
+            'biomaterial_summary': self.biomaterial_summary.to_dict(),
+            'protocol_summary': self.protocol_summary.to_dict(),
+            'process_summary': self.process_summary.to_dict(),
+            'file_summary': self.file_summary.to_dict(),
+            'submission_status': self.submission_status,
+            'create_date': self.create_date,
+            'last_updated_date': self.last_updated_date,
+            'is_partial': self.is_partial
+        }
+
+    def copy(self) -> 'ProjectSummary':
+        project_summary = ProjectSummary()
+        project_summary.biomaterial_summary = self.biomaterial_summary.copy()
+        project_summary.protocol_summary = self.protocol_summary.copy()
+        project_summary.process_summary = self.process_summary.copy()
+        project_summary.file_summary = self.file_summary.copy()
+
+        project_summary.submission_status = self.submission_status
+        project_summary.create_date = self.create_date
+        project_summary.last_updated_date = self.last_updated_date
+        project_summary.is_partial = self.is_partial
+        return project_summary
+
+
+class IncrementalProjectSummary:
+    """
+    A project summary that remembers which submission summaries it is made of, keyed by submission uuid and
+    versioned by the submission's update date. When a submission changes, only its old contribution is subtracted and
+    its new one added, rather than re-summing every submission in the project
+    """
+
+    def __init__(self):
+        self.project_summary = ProjectSummary()
+        self.contributions = dict()
+        self.left_out = set()
+        self.lock = threading.Lock()
+
+        self._snapshot = None
+        self._encoded_snapshot = None
+
+    def snapshot(self) -> ProjectSummary:
+        """
+        :return: a copy of the current project summary, shared by callers until a submission summary is put or
+        removed, or the submissions left out change, so it must not be modified
+        """
+        if self._snapshot is None:
+            self._snapshot = self.project_summary.copy()
+            self._snapshot.is_partial = bool(self.left_out)
+            self._encoded_snapshot = None
+        return self._snapshot
+
+    def encoded_snapshot(self, snapshot: ProjectSummary, encode) -> bytes:
+        """
+        :param snapshot: a snapshot taken from this summary
+        :param encode: function encoding a summary
+        :return: the encoded snapshot, encoded only once while it is the current snapshot
+        """
+        if snapshot is not self._snapshot:
+            return encode(snapshot)
+
+        if self._encoded_snapshot is None:
+            self._encoded_snapshot = encode(snapshot)
+        return self._encoded_snapshot
+
+    def is_current(self, submission_uuid, update_date) -> bool:
+        """
+        :return: True if this summary already includes a fresh summary of the given version of the submission
+        """
+        if submission_uuid not in self.contributions:
+            return False
+
+        (contributed_update_date, submission_summary) = self.contributions[submission_uuid]
+        return contributed_update_date == update_date and not submission_summary.is_stale
+
+    def put_submission_summary(self, submission_uuid, update_date, submission_summary: SubmissionSummary):
+        """
+        Adds a submission's summary, replacing any previous version of it
+        """
+        self.remove_submission_summary(submission_uuid)
+        self.project_summary.addSubmissionSummary(submission_summary)
+        self.contributions[submission_uuid] = (update_date, submission_summary)
+        self._snapshot = None
+
+    def remove_submission_summary(self, submission_uuid):
+        if submission_uuid in self.contributions:
+            (_, submission_summary) = self.contributions.pop(submission_uuid)
+            self.project_summary.subtractSubmissionSummary(submission_summary)
+            self._snapshot = None
+
+    def set_left_out(self, submission_uuids):
+        """
+        Records the submissions left out of the latest summary of the project, e.g as they took too long to summarise,
+        making the summary partial if there are any
+        """
+        left_out = set(submission_uuids)
+        if left_out != self.left_out:
+            self.left_out = left_out
+            self._snapshot = None
+
+    def retain_submissions(self, submission_uuids):
+        """
+        Removes the summaries of any submissions other than those given, e.g those no longer in the project
+        """
+        for submission_uuid in set(self.contributions.keys()) - set(submission_uuids):
+            self.remove_submission_summary(submission_uuid)
@@ -15,3 +15,19 @@ class SubmissionSummary:
         self.submission_status = None
         self.create_date = None
         self.last_updated_date = None
+
+        self.is_stale = False
+
+    def to_dict(self) -> dict:
+        return {
+            'biomaterial_summary': self.biomaterial_summary.to_dict(),
+            'protocol_summary': self.protocol_summary.to_dict(),
+            'process_summary': self.process_summary.to_dict(),
+            'file_summary': self.file_summary.to_dict(),
+            'project_summary': self.project_summary.to_dict(),
+            'scrape_result': self.scrape_result,
+            'submission_status': self.submission_status,
+            'create_date': self.create_date,
+            'last_updated_date': self.last_updated_date,
+            'is_stale': self.is_stale
+        }
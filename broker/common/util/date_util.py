@@ -0,0 +1,22 @@
+from datetime import datetime, timezone
+
+INGEST_DATE_FORMAT = '%Y-%m-%dT%H:%M:%S'
+
+
+class DateUtil:
+
+    @staticmethod
+    def parse_ingest_date(date_string: str) -> datetime:
+        """
+        parses a date from the ingest API (e.g 2018-07-19T13:55:13.392Z) to a UTC datetime, to the second, as HTTP
+        dates have no finer precision
+        :param date_string: an ISO 8601 date string
+        :return: a naive datetime in UTC
+        """
+        return datetime.strptime(date_string[:19], INGEST_DATE_FORMAT)
+
+    @staticmethod
+    def to_naive_utc(date: datetime) -> datetime:
+        if date.tzinfo is None:
+            return date
+        return date.astimezone(timezone.utc).replace(tzinfo=None)
@@ -0,0 +1,37 @@
+import hashlib
+import json
+
+
+class EncodedSummary:
+    """
+    A summary encoded as JSON, with a strong entity tag of its content and, for a fresh submission summary, the update
+    date of the submission it was computed from
+    """
+
+    def __init__(self, body: bytes, last_modified=None):
+        self.body = body
+        self.etag = hashlib.sha256(body).hexdigest()
+        self.last_modified = last_modified
+
+
+class JSONSummaryUtil:
+
+    @staticmethod
+    def encode(summary) -> bytes:
+        """
+        encodes a SubmissionSummary, ProjectSummary or EntitySummary as UTF-8 JSON, in the same shape jsonpickle
+        produces for it but without walking the summary reflectively
+        :param summary: a summary with a to_dict method
+        :return: the encoded summary
+        """
+        return json.dumps(summary.to_dict()).encode('utf-8')
+
+    @staticmethod
+    def encode_submission_summary(submission_summary) -> EncodedSummary:
+        """
+        :param submission_summary: a SubmissionSummary
+        :return: the encoded summary; a stale summary has no last modified date, as it may change without the
+        submission changing
+        """
+        last_modified = None if submission_summary.is_stale else submission_summary.last_updated_date
+        return EncodedSummary(JSONSummaryUtil.encode(submission_summary), last_modified)
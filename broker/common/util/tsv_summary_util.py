@@ -1,25 +1,30 @@
 import csv
-from functools import reduce
+import io
+from itertools import chain
+from typing import Generator, Iterable, TextIO
 from broker.common.submission_summary import SubmissionSummary
 from broker.common.project_summary import ProjectSummary
 
+SUMMARY_ROW_HEADERS = ['type', 'uuid', 'kind', 'name', 'value']
+
 
 class TSVSummaryUtil:
 
     @staticmethod
-    def project_summary_to_tsv(project_summary: ProjectSummary):
+    def project_summary_to_tsv(project_summary: ProjectSummary, report_file: TextIO = None):
         breakdowns = TSVSummaryUtil.breakdowns_from_project_summary(project_summary)
         entity_count_tuples = TSVSummaryUtil.entity_count_tuples_from_breakdowns(breakdowns)
 
-        return TSVSummaryUtil.entity_count_tuples_to_tsv(entity_count_tuples)
+        return TSVSummaryUtil.entity_count_tuples_to_tsv(entity_count_tuples, report_file)
 
     @staticmethod
-    def submission_summary_to_tsv(submission_summary: SubmissionSummary):
+    def submission_summary_to_tsv(submission_summary: SubmissionSummary, report_file: TextIO = None,
+                                  scrape_file: TextIO = None):
         breakdowns = TSVSummaryUtil.breakdowns_from_submission_summary(submission_summary)
         entity_count_tuples = TSVSummaryUtil.entity_count_tuples_from_breakdowns(breakdowns)
 
-        TSVSummaryUtil.entity_count_tuples_to_tsv(entity_count_tuples)
-        TSVSummaryUtil.scrape_result_to_tsv(submission_summary.scrape_result)
+        TSVSummaryUtil.entity_count_tuples_to_tsv(entity_count_tuples, report_file)
+        TSVSummaryUtil.scrape_result_to_tsv(submission_summary.scrape_result, scrape_file)
 
         return True
 
@@ -40,28 +45,81 @@ class TSVSummaryUtil:
                 submission_summary.project_summary.breakdown]
 
     @staticmethod
-    def entity_count_tuples_from_breakdowns(breakdowns: list):
-        return reduce(lambda xs, ys: xs + ys,
-                      map(lambda breakdown: TSVSummaryUtil.breakdown_to_entity_count_tuple(breakdown), breakdowns))
+    def entity_count_tuples_from_breakdowns(breakdowns: Iterable[dict]) -> Iterable[tuple]:
+        """
+        :param breakdowns: entity breakdowns of a summary
+        :return: an iterator of the (specific type, count) tuples of all the breakdowns, produced lazily
+        """
+        return chain.from_iterable(map(TSVSummaryUtil.breakdown_to_entity_count_tuple, breakdowns))
+
+    @staticmethod
+    def breakdown_to_entity_count_tuple(breakdown: dict) -> Generator[tuple, None, None]:
+        return ((key, breakdown[key]["count"]) for key in breakdown.keys())
+
+    @staticmethod
+    def entity_count_tuples_to_tsv(entity_count_tuples: Iterable[tuple], tsv_file: TextIO = None):
+        """
+        :param entity_count_tuples: the (specific type, count) tuples to write
+        :param tsv_file: a text file to write to; report.tsv is written if not given
+        """
+        if tsv_file is None:
+            with open('report.tsv', 'w') as tsv_file:
+                return TSVSummaryUtil.entity_count_tuples_to_tsv(entity_count_tuples, tsv_file)
+
+        headers = ["entity", "count"]
+        writer = csv.writer(tsv_file,  delimiter='\t')
+        writer.writerow(headers)
+        writer.writerows(entity_count_tuples)
+        return writer
 
     @staticmethod
-    def breakdown_to_entity_count_tuple(breakdown: dict):
-        return [(key, breakdown[key]["count"]) for key in breakdown.keys()]
+    def scrape_result_to_tsv(scrape_result: dict, tsv_file: TextIO = None):
+        """
+        :param scrape_result: the scrape result of a submission summary
+        :param tsv_file: a text file to write to; scrape.tsv is written if not given
+        """
+        if tsv_file is None:
+            with open('scrape.tsv', 'w') as tsv_file:
+                return TSVSummaryUtil.scrape_result_to_tsv(scrape_result, tsv_file)
+
+        writer = csv.writer(tsv_file,  delimiter='\t')
+        writer.writerows(scrape_result.items())
+        return writer
 
     @staticmethod
-    def entity_count_tuples_to_tsv(entity_count_tuples: list):
-        with open('report.tsv', 'w') as tsvfile:
-            headers = ["entity", "count"]
-            writer = csv.writer(tsvfile,  delimiter='\t')
-            writer.writerow(headers)
-            for entity_count_tuple in entity_count_tuples:
-                writer.writerow(list(entity_count_tuple))
-            return writer
+    def summary_rows(summary_type, uuid, summary) -> Generator[list, None, None]:
+        """
+        Rows of a summary in a table that can hold many summaries, with the columns in SUMMARY_ROW_HEADERS: a row per
+        specific entity type count, then a row per scrape result of a submission summary
+        :param summary_type: project or submission
+        :param uuid: uuid of the project or submission
+        :param summary: a ProjectSummary or SubmissionSummary
+        :return: a generator of the rows, produced lazily
+        """
+        if summary_type == 'project':
+            breakdowns = TSVSummaryUtil.breakdowns_from_project_summary(summary)
+        else:
+            breakdowns = TSVSummaryUtil.breakdowns_from_submission_summary(summary)
+
+        for (entity, count) in TSVSummaryUtil.entity_count_tuples_from_breakdowns(breakdowns):
+            yield [summary_type, uuid, 'count', entity, count]
+
+        for (placeholder, value) in (getattr(summary, 'scrape_result', None) or {}).items():
+            yield [summary_type, uuid, 'scrape', placeholder, value]
 
     @staticmethod
-    def scrape_result_to_tsv(scrape_result: dict):
-        with open('scrape.tsv', 'w') as tsvfile:
-            writer = csv.writer(tsvfile,  delimiter='\t')
-            for scraped_tuple in scrape_result.items():
-                writer.writerow(list(scraped_tuple))
-            return writer
+    def tsv_lines(rows: Iterable[list], headers: list = None) -> Generator[str, None, None]:
+        """
+        Formats rows as TSV one line at a time, e.g to stream them in a response
+        :param rows: the rows to format
+        :param headers: an optional header row
+        :return: a generator of TSV lines
+        """
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, delimiter='\t', lineterminator='\n')
+
+        for row in chain([headers], rows) if headers else rows:
+            writer.writerow(row)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
@@ -0,0 +1,104 @@
+import logging
+import os
+
+from typing import AsyncGenerator
+
+import aiohttp
+
+DEFAULT_INGEST_URL = 'http://localhost:8080'
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncIngestApi:
+    """
+    Non-blocking client for the read-only parts of the ingest API used to summarise submissions and projects.
+
+    Requests go through an aiohttp ClientSession, whose connector pools connections and bounds how many are open at
+    once, so many summaries can wait on the ingest API without holding a thread each. Lookups and paging follow the
+    same links as the ingest client, so summaries come out the same either way
+    """
+
+    def __init__(self, session: aiohttp.ClientSession, url=None):
+        """
+        :param session: session the requests are made through; it is owned, and closed, by the caller
+        :param url: root URL of the ingest API, defaults to the INGEST_API environment variable
+        """
+        self.session = session
+        self.url = os.environ.get('INGEST_API', DEFAULT_INGEST_URL) if not url else url
+        self.url = self.url.rstrip('/')
+        self._submission_search_url = None
+
+    async def _get_json(self, url, params=None):
+        async with self.session.get(url, params=params) as response:
+            response.raise_for_status()
+            return await response.json(content_type=None)
+
+    async def _get_json_if_ok(self, url, params=None):
+        # the ingest client skips listings it can't read rather than failing, and so does this one
+        async with self.session.get(url, params=params) as response:
+            if response.status != 200:
+                logger.warning('Skipping {0}, which answered with status {1}'.format(url, response.status))
+                return None
+            return await response.json(content_type=None)
+
+    async def get_submission_by_uuid(self, submission_uuid) -> dict:
+        if not self._submission_search_url:
+            search = await self._get_json(self.url + '/submissionEnvelopes/search')
+            self._submission_search_url = search['_links']['findByUuid']['href'].replace('{?uuid}', '')
+
+        return await self._get_json(self._submission_search_url, params={'uuid': submission_uuid})
+
+    async def get_submission(self, submission_id) -> dict:
+        """
+        :return: the submission envelope with the id, or None if it can't be read
+        """
+        return await self._get_json_if_ok('{0}/submissionEnvelopes/{1}'.format(self.url, submission_id))
+
+    async def get_submission_files(self, submission_id) -> dict:
+        """
+        :return: the first page of the submission's files, or None if it can't be read
+        """
+        return await self._get_json_if_ok('{0}/submissionEnvelopes/{1}/files'.format(self.url, submission_id))
+
+    async def get_project_by_uuid(self, project_uuid) -> dict:
+        return await self.get_entity_by_uuid('projects', project_uuid)
+
+    async def get_entity_by_uuid(self, entity_type, uuid) -> dict:
+        return await self._get_json('{0}/{1}/search/findByUuid'.format(self.url, entity_type), params={'uuid': uuid})
+
+    async def get_entities(self, submission_url, entity_type, page_size=None) -> AsyncGenerator[list, None]:
+        """
+        :param submission_url: URL of the submission envelope
+        :param entity_type: the entity type to list, e.g biomaterials
+        :param page_size: number of entities to ask for per page, the ingest API's default if not set
+        :return: an async generator of pages of the submission's entities of the type
+        """
+        submission = await self._get_json_if_ok(submission_url)
+        if submission and entity_type in submission['_links']:
+            async for page in self._get_all_pages(submission['_links'][entity_type]['href'], entity_type, page_size):
+                yield page
+
+    async def get_related_entities(self, relation, entity, entity_type) -> AsyncGenerator[list, None]:
+        """
+        :param relation: the link from the entity to the related entities, e.g submissionEnvelopes
+        :param entity: the entity resource
+        :param entity_type: the type of the related entities
+        :return: an async generator of pages of the related entities
+        """
+        if relation in entity['_links']:
+            async for page in self._get_all_pages(entity['_links'][relation]['href'], entity_type):
+                yield page
+
+    async def _get_all_pages(self, url, entity_type, page_size=None) -> AsyncGenerator[list, None]:
+        # the page size only goes on the first request, the next links carry it on
+        params = {'size': page_size} if page_size else None
+
+        while url:
+            page = await self._get_json_if_ok(url, params=params)
+            if not page or '_embedded' not in page:
+                return
+
+            yield page['_embedded'][entity_type]
+            url = page['_links']['next']['href'] if 'next' in page['_links'] else None
+            params = None
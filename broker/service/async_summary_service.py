@@ -0,0 +1,228 @@
+import asyncio
+import copy
+import functools
+import logging
+import threading
+
+from expiringdict import ExpiringDict
+
+from broker.common.submission_summary import SubmissionSummary
+from broker.common.project_summary import ProjectSummary, IncrementalProjectSummary
+from broker.common.util.json_summary_util import JSONSummaryUtil, EncodedSummary
+from .async_ingest_api import AsyncIngestApi
+from .entity_fetcher import ENTITY_TYPES, ENTITY_PAGE_SIZE
+from .submission_summary_cache import SubmissionSummaryCache
+from .summary_service import SummaryService, SubmissionSummaryBuilder, SubmissionScraper, MAX_PROJECT_SUMMARIES, \
+    ONE_DAY, SCRAPE_CONFIG_PATH
+from .exception.cache_miss_exception import CacheMissException
+from .exception.stale_cache_entry_exception import StaleCacheEntryException
+
+DEFAULT_ASYNC_PROJECT_CONCURRENCY = 16
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncSummaryService:
+    """
+    Summarises submissions and projects on an asyncio event loop, with the same summaries, caching and incremental
+    project summaries as SummaryService.
+
+    Waiting on the ingest API doesn't hold a thread, so entity types and submissions are fetched as concurrent tasks
+    rather than on pools of workers. Each page of entities is counted and scraped on the loop as it arrives. A cache
+    backed by a summary store is only used from the loop's default executor, as reading and writing the store blocks.
+    A service belongs to the event loop it is first used on
+    """
+
+    def __init__(self, ingest_api: AsyncIngestApi, submission_summary_cache=None, project_concurrency=None,
+                 submission_timeout=None):
+        """
+        :param ingest_api: non-blocking client used to fetch submissions and their entities
+        :param submission_summary_cache: cache of computed submission summaries
+        :param project_concurrency: max number of submissions summarised at once for a project
+        :param submission_timeout: seconds a project summary waits on any one submission before leaving it out and
+        marking itself partial; waits indefinitely if not set
+        """
+        self.ingest_api = ingest_api
+        self.submission_summary_cache = SubmissionSummaryCache() if not submission_summary_cache else submission_summary_cache
+        self.project_concurrency = DEFAULT_ASYNC_PROJECT_CONCURRENCY if not project_concurrency else project_concurrency
+        self.submission_timeout = submission_timeout
+        self.project_summaries = ExpiringDict(MAX_PROJECT_SUMMARIES, ONE_DAY)
+        self.project_summaries_lock = threading.Lock()
+
+        self._in_flight = dict()
+        self._refreshes = set()
+
+    async def summary_for_submission(self, submission_resource) -> SubmissionSummary:
+        """
+        Given a submission resource, returns a detailed summary of the submission.
+
+        On a cache miss, concurrent requests for the same version of the submission share a single computation. If
+        the cached summary has expired but is within the cache's stale grace window, a copy of it marked as stale is
+        returned straight away and the summary is recomputed in a background task
+
+        :param submission_resource: the submission resource from the ingest API
+        :return: A SubmissionSummary for this submission
+        """
+        submission_uuid = SummaryService.uuid_from_submission(submission_resource)
+        flight_key = ('submission', submission_uuid, submission_resource['updateDate'])
+
+        try:
+            return await self._run_cache(self.submission_summary_cache.get, submission_uuid,
+                                         submission_resource['updateDate'])
+        except StaleCacheEntryException as stale_entry:
+            self._refresh(flight_key, submission_resource)
+
+            stale_summary = copy.copy(stale_entry.summary)
+            stale_summary.is_stale = True
+            return stale_summary
+        except CacheMissException:
+            return await self._single_flight(flight_key, self._summarise_submission, submission_resource)
+
+    async def encoded_summary_for_submission(self, submission_resource) -> EncodedSummary:
+        """
+        :param submission_resource: the submission resource from the ingest API
+        :return: the submission's summary encoded as JSON; a cached summary is only encoded once
+        """
+        submission_summary = await self.summary_for_submission(submission_resource)
+        return self.submission_summary_cache.encoded(SummaryService.uuid_from_submission(submission_resource),
+                                                     submission_summary, JSONSummaryUtil.encode_submission_summary)
+
+    async def summary_for_project(self, project_resource) -> ProjectSummary:
+        """
+        Given a project resource, returns the combined summary of all submissions in the project, maintained
+        incrementally as by SummaryService.summary_for_project
+
+        :param project_resource: the project resource from the ingest API
+        :return: a ProjectSummary for the project
+        """
+        if 'uuid' not in project_resource:
+            return await self._summarise_project(project_resource)
+
+        project_uuid = project_resource['uuid']['uuid']
+        return await self._single_flight(('project', project_uuid), self._summarise_project, project_resource)
+
+    async def encoded_summary_for_project(self, project_resource) -> EncodedSummary:
+        """
+        :param project_resource: the project resource from the ingest API
+        :return: the project's summary encoded as JSON, encoded only once for as long as the summary doesn't change.
+        It has no last modified date, as by SummaryService.encoded_summary_for_project
+        """
+        project_summary = await self.summary_for_project(project_resource)
+        incremental_summary = self.incremental_summary_for_project(project_resource)
+
+        def encode(summary):
+            return EncodedSummary(JSONSummaryUtil.encode(summary))
+
+        with incremental_summary.lock:
+            return incremental_summary.encoded_snapshot(project_summary, encode)
+
+    def incremental_summary_for_project(self, project_resource) -> IncrementalProjectSummary:
+        if 'uuid' not in project_resource:
+            return IncrementalProjectSummary()
+
+        project_uuid = project_resource['uuid']['uuid']
+        with self.project_summaries_lock:
+            incremental_summary = self.project_summaries.get(project_uuid)
+            if not incremental_summary:
+                incremental_summary = IncrementalProjectSummary()
+                self.project_summaries[project_uuid] = incremental_summary
+            return incremental_summary
+
+    async def _summarise_project(self, project_resource) -> ProjectSummary:
+        project_submissions = []
+        async for page in self.ingest_api.get_related_entities('submissionEnvelopes', project_resource,
+                                                               'submissionEnvelopes'):
+            project_submissions.extend(page)
+
+        incremental_summary = self.incremental_summary_for_project(project_resource)
+
+        with incremental_summary.lock:
+            changed_submissions = [submission for submission in project_submissions
+                                   if not incremental_summary.is_current(SummaryService.uuid_from_submission(submission),
+                                                                         submission['updateDate'])]
+
+        semaphore = asyncio.Semaphore(self.project_concurrency)
+
+        async def summarise(submission_resource):
+            async with semaphore:
+                return await self.summary_for_submission(submission_resource)
+
+        # shielded, so that a submission left out after the timeout is still summarised and cached in the background
+        summaries = [asyncio.ensure_future(summarise(submission)) for submission in changed_submissions]
+        results = await asyncio.gather(*[asyncio.wait_for(asyncio.shield(summary), self.submission_timeout)
+                                         for summary in summaries], return_exceptions=True)
+
+        left_out = set()
+        for (submission, result) in zip(changed_submissions, results):
+            if isinstance(result, asyncio.TimeoutError):
+                logger.warning('Summary of submission {0} timed out after {1}s, leaving it out of the project '
+                               'summary'.format(SummaryService.uuid_from_submission(submission),
+                                                self.submission_timeout))
+                left_out.add(SummaryService.uuid_from_submission(submission))
+            elif isinstance(result, BaseException):
+                raise result
+            else:
+                with incremental_summary.lock:
+                    incremental_summary.put_submission_summary(SummaryService.uuid_from_submission(submission),
+                                                               submission['updateDate'], result)
+
+        with incremental_summary.lock:
+            incremental_summary.retain_submissions([SummaryService.uuid_from_submission(submission)
+                                                    for submission in project_submissions])
+            incremental_summary.set_left_out(left_out)
+            return incremental_summary.snapshot()
+
+    async def _summarise_submission(self, submission_resource) -> SubmissionSummary:
+        submission_uuid = SummaryService.uuid_from_submission(submission_resource)
+        submission_uri = submission_resource['_links']['self']['href']
+
+        summary_builder = SubmissionSummaryBuilder(SubmissionScraper.from_file(SCRAPE_CONFIG_PATH))
+
+        async def fetch(entity_type):
+            async for page in self.ingest_api.get_entities(submission_uri, entity_type, ENTITY_PAGE_SIZE):
+                summary_builder.add_entities(entity_type, page)
+
+        await asyncio.gather(*[fetch(entity_type) for entity_type in ENTITY_TYPES])
+
+        submission_summary = summary_builder.build()
+        submission_summary.create_date = submission_resource['submissionDate']
+        submission_summary.last_updated_date = submission_resource['updateDate']
+        submission_summary.submission_status = submission_resource['submissionState']
+
+        await self._run_cache(self.submission_summary_cache.insert, submission_uuid, submission_summary,
+                              submission_resource['updateDate'], submission_resource['submissionState'])
+        return submission_summary
+
+    async def _run_cache(self, function, *args):
+        if self.submission_summary_cache.store is None:
+            return function(*args)
+
+        # the store unpickles, decompresses and may wait out SQLite's busy timeout, which would hold up the whole loop
+        return await asyncio.get_running_loop().run_in_executor(None, functools.partial(function, *args))
+
+    async def _single_flight(self, key, function, *args):
+        # the first caller for a key starts the computation as a task, and later callers await the same task
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(function(*args))
+            self._in_flight[key] = task
+            task.add_done_callback(lambda done: self._in_flight.pop(key) if self._in_flight.get(key) is done else None)
+
+        # shielded, so that one caller going away doesn't cancel the computation for the others
+        return await asyncio.shield(task)
+
+    def _refresh(self, key, submission_resource):
+        if key in self._refreshes:
+            return
+
+        def refreshed(task):
+            self._refreshes.discard(key)
+            if not task.cancelled() and task.exception():
+                logger.error('Background refresh of {0} failed'.format(key), exc_info=task.exception())
+
+        self._refreshes.add(key)
+        refresh = asyncio.ensure_future(self._single_flight(key, self._summarise_submission, submission_resource))
+        refresh.add_done_callback(refreshed)
+
+    def in_flight(self, key) -> bool:
+        return key in self._in_flight
@@ -0,0 +1,119 @@
+import json
+import logging
+
+from concurrent.futures import Executor, as_completed
+from typing import Generator, Iterable
+
+from broker.common.util.json_summary_util import JSONSummaryUtil
+from .summary_service import SummaryService
+from .exception.cache_miss_exception import CacheMissException
+from .exception.stale_cache_entry_exception import StaleCacheEntryException
+
+logger = logging.getLogger(__name__)
+
+
+class BatchResult:
+    """
+    The outcome of summarising one submission or project of a batch: its summary, encoded or not, or the error it
+    failed with
+    """
+
+    def __init__(self, summary_type, uuid, encoded_summary=None, error=None, summary=None):
+        self.summary_type = summary_type
+        self.uuid = uuid
+        self.encoded_summary = encoded_summary
+        self.error = error
+        self.summary = summary
+
+    def to_ndjson(self) -> bytes:
+        """
+        :return: the result as one line of JSON; the already encoded summary is embedded as is
+        """
+        line = '{{"type": {0}, "uuid": {1}'.format(json.dumps(self.summary_type), json.dumps(self.uuid)).encode('utf-8')
+        if self.error is not None:
+            return line + ', "error": {0}}}\n'.format(json.dumps(self.error)).encode('utf-8')
+        return line + b', "summary": ' + self.encoded_summary.body + b'}\n'
+
+
+class BatchSummarizer:
+    """
+    Summarises a batch of submissions and projects. Submission summaries already in the cache are returned straight
+    away, without looking the submission up, and the rest are computed on a shared, bounded executor and returned as
+    each completes. An item that fails is reported as a result with an error rather than failing the batch
+    """
+
+    def __init__(self, summary_service: SummaryService, executor: Executor):
+        """
+        :param summary_service: the service the summaries are cached by and computed with
+        :param executor: runs the lookups and summaries of cache misses; its workers bound the batch's parallelism
+        """
+        self.summary_service = summary_service
+        self.executor = executor
+
+    def summarize(self, submission_uuids: Iterable[str] = (), project_uuids: Iterable[str] = (), encoded=True) \
+            -> Generator[BatchResult, None, None]:
+        """
+        :param submission_uuids: uuids of the submissions to summarise
+        :param project_uuids: uuids of the projects to summarise
+        :param encoded: whether results carry the encoded summary, or the summary itself
+        :return: a generator of a BatchResult per distinct uuid, cached submissions first and then in order of
+        completion. Closing it cancels the summaries that haven't started
+        """
+        pending = dict()
+        try:
+            for submission_uuid in dict.fromkeys(submission_uuids):
+                cached_result = self._cached_submission_result(submission_uuid, encoded)
+                if cached_result:
+                    yield cached_result
+                else:
+                    pending[self.executor.submit(self._summarise_submission, submission_uuid, encoded)] = \
+                        ('submission', submission_uuid)
+
+            for project_uuid in dict.fromkeys(project_uuids):
+                pending[self.executor.submit(self._summarise_project, project_uuid, encoded)] = \
+                    ('project', project_uuid)
+
+            for future in as_completed(list(pending)):
+                (summary_type, uuid) = pending.pop(future)
+                try:
+                    yield self._result(summary_type, uuid, future.result(), encoded)
+                except Exception as e:
+                    logger.warning('Failed to summarise {0} {1} in a batch: {2}'.format(summary_type, uuid, e))
+                    yield BatchResult(summary_type, uuid, error=str(e))
+        finally:
+            for future in pending:
+                future.cancel()
+
+    @staticmethod
+    def _result(summary_type, uuid, summary, encoded) -> BatchResult:
+        if encoded:
+            return BatchResult(summary_type, uuid, encoded_summary=summary)
+        return BatchResult(summary_type, uuid, summary=summary)
+
+    def _cached_submission_result(self, submission_uuid, encoded):
+        submission_summary_cache = self.summary_service.submission_summary_cache
+        try:
+            # any version still within the cache's expiry is served, as looking up the current version would take a
+            # round trip to the ingest API
+            submission_summary = submission_summary_cache.get(submission_uuid)
+        except (CacheMissException, StaleCacheEntryException):
+            return None
+
+        if not encoded:
+            return BatchResult('submission', submission_uuid, summary=submission_summary)
+
+        encoded_summary = submission_summary_cache.encoded(submission_uuid, submission_summary,
+                                                           JSONSummaryUtil.encode_submission_summary)
+        return BatchResult('submission', submission_uuid, encoded_summary=encoded_summary)
+
+    def _summarise_submission(self, submission_uuid, encoded):
+        submission = self.summary_service.ingestapi.getSubmissionByUuid(submission_uuid)
+        if encoded:
+            return self.summary_service.encoded_summary_for_submission(submission)
+        return self.summary_service.summary_for_submission(submission)
+
+    def _summarise_project(self, project_uuid, encoded):
+        project = self.summary_service.ingestapi.getProjectByUuid(project_uuid)
+        if encoded:
+            return self.summary_service.encoded_summary_for_project(project)
+        return self.summary_service.summary_for_project(project)
@@ -0,0 +1,138 @@
+import logging
+import threading
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+from queue import Queue, Full
+from typing import Callable, Iterable, Iterator
+
+ENTITY_TYPES = ['biomaterials', 'projects', 'processes', 'protocols', 'files']
+ENTITY_PAGE_SIZE = 1000
+DEFAULT_FETCH_CONCURRENCY = len(ENTITY_TYPES)
+
+_END_OF_STREAM = object()
+
+logger = logging.getLogger(__name__)
+
+
+class FetchTimings:
+    """
+    Latency of fetching each entity type of a submission, alongside the wall-clock time of the whole fetch. With
+    concurrent fetching the wall-clock time should approach the slowest type rather than the sum of all types
+    """
+
+    def __init__(self):
+        self.per_type = dict()
+        self.wall_clock = 0.0
+
+    @property
+    def summed(self) -> float:
+        return sum(self.per_type.values())
+
+    def __str__(self):
+        per_type = ', '.join('{0}={1:.3f}s'.format(entity_type, elapsed)
+                             for (entity_type, elapsed) in self.per_type.items())
+        return 'wall-clock={0:.3f}s, summed={1:.3f}s ({2})'.format(self.wall_clock, self.summed, per_type)
+
+
+class _PrefetchError:
+    def __init__(self, error):
+        self.error = error
+
+
+def prefetch(entities: Iterable, buffer_size: int) -> Iterator:
+    """
+    Iterates over entities, pulling up to buffer_size entities ahead on a background thread so the next page is
+    being fetched while the current one is processed
+
+    :param entities: an iterable of entities, typically a paginated generator from the ingest API
+    :param buffer_size: max number of entities held ahead of the consumer
+    :return: an iterator over the same entities
+    """
+    buffer = Queue(maxsize=buffer_size)
+    stopped = threading.Event()
+
+    def offer(item):
+        while not stopped.is_set():
+            try:
+                buffer.put(item, timeout=0.1)
+                return True
+            except Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for entity in entities:
+                if not offer(entity):
+                    return
+            offer(_END_OF_STREAM)
+        except Exception as e:
+            offer(_PrefetchError(e))
+
+    producer = threading.Thread(target=produce, daemon=True)
+    producer.start()
+
+    try:
+        while True:
+            item = buffer.get()
+            if item is _END_OF_STREAM:
+                return
+            elif isinstance(item, _PrefetchError):
+                raise item.error
+            else:
+                yield item
+    finally:
+        stopped.set()
+
+
+class EntityFetcher:
+    """
+    Fetches every entity type of a submission and hands each type's entities to a consumer. Entity types are fetched
+    on a bounded pool of workers, and each worker prefetches a page ahead of its consumer
+    """
+
+    def __init__(self, get_entities: Callable[[str, str], Iterable[dict]], concurrency=None, prefetch_size=None):
+        """
+        :param get_entities: function taking (submission_uri, entity_type) and returning that type's entities
+        :param concurrency: max number of entity types fetched at once; 1 fetches the types one after another
+        :param prefetch_size: max number of entities buffered ahead of a consumer, defaults to a page
+        """
+        self.get_entities = get_entities
+        self.concurrency = DEFAULT_FETCH_CONCURRENCY if not concurrency else concurrency
+        self.prefetch_size = ENTITY_PAGE_SIZE if not prefetch_size else prefetch_size
+
+    def fetch_all(self, submission_uri, consumer: Callable[[str, Iterable[dict]], object], entity_types=None):
+        """
+        Fetches all entity types of a submission, calling consumer(entity_type, entities) once per type
+
+        :param submission_uri: URI of the submission envelope
+        :param consumer: called with the entity type and an iterable over its entities; must be thread-safe when
+        fetching concurrently
+        :param entity_types: the entity types to fetch, defaults to all types in a submission
+        :return: a tuple of a dict of entity type to consumer result, and the FetchTimings of the fetch
+        """
+        entity_types = ENTITY_TYPES if not entity_types else entity_types
+        timings = FetchTimings()
+
+        def fetch(entity_type):
+            start = time.perf_counter()
+            entities = self.get_entities(submission_uri, entity_type)
+            if self.concurrency > 1:
+                entities = prefetch(entities, self.prefetch_size)
+
+            result = consumer(entity_type, entities)
+            timings.per_type[entity_type] = time.perf_counter() - start
+            return result
+
+        start = time.perf_counter()
+        if self.concurrency > 1:
+            with ThreadPoolExecutor(max_workers=min(self.concurrency, len(entity_types))) as executor:
+                futures = [(entity_type, executor.submit(fetch, entity_type)) for entity_type in entity_types]
+                results = {entity_type: future.result() for (entity_type, future) in futures}
+        else:
+            results = {entity_type: fetch(entity_type) for entity_type in entity_types}
+        timings.wall_clock = time.perf_counter() - start
+
+        logger.info('Fetched entities in {0}: {1}'.format(submission_uri, timings))
+        return results, timings
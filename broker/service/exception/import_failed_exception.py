@@ -0,0 +1,14 @@
+class ImportFailedException(Exception):
+    """
+    A failed import, carrying the formatted traceback of the original error, which may not itself be picklable back
+    from a worker process, and the trace of the import up to the failure
+    """
+
+    def __init__(self, submission_url, details, trace=None):
+        super(ImportFailedException, self).__init__('Import into {0} failed'.format(submission_url))
+        self.submission_url = submission_url
+        self.details = details
+        self.trace = trace
+
+    def __reduce__(self):
+        return ImportFailedException, (self.submission_url, self.details, self.trace)
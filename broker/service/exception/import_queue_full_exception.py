@@ -0,0 +1,9 @@
+class ImportQueueFullException(Exception):
+    """
+    Raised when no more imports can be accepted until some of those running or queued are done
+    """
+
+    def __init__(self, retry_after):
+        super(ImportQueueFullException, self).__init__(
+            'Too many spreadsheets are being imported, retry in {0} seconds'.format(retry_after))
+        self.retry_after = retry_after
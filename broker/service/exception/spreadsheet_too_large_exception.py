@@ -0,0 +1,6 @@
+class SpreadsheetTooLargeException(Exception):
+
+    def __init__(self, max_size):
+        super(SpreadsheetTooLargeException, self).__init__(
+            'Spreadsheets can be at most {0} bytes'.format(max_size))
+        self.max_size = max_size
@@ -0,0 +1,12 @@
+from .cache_miss_exception import CacheMissException
+
+
+class StaleCacheEntryException(CacheMissException):
+    """
+    A cache miss for an entry that has expired but is still within its grace window, so may be served while it is
+    refreshed
+    """
+
+    def __init__(self, key, summary):
+        super(StaleCacheEntryException, self).__init__(key)
+        self.summary = summary
@@ -0,0 +1,159 @@
+import logging
+import multiprocessing
+import os
+import threading
+
+from concurrent.futures import Executor, ThreadPoolExecutor, ProcessPoolExecutor, Future
+from functools import partial
+
+from .exception.import_queue_full_exception import ImportQueueFullException
+
+DEFAULT_IMPORT_WORKERS = 2
+DEFAULT_MAX_QUEUED_IMPORTS = 20
+DEFAULT_RETRY_AFTER = 30  # seconds
+
+logger = logging.getLogger(__name__)
+
+
+class ImportReservation:
+    """
+    A place held for an import in an ImportScheduler, taken before any work is done for the import so that an upload
+    can be turned away before a submission is created for it. The place is given back when the import is done, or
+    when the reservation is cancelled without being used
+    """
+
+    def __init__(self, scheduler: 'ImportScheduler'):
+        self._scheduler = scheduler
+        self._lock = threading.Lock()
+        self._held = True
+
+    def submit(self, job_id, function, *args, **kwargs) -> Future:
+        """
+        :param job_id: identifies the import in logs, e.g the submission URL
+        :param function: runs the import
+        :return: future of the import's result
+        """
+        with self._lock:
+            if not self._held:
+                raise RuntimeError('Reservation for import {0} was already used or cancelled'.format(job_id))
+            self._held = False
+
+        try:
+            future = self._scheduler.executor.submit(function, *args, **kwargs)
+        except BaseException:
+            self._scheduler.release()
+            raise
+
+        future.add_done_callback(partial(self._scheduler.import_done, job_id))
+        return future
+
+    def cancel(self):
+        """
+        gives back the reserved place, unless an import was already submitted with it
+        """
+        with self._lock:
+            was_held = self._held
+            self._held = False
+
+        if was_held:
+            self._scheduler.release()
+
+
+class ImportScheduler:
+    """
+    Runs spreadsheet imports on a bounded pool of workers, with a bounded number of imports waiting for a worker.
+
+    Once as many imports are running and queued as allowed, reserve raises an ImportQueueFullException telling the
+    uploader when to retry, rather than starting ever more imports that all slow down together.
+
+    Imports run on threads by default. As parsing spreadsheets is CPU bound, they can instead run in worker processes,
+    so that they use every core and don't hold the web process's GIL; imports are then given only picklable arguments.
+
+    The pool of workers is created on first use in each process. A scheduler created before the process forks, e.g by
+    an app preloaded by gunicorn, then gets a pool of its own in each forked worker, rather than all of them sharing
+    the queues and pipes of a single process pool and taking each other's imports and results
+    """
+
+    def __init__(self, max_workers=None, max_queue=None, retry_after=None, use_processes=False):
+        """
+        :param max_workers: max number of imports run at once
+        :param max_queue: max number of imports waiting for a worker
+        :param retry_after: seconds an uploader turned away is told to wait before retrying
+        :param use_processes: whether to run imports in worker processes rather than threads
+        """
+        self.max_workers = DEFAULT_IMPORT_WORKERS if not max_workers else max_workers
+        self.max_queue = DEFAULT_MAX_QUEUED_IMPORTS if max_queue is None else max_queue
+        self.retry_after = DEFAULT_RETRY_AFTER if not retry_after else retry_after
+        self.use_processes = use_processes
+
+        self._lock = threading.Lock()
+        self._reserved = 0
+        self._executor = None
+        self._executor_pid = None
+
+    @property
+    def executor(self) -> Executor:
+        """
+        :return: the pool imports run on, created on first use in the current process
+        """
+        with self._lock:
+            if self._executor is None or self._executor_pid != os.getpid():
+                self._executor = self._create_executor()
+                self._executor_pid = os.getpid()
+            return self._executor
+
+    def _create_executor(self) -> Executor:
+        if self.use_processes:
+            # workers are spawned rather than forked, as forking a process running threads can deadlock the child
+            return ProcessPoolExecutor(max_workers=self.max_workers, mp_context=multiprocessing.get_context('spawn'))
+        return ThreadPoolExecutor(max_workers=self.max_workers)
+
+    def reserve(self) -> ImportReservation:
+        """
+        :return: a reservation to submit an import with
+        :raises ImportQueueFullException: if as many imports as allowed are already running or queued
+        """
+        with self._lock:
+            if self._reserved >= self.max_workers + self.max_queue:
+                raise ImportQueueFullException(self.retry_after)
+            self._reserved += 1
+
+        return ImportReservation(self)
+
+    def submit(self, job_id, function, *args, **kwargs) -> Future:
+        """
+        reserves a place for an import and submits it
+        :raises ImportQueueFullException: if as many imports as allowed are already running or queued
+        """
+        return self.reserve().submit(job_id, function, *args, **kwargs)
+
+    def import_done(self, job_id, future: Future):
+        self.release()
+        if future.cancelled() or not future.exception():
+            return
+
+        error = future.exception()
+        message = 'Import {0} failed'.format(job_id)
+        # errors from worker processes carry the traceback of the original error in the worker
+        if getattr(error, 'details', None):
+            message += ':\n' + error.details
+        logger.error(message, exc_info=error)
+
+    def release(self):
+        with self._lock:
+            self._reserved -= 1
+
+    def pending(self) -> int:
+        """
+        :return: the number of imports reserved, queued or running
+        """
+        with self._lock:
+            return self._reserved
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            # a pool inherited from the parent process isn't this process's to shut down
+            executor = self._executor if self._executor_pid == os.getpid() else None
+
+        if executor:
+            executor.shutdown(wait=wait)
@@ -0,0 +1,194 @@
+import functools
+import os
+import threading
+import time
+import tracemalloc
+
+from collections import Counter, deque
+from contextlib import contextmanager
+
+MAX_IMPORT_TRACES = 200
+
+# tracing memory slows down allocation heavy code such as parsing spreadsheets, so is only done on demand
+TRACE_MEMORY = os.environ.get('IMPORT_TRACE_MEMORY', 'false').lower() == 'true'
+
+# the CPU time of the phase's thread where available (Python 3.7+ on most platforms), otherwise of the whole process
+_cpu_time = getattr(time, 'thread_time', time.process_time)
+
+
+class PhaseTrace:
+
+    def __init__(self, name, wall_time, cpu_time, peak_memory=None):
+        """
+        :param name: name of the phase, e.g parse
+        :param wall_time: seconds the phase took
+        :param cpu_time: seconds of CPU time the phase's thread used
+        :param peak_memory: peak bytes allocated during the phase over what was allocated before it, if traced
+        """
+        self.name = name
+        self.wall_time = wall_time
+        self.cpu_time = cpu_time
+        self.peak_memory = peak_memory
+
+    def to_dict(self) -> dict:
+        return {
+            'name': self.name,
+            'wall_time': self.wall_time,
+            'cpu_time': self.cpu_time,
+            'peak_memory': self.peak_memory
+        }
+
+
+class ImportTrace:
+    """
+    The time, CPU time and, optionally, peak memory taken by each phase of a spreadsheet import (saving the upload,
+    checking the project, creating the submission, counting the spreadsheet's rows, parsing the spreadsheet and
+    submitting its entities), along with the number of rows in each worksheet and of entities submitted.
+
+    Memory is traced with tracemalloc, which counts the allocations of every thread of the process, so the peak of a
+    phase is approximate when imports overlap in the same process
+    """
+
+    def __init__(self, filename=None, trace_memory=None):
+        self.filename = filename
+        self.submission_url = None
+        self.row_counts = dict()
+        self.entity_count = None
+        self.phases = []
+        self.started_at = time.time()
+        self.error = None
+        self.trace_memory = TRACE_MEMORY if trace_memory is None else trace_memory
+
+    @contextmanager
+    def phase(self, name):
+        if self.trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            (memory_before, _) = tracemalloc.get_traced_memory()
+            if hasattr(tracemalloc, 'reset_peak'):
+                tracemalloc.reset_peak()
+
+        wall_start = time.perf_counter()
+        cpu_start = _cpu_time()
+        try:
+            yield
+        finally:
+            peak_memory = None
+            if self.trace_memory and tracemalloc.is_tracing():
+                (_, peak) = tracemalloc.get_traced_memory()
+                peak_memory = max(peak - memory_before, 0)
+
+            self.phases.append(PhaseTrace(name, time.perf_counter() - wall_start, _cpu_time() - cpu_start,
+                                          peak_memory))
+
+    def split_phase(self, name, wall_time, cpu_time):
+        """
+        moves time spent within the last phase into a phase of its own, e.g the time a parse phase spent waiting on
+        the ingest API; the peak memory stays with the last phase
+        """
+        last_phase = self.phases[-1]
+        last_phase.wall_time = max(last_phase.wall_time - wall_time, 0)
+        last_phase.cpu_time = max(last_phase.cpu_time - cpu_time, 0)
+        self.phases.append(PhaseTrace(name, wall_time, cpu_time))
+
+    def add_phases(self, trace: 'ImportTrace'):
+        """
+        adds the phases and counts traced for another part of the same import, e.g in a worker process
+        """
+        self.phases.extend(trace.phases)
+        self.row_counts.update(trace.row_counts)
+        if trace.entity_count is not None:
+            self.entity_count = trace.entity_count
+
+    @property
+    def wall_time(self) -> float:
+        return sum(phase.wall_time for phase in self.phases)
+
+    def to_dict(self) -> dict:
+        return {
+            'submission_url': self.submission_url,
+            'filename': self.filename,
+            'started_at': self.started_at,
+            'wall_time': self.wall_time,
+            'row_counts': self.row_counts,
+            'row_count': sum(self.row_counts.values()),
+            'entity_count': self.entity_count,
+            'error': self.error,
+            'phases': [phase.to_dict() for phase in self.phases]
+        }
+
+
+class TimedCalls:
+    """
+    Passes attribute lookups and calls through to an object, e.g an ingest client, adding up the time and CPU time spent
+    in the calls of methods with any of the given prefixes, and how often each was called. Only the calls made through
+    the proxy are timed, not those the object makes to itself
+    """
+
+    def __init__(self, target, method_prefixes):
+        """
+        :param target: the object to pass calls through to
+        :param method_prefixes: prefixes of the names of the methods to time, e.g create
+        """
+        self.target = target
+        self.method_prefixes = tuple(method_prefixes)
+        self.wall_time = 0
+        self.cpu_time = 0
+        self.calls = Counter()
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name):
+        attribute = getattr(self.target, name)
+        if not callable(attribute) or not name.startswith(self.method_prefixes):
+            return attribute
+
+        @functools.wraps(attribute)
+        def timed_call(*args, **kwargs):
+            wall_start = time.perf_counter()
+            cpu_start = _cpu_time()
+            try:
+                return attribute(*args, **kwargs)
+            finally:
+                with self._lock:
+                    self.wall_time += time.perf_counter() - wall_start
+                    self.cpu_time += _cpu_time() - cpu_start
+                    self.calls[name] += 1
+
+        return timed_call
+
+    def call_count(self, method_prefix) -> int:
+        """
+        :return: the number of timed calls of methods with the prefix
+        """
+        with self._lock:
+            return sum(count for (name, count) in self.calls.items() if name.startswith(method_prefix))
+
+
+class ImportTraceHistory:
+    """
+    The traces of the most recent imports
+    """
+
+    def __init__(self, max_traces=None):
+        self.max_traces = MAX_IMPORT_TRACES if not max_traces else max_traces
+        self._traces = deque(maxlen=self.max_traces)
+        self._lock = threading.Lock()
+
+    def record(self, trace: ImportTrace):
+        with self._lock:
+            self._traces.append(trace)
+
+    def recent(self, limit=None) -> list:
+        """
+        :return: the most recent traces, most recent first
+        """
+        with self._lock:
+            traces = list(reversed(self._traces))
+        return traces[:limit] if limit else traces
+
+    def slowest(self, limit=None) -> list:
+        """
+        :return: the recent traces of the imports that took longest, slowest first
+        """
+        traces = sorted(self.recent(), key=lambda trace: trace.wall_time, reverse=True)
+        return traces[:limit] if limit else traces
@@ -0,0 +1,48 @@
+import threading
+
+from ingest.api.ingestapi import IngestApi
+
+
+class IngestClientFactory:
+    """
+    Hands out Ingest API clients sharing the API's root links, which are discovered once, on first use, rather than
+    by every new client.
+
+    Anonymous calls share a single client. Authenticated calls get a client of their own for the token, as the token
+    is held by the client, but it is built from the shared root links without discovering them again
+    """
+
+    def __init__(self, url=None):
+        """
+        :param url: URL of the Ingest API; taken from the INGEST_API environment variable by the client if not given
+        """
+        self.url = url
+        self._client = None
+        self._lock = threading.Lock()
+
+    def client(self) -> IngestApi:
+        """
+        :return: the shared anonymous client
+        """
+        with self._lock:
+            if self._client is None:
+                # discovery failing leaves no client, so that the next call tries again
+                self._client = IngestApi(self.url)
+            return self._client
+
+    def client_for_token(self, token) -> IngestApi:
+        """
+        :param token: the authorization token to make calls with
+        :return: a new client for the token, sharing the root links of the shared client
+        """
+        shared_client = self.client()
+        token_client = IngestApi(shared_client.url, ingest_api_root=shared_client.ingest_api_root)
+        token_client.set_token(token)
+        return token_client
+
+    def reset(self):
+        """
+        drops the shared client, so that the root links are discovered again on next use
+        """
+        with self._lock:
+            self._client = None
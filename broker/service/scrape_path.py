@@ -0,0 +1,93 @@
+import re
+
+from typing import Callable, List
+from jsonpath_rw import parse
+
+# a path segment is a field name optionally followed by any number of [*] wildcards, e.g organ or genus_species[*]
+_SEGMENT = re.compile(r'^([A-Za-z_][A-Za-z0-9_\-]*)((?:\[\*\])*)$')
+_RESERVED_WORDS = {'where'}
+
+
+def _field_step(field):
+    def step(values):
+        found = []
+        for value in values:
+            if isinstance(value, dict) and field in value:
+                found.append(value[field])
+        return found
+
+    return step
+
+
+def _wildcard_step(values):
+    # as in jsonpath_rw, a wildcard over a dict, string or number treats it as a single-element list
+    found = []
+    for value in values:
+        if isinstance(value, list):
+            found.extend(value)
+        elif isinstance(value, (dict, int, str)):
+            found.append(value)
+    return found
+
+
+def _parse_segments(path):
+    segments = []
+    for segment in path.split('.'):
+        match = _SEGMENT.match(segment)
+        if not match or match.group(1) in _RESERVED_WORDS:
+            return None
+
+        segments.append((match.group(1), segment.count('[*]')))
+    return segments
+
+
+def _compile_field_lookup(fields):
+    # without wildcards a path matches at most one value, so it can be followed without building lists at each step
+    def find(document):
+        value = document
+        for field in fields:
+            if isinstance(value, dict) and field in value:
+                value = value[field]
+            else:
+                return []
+        return [value]
+
+    return find
+
+
+def _compile_steps(segments):
+    steps = []
+    for (field, wildcards) in segments:
+        steps.append(_field_step(field))
+        steps.extend([_wildcard_step] * wildcards)
+
+    def find(document):
+        values = [document]
+        for step in steps:
+            if not values:
+                break
+            values = step(values)
+        return values
+
+    return find
+
+
+def compile_path(path: str) -> Callable[[dict], List]:
+    """
+    Compiles a jsonpath into a function returning the values matching the path in a JSON document.
+
+    Dotted field paths with [*] wildcards (e.g project_core.project_title, selected_cell_type[*].text) are compiled
+    into plain dict and list lookups; any other jsonpath syntax falls back to jsonpath_rw
+
+    :param path: a jsonpath expression
+    :return: function taking a JSON document and returning a list of matching values
+    """
+    segments = _parse_segments(path)
+
+    if segments is None:
+        parser = parse(path)
+        return lambda document: [match.value for match in parser.find(document)]
+    elif not any(wildcards for (field, wildcards) in segments):
+        return _compile_field_lookup([field for (field, wildcards) in segments])
+    else:
+        return _compile_steps(segments)
@@ -0,0 +1,87 @@
+import logging
+import traceback
+
+import openpyxl
+
+from ingest.importer.importer import XlsImporter
+
+from .import_trace import ImportTrace, TimedCalls
+from .ingest_client_factory import IngestClientFactory
+from .exception.import_failed_exception import ImportFailedException
+
+# the ingest client methods submitting the entities of a spreadsheet, whose calls make up the submit phase of an import
+SUBMIT_METHOD_PREFIXES = ('create', 'link')
+# the data rows of the HCA metadata spreadsheet templates start below their header rows
+FIRST_DATA_ROW = 6
+
+# a worker process discovers the Ingest API's root links once, for all the imports it runs
+ingest_clients = IngestClientFactory()
+
+logger = logging.getLogger(__name__)
+
+
+def import_spreadsheet(ingest_api, path, submission_url, project_uuid=None) -> ImportTrace:
+    """
+    Imports a spreadsheet into a submission with XlsImporter.import_file. The time spent in the ingest client's calls
+    submitting entities is traced as the submit phase, and the rest of the import as the parse phase. The spreadsheet's
+    rows are counted first, in a phase of their own
+    :param ingest_api: client authorised to submit to the submission
+    :param path: path of the uploaded spreadsheet
+    :param submission_url: URL of the submission to import into
+    :param project_uuid: uuid of the existing project the spreadsheet is for, if any
+    :return: the trace of the import, with the number of rows in each worksheet and of entities submitted
+    :raises ImportFailedException: if the import fails
+    """
+    trace = ImportTrace()
+    trace.submission_url = submission_url
+    with trace.phase('count_rows'):
+        try:
+            trace.row_counts = count_spreadsheet_rows(path)
+        except Exception:
+            # the import reports whatever is wrong with the spreadsheet
+            logger.warning('Failed to count the rows of {0}'.format(path), exc_info=True)
+
+    submit_calls = TimedCalls(ingest_api, SUBMIT_METHOD_PREFIXES)
+    try:
+        with trace.phase('parse'):
+            XlsImporter(submit_calls).import_file(path, submission_url, project_uuid)
+    except Exception:
+        raise ImportFailedException(submission_url, traceback.format_exc(), trace) from None
+    finally:
+        trace.split_phase('submit', submit_calls.wall_time, submit_calls.cpu_time)
+        trace.entity_count = submit_calls.call_count('create')
+
+    return trace
+
+
+def count_spreadsheet_rows(path) -> dict:
+    """
+    :param path: path of the spreadsheet
+    :return: the number of non-empty data rows in each worksheet, read a row at a time
+    """
+    workbook = openpyxl.load_workbook(path, read_only=True)
+    try:
+        return {worksheet.title: sum(1 for row in worksheet.iter_rows(min_row=FIRST_DATA_ROW)
+                                     if any(cell.value not in (None, '') for cell in row))
+                for worksheet in workbook.worksheets}
+    finally:
+        workbook.close()
+
+
+def run_import(path, submission_url, project_uuid, token) -> ImportTrace:
+    """
+    Imports a spreadsheet into a submission with a client of its own, so that it can run in a worker process given
+    nothing but picklable arguments
+    :param path: path of the uploaded spreadsheet
+    :param submission_url: URL of the submission to import into
+    :param project_uuid: uuid of the existing project the spreadsheet is for, if any
+    :param token: the uploader's authorization token
+    :return: the trace of the import
+    :raises ImportFailedException: if the import fails
+    """
+    try:
+        ingest_api = ingest_clients.client_for_token(token)
+    except Exception:
+        raise ImportFailedException(submission_url, traceback.format_exc()) from None
+
+    return import_spreadsheet(ingest_api, path, submission_url, project_uuid)
@@ -0,0 +1,112 @@
+import hashlib
+import os
+import tempfile
+import threading
+
+from expiringdict import ExpiringDict
+from werkzeug.utils import secure_filename
+
+from .exception.spreadsheet_too_large_exception import SpreadsheetTooLargeException
+
+MAX_RECENT_UPLOADS = 1000
+
+
+class SpreadsheetUpload:
+    """
+    A spreadsheet being uploaded, streamed into its own temporary file and hashed as it is written, so that
+    concurrent uploads of files with the same name never collide and the upload is never buffered in memory.
+
+    An upload is discarded unless claimed, after which whoever claimed it is responsible for removing the file
+    """
+
+    def __init__(self, filename=None, directory=None, max_size=None):
+        """
+        :param filename: name of the uploaded file, kept at the end of the temporary file's name
+        :param directory: directory to write the upload to; the system's temporary directory if not given
+        :param max_size: max size of the upload in bytes; writing more discards it and raises a
+        SpreadsheetTooLargeException
+        """
+        self.filename = secure_filename(filename) if filename else ''
+        (file_descriptor, self.path) = tempfile.mkstemp(prefix='spreadsheet_', suffix='_' + self.filename,
+                                                        dir=directory)
+        self.file = os.fdopen(file_descriptor, 'w+b')
+        self.max_size = max_size
+        self.size = 0
+        self.claimed = False
+        self._sha256 = hashlib.sha256()
+
+    def write(self, data):
+        self.size += len(data)
+        if self.max_size is not None and self.size > self.max_size:
+            self.discard()
+            raise SpreadsheetTooLargeException(self.max_size)
+
+        self._sha256.update(data)
+        return self.file.write(data)
+
+    @property
+    def sha256(self) -> str:
+        return self._sha256.hexdigest()
+
+    def claim(self) -> str:
+        """
+        takes ownership of the complete upload, so that it is no longer discarded once the request is over
+        :return: the path of the upload, which the caller must remove once done with it
+        """
+        self.file.close()
+        self.claimed = True
+        return self.path
+
+    def discard(self):
+        self.file.close()
+        remove_spreadsheet(self.path)
+
+    def __getattr__(self, name):
+        # read, seek, etc. as the file being written to
+        return getattr(self.file, name)
+
+
+class RecentUploads:
+    """
+    The submissions recently created for uploaded spreadsheets, by a key identifying the upload (e.g the hash of the
+    spreadsheet, the uploader's token and the project), so that byte-identical re-uploads within the window can be
+    answered with the submission already created for them
+    """
+
+    def __init__(self, window):
+        """
+        :param window: seconds during which an upload counts as a re-upload; 0 disables the detection
+        """
+        self.window = window
+        self._submission_urls = ExpiringDict(MAX_RECENT_UPLOADS, window) if window else None
+        self._lock = threading.Lock()
+
+    def get(self, upload_key):
+        """
+        :return: the URL of the submission recently created for the upload, or None
+        """
+        if self._submission_urls is None:
+            return None
+
+        with self._lock:
+            return self._submission_urls.get(upload_key)
+
+    def register(self, upload_key, submission_url):
+        if self._submission_urls is not None:
+            with self._lock:
+                self._submission_urls[upload_key] = submission_url
+
+    def forget(self, upload_key):
+        """
+        forgets an upload, e.g because importing it failed so it should be imported again if re-uploaded
+        """
+        if self._submission_urls is not None:
+            with self._lock:
+                self._submission_urls.pop(upload_key, None)
+
+
+def remove_spreadsheet(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
@@ -1,23 +1,175 @@
-from expiringdict import ExpiringDict
+import logging
+import sqlite3
+import threading
+import time
+
+from collections import OrderedDict
 from .exception.cache_miss_exception import CacheMissException
+from .exception.stale_cache_entry_exception import StaleCacheEntryException
 
 FIVE_MINUTES = 60 * 5
 MAX_CACHE_SIZE = 10000
 
+# submissions in these states no longer change, so their summaries are kept until evicted
+TERMINAL_STATES = {'Submitted', 'Complete'}
+
+logger = logging.getLogger(__name__)
+
+
+class CacheEntry:
+    def __init__(self, summary, version, expires_at):
+        self.summary = summary
+        self.version = version
+        self.expires_at = expires_at
+        self.encoded = None
+
+    def has_expired(self, now, grace=0) -> bool:
+        return self.expires_at is not None and now >= self.expires_at + grace
+
 
 class SubmissionSummaryCache:
+    """
+    LRU cache of submission summaries, versioned by the submission's update date.
+
+    A summary cached for one version of a submission is invalidated as soon as it is looked up with another. Summaries
+    of submissions in a terminal state are kept until evicted, others expire after the expiry time.
 
-    def __init__(self, cache_size=None, expiry=None):
+    If given a persistent store, summaries are written through to it and summaries missing from memory are looked up
+    in it before counting as a miss.
+
+    If given a stale grace window, an expired summary is kept for that much longer, and looking it up raises a
+    StaleCacheEntryException carrying the summary, so that it can be served while it is recomputed
+    """
+
+    def __init__(self, cache_size=None, expiry=None, store=None, stale_grace=None):
+        """
+        :param cache_size: max number of summaries held in memory
+        :param expiry: seconds until the summary of a submission that isn't in a terminal state expires
+        :param store: optional SubmissionSummaryStore backing the in-memory cache
+        :param stale_grace: seconds after expiry during which a summary may still be served as stale
+        """
         self.cache_size = MAX_CACHE_SIZE if not cache_size else cache_size
         self.expiry = FIVE_MINUTES if not expiry else expiry
+        self.store = store
+        self.stale_grace = 0 if not stale_grace else stale_grace
+
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.stale_hits = 0
+        self.store_hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, uuid, version=None):
+        """
+        :param uuid: uuid of the submission
+        :param version: the submission's current version (update date); a summary cached for any other version is
+        invalidated. If not given, any cached version is returned
+        :return: the cached summary
+        :raises StaleCacheEntryException: if the cached summary has expired but is within the stale grace window
+        :raises CacheMissException: if no current summary is cached
+        """
+        with self._lock:
+            entry = self._cache.get(uuid)
+            now = time.monotonic()
+
+            if entry and version is not None and entry.version != version:
+                del self._cache[uuid]
+                self.invalidations += 1
+                entry = None
+            elif entry and entry.has_expired(now, self.stale_grace):
+                del self._cache[uuid]
+                entry = None
+            elif entry and entry.has_expired(now):
+                self.stale_hits += 1
+                raise StaleCacheEntryException(uuid, entry.summary)
 
-        self._cache = ExpiringDict(self.cache_size, self.expiry)
+            if entry:
+                self._cache.move_to_end(uuid)
+                self.hits += 1
+                return entry.summary
+
+        summary = self._get_from_store(uuid, version)
+
+        with self._lock:
+            if summary is None:
+                self.misses += 1
+                raise CacheMissException(uuid)
+
+            self.store_hits += 1
+            return summary
+
+    def _get_from_store(self, uuid, version):
+        if not self.store:
+            return None
 
-    def get(self, uuid):
         try:
-            return self._cache[uuid]
-        except KeyError:
-            raise CacheMissException(uuid)
+            (summary, stored_version, expires_at) = self.store.get(uuid, version)
+        except CacheMissException:
+            return None
+        except sqlite3.Error:
+            logger.exception('Failed to read summary of submission {0} from the store'.format(uuid))
+            return None
+
+        # the store keeps wall-clock expiry times, as they are shared between processes
+        monotonic_expires_at = None if expires_at is None else time.monotonic() + (expires_at - time.time())
+        self._put(uuid, CacheEntry(summary, stored_version, monotonic_expires_at))
+        return summary
+
+    def insert(self, uuid, summary, version=None, state=None):
+        """
+        :param uuid: uuid of the submission
+        :param summary: the submission's summary
+        :param version: the version (update date) of the submission the summary was computed from
+        :param state: the submission's state; summaries of submissions in a terminal state don't expire
+        """
+        expires_at = None if state in TERMINAL_STATES else time.monotonic() + self.expiry
+        self._put(uuid, CacheEntry(summary, version, expires_at))
+
+        if self.store:
+            try:
+                self.store.put(uuid, summary, version, None if expires_at is None else time.time() + self.expiry)
+            except sqlite3.Error:
+                logger.exception('Failed to write summary of submission {0} to the store'.format(uuid))
+
+    def encoded(self, uuid, summary, encode):
+        """
+        Encodes a summary once and keeps the encoding next to it, so that later hits on the same cached summary are
+        served without encoding it again
+        :param uuid: uuid of the submission
+        :param summary: a summary returned by get or inserted; any other summary, e.g a stale copy, is just encoded
+        :param encode: function encoding a summary, e.g as bytes
+        :return: the encoded summary
+        """
+        with self._lock:
+            entry = self._cache.get(uuid)
+            if entry and entry.summary is summary and entry.encoded is not None:
+                return entry.encoded
+
+        encoded = encode(summary)
+
+        with self._lock:
+            if entry and entry.summary is summary:
+                entry.encoded = encoded
+        return encoded
+
+    def _put(self, uuid, entry: CacheEntry):
+        with self._lock:
+            self._cache[uuid] = entry
+            self._cache.move_to_end(uuid)
+
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
 
-    def insert(self, uuid, summary):
-        self._cache[uuid] = summary
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'size': len(self._cache),
+                'hits': self.hits,
+                'stale_hits': self.stale_hits,
+                'store_hits': self.store_hits,
+                'misses': self.misses,
+                'invalidations': self.invalidations
+            }
@@ -0,0 +1,121 @@
+import logging
+import os
+import pickle
+import sqlite3
+import threading
+import time
+import zlib
+
+from .exception.cache_miss_exception import CacheMissException
+
+DEFAULT_BUSY_TIMEOUT = 10  # seconds
+
+UNCOMPRESSED = 0
+ZLIB_COMPRESSED = 1
+
+logger = logging.getLogger(__name__)
+
+
+class SubmissionSummaryStore:
+    """
+    Persistent store of submission summaries in a local SQLite file, so that summaries survive restarts and are shared
+    between the broker processes on a host.
+
+    The database runs in WAL mode so that readers never block the writer, and each thread of each process opens its
+    own connection. Summaries are stored pickled and, optionally, zlib compressed
+    """
+
+    def __init__(self, path, compress=True, busy_timeout=None):
+        """
+        :param path: path of the SQLite database file, created if it doesn't exist
+        :param compress: whether to compress stored summaries
+        :param busy_timeout: seconds to wait for another process's write lock before failing
+        """
+        self.path = path
+        self.compress = compress
+        self.busy_timeout = DEFAULT_BUSY_TIMEOUT if not busy_timeout else busy_timeout
+        self._local = threading.local()
+
+        connection = self._connection()
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.execute('CREATE TABLE IF NOT EXISTS submission_summary ('
+                           'uuid TEXT PRIMARY KEY, '
+                           'version TEXT, '
+                           'expires_at REAL, '
+                           'encoding INTEGER NOT NULL, '
+                           'summary BLOB NOT NULL)')
+
+    def get(self, uuid, version=None):
+        """
+        :param uuid: uuid of the submission
+        :param version: the submission's current version; a summary stored for any other version is deleted
+        :return: a tuple of the stored summary, the version it is for and the wall-clock time it expires at, or None
+        if it doesn't expire
+        :raises CacheMissException: if no current summary is stored, or the stored summary can't be read, e.g as it
+        was stored by a version of the broker with different summary classes; such a summary is deleted
+        """
+        row = self._connection().execute('SELECT version, expires_at, encoding, summary FROM submission_summary '
+                                         'WHERE uuid = ?', (uuid,)).fetchone()
+        if not row:
+            raise CacheMissException(uuid)
+
+        (stored_version, expires_at, encoding, payload) = row
+        is_other_version = version is not None and stored_version != version
+        has_expired = expires_at is not None and time.time() >= expires_at
+        if is_other_version or has_expired:
+            self.delete(uuid, stored_version)
+            raise CacheMissException(uuid)
+
+        try:
+            summary = self._deserialize(encoding, payload)
+        except Exception:
+            # unpickling can fail in as many ways as the pickled classes can change, e.g with an AttributeError or
+            # ImportError, besides corrupt data failing to decompress or unpickle
+            logger.exception('Failed to read the stored summary of submission {0}, deleting it'.format(uuid))
+            self.delete(uuid, stored_version)
+            raise CacheMissException(uuid)
+
+        return summary, stored_version, expires_at
+
+    def put(self, uuid, summary, version=None, expires_at=None):
+        """
+        :param uuid: uuid of the submission
+        :param summary: the submission's summary
+        :param version: the version of the submission the summary was computed from
+        :param expires_at: wall-clock time after which the summary is no longer served, or None to keep it
+        """
+        (encoding, payload) = self._serialize(summary)
+        self._connection().execute('INSERT OR REPLACE INTO submission_summary '
+                                   '(uuid, version, expires_at, encoding, summary) VALUES (?, ?, ?, ?, ?)',
+                                   (uuid, version, expires_at, encoding, sqlite3.Binary(payload)))
+
+    def delete(self, uuid, version=None):
+        """
+        Deletes the stored summary of a submission, only if it is still for the given version when one is given
+        """
+        if version is None:
+            self._connection().execute('DELETE FROM submission_summary WHERE uuid = ?', (uuid,))
+        else:
+            self._connection().execute('DELETE FROM submission_summary WHERE uuid = ? AND version = ?', (uuid, version))
+
+    def _serialize(self, summary):
+        payload = pickle.dumps(summary, pickle.HIGHEST_PROTOCOL)
+        if self.compress:
+            return ZLIB_COMPRESSED, zlib.compress(payload)
+        return UNCOMPRESSED, payload
+
+    @staticmethod
+    def _deserialize(encoding, payload):
+        payload = bytes(payload)
+        if encoding == ZLIB_COMPRESSED:
+            payload = zlib.decompress(payload)
+        return pickle.loads(payload)
+
+    def _connection(self) -> sqlite3.Connection:
+        # connections can't be shared between threads, nor carried across a fork
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=self.busy_timeout, isolation_level=None)
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
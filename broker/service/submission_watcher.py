@@ -0,0 +1,368 @@
+import asyncio
+import json
+import logging
+import queue
+import threading
+
+DEFAULT_POLL_INTERVAL = 5  # seconds
+DEFAULT_MAX_PENDING_EVENTS = 100
+
+logger = logging.getLogger(__name__)
+
+
+class SubmissionEvent:
+
+    def __init__(self, name, data):
+        """
+        :param name: type of the event: submission or files
+        :param data: JSON serialisable content of the event
+        """
+        self.name = name
+        self.data = data
+
+    def to_sse(self) -> str:
+        """
+        :return: the event in server-sent events format
+        """
+        return 'event: {0}\ndata: {1}\n\n'.format(self.name, json.dumps(self.data))
+
+
+class Subscription:
+    """
+    The events published for a watched submission to one subscriber, e.g a browser tab. A subscriber falling too far
+    behind loses its oldest events rather than holding up the others
+    """
+
+    def __init__(self, submission_id, max_pending_events=None):
+        self.submission_id = submission_id
+        self.events = queue.Queue(DEFAULT_MAX_PENDING_EVENTS if not max_pending_events else max_pending_events)
+        self.closed = False
+
+    def publish(self, event: SubmissionEvent):
+        while True:
+            try:
+                self.events.put_nowait(event)
+                return
+            except queue.Full:
+                try:
+                    self.events.get_nowait()
+                except queue.Empty:
+                    pass
+
+    def next_event(self, timeout=None):
+        """
+        :param timeout: seconds to wait for an event
+        :return: the next event, or None if there was none within the timeout or the subscription has been closed
+        """
+        try:
+            return self.events.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        """
+        Ends the subscription, waking up a subscriber waiting for its next event
+        """
+        self.closed = True
+        self.publish(None)
+
+
+class AsyncSubscription(Subscription):
+    """
+    A subscription whose subscriber waits for events on an asyncio event loop, rather than holding a thread. It is
+    published to from that loop only
+    """
+
+    def __init__(self, submission_id, max_pending_events=None):
+        self.submission_id = submission_id
+        self.events = asyncio.Queue(DEFAULT_MAX_PENDING_EVENTS if not max_pending_events else max_pending_events)
+        self.closed = False
+
+    def publish(self, event: SubmissionEvent):
+        while True:
+            try:
+                self.events.put_nowait(event)
+                return
+            except asyncio.QueueFull:
+                try:
+                    self.events.get_nowait()
+                except asyncio.QueueEmpty:
+                    pass
+
+    async def next_event(self, timeout=None):
+        """
+        :param timeout: seconds to wait for an event
+        :return: the next event, or None if there was none within the timeout or the subscription has been closed
+        """
+        try:
+            return await asyncio.wait_for(self.events.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class SubmissionState:
+    """
+    The last polled state of a submission: the parts of the submission envelope shown to watchers, and the status of
+    each of its files by their URL
+    """
+
+    def __init__(self):
+        self.submission = None
+        self.files = dict()
+        self.file_page = None
+
+    def update_submission(self, submission_envelope):
+        """
+        :return: the submission's new state if it changed, otherwise None
+        """
+        submission = summarise_submission(submission_envelope)
+        if submission == self.submission:
+            return None
+
+        self.submission = submission
+        return submission
+
+    def update_files(self, files_response):
+        """
+        :return: the files that were changed, added or removed, and the new page of files, if any were, otherwise None
+        """
+        files = files_response.get('_embedded', {}).get('files', [])
+        current_files = {file_summary['url']: file_summary for file_summary in map(summarise_file, files)}
+        file_page = files_response.get('page')
+
+        changed = [file_summary for (url, file_summary) in current_files.items() if self.files.get(url) != file_summary]
+        removed = [url for url in self.files if url not in current_files]
+        if not changed and not removed and file_page == self.file_page:
+            return None
+
+        self.files = current_files
+        self.file_page = file_page
+        return {'changed': changed, 'removed': removed, 'page': file_page}
+
+    def snapshot(self) -> list:
+        """
+        :return: events bringing a new watcher up to date with the last polled state
+        """
+        events = []
+        if self.submission is not None:
+            events.append(SubmissionEvent('submission', self.submission))
+        if self.files or self.file_page:
+            events.append(SubmissionEvent('files', {'changed': list(self.files.values()), 'removed': [],
+                                                    'page': self.file_page}))
+        return events
+
+
+def summarise_submission(submission_envelope) -> dict:
+    links = submission_envelope.get('_links', {})
+    return {
+        'submissionState': submission_envelope.get('submissionState'),
+        'updateDate': submission_envelope.get('updateDate'),
+        '_links': {'submit': links['submit']} if 'submit' in links else {}
+    }
+
+
+def summarise_file(file_resource) -> dict:
+    return {
+        'url': file_resource['_links']['self']['href'],
+        'uuid': file_resource.get('uuid', {}).get('uuid'),
+        'fileName': file_resource.get('fileName'),
+        'validationState': file_resource.get('validationState'),
+        'cloudUrl': file_resource.get('cloudUrl')
+    }
+
+
+class _Watcher:
+
+    def __init__(self, submission_id):
+        self.submission_id = submission_id
+        self.subscriptions = set()
+        self.state = SubmissionState()
+        self.stopped = threading.Event()
+        # the task polling the submission, when watched from an event loop
+        self.task = None
+
+
+def _publish_changes(watcher: _Watcher, submission_envelope, files_response):
+    events = []
+    if submission_envelope:
+        submission = watcher.state.update_submission(submission_envelope)
+        if submission is not None:
+            events.append(SubmissionEvent('submission', submission))
+    if files_response:
+        files_delta = watcher.state.update_files(files_response)
+        if files_delta is not None:
+            events.append(SubmissionEvent('files', files_delta))
+
+    for event in events:
+        for subscription in watcher.subscriptions:
+            subscription.publish(event)
+
+
+class SubmissionWatcherHub:
+    """
+    Polls each watched submission and its files once per interval, however many subscribers are watching it, and
+    publishes only what changed to all of them. A submission stops being polled once it has no subscribers left
+    """
+
+    def __init__(self, fetch_submission, fetch_files, poll_interval=None, max_pending_events=None):
+        """
+        :param fetch_submission: function fetching a submission envelope by submission id
+        :param fetch_files: function fetching a page of a submission's files by submission id
+        :param poll_interval: seconds between polls of a watched submission
+        :param max_pending_events: max events held for a subscriber that isn't keeping up
+        """
+        self.fetch_submission = fetch_submission
+        self.fetch_files = fetch_files
+        self.poll_interval = DEFAULT_POLL_INTERVAL if not poll_interval else poll_interval
+        self.max_pending_events = max_pending_events
+
+        self._watchers = dict()
+        self._lock = threading.Lock()
+
+    def subscribe(self, submission_id) -> Subscription:
+        subscription = Subscription(submission_id, self.max_pending_events)
+
+        with self._lock:
+            watcher = self._watchers.get(submission_id)
+            is_new_watcher = watcher is None
+            if is_new_watcher:
+                watcher = _Watcher(submission_id)
+                self._watchers[submission_id] = watcher
+
+            watcher.subscriptions.add(subscription)
+            for event in watcher.state.snapshot():
+                subscription.publish(event)
+
+        if is_new_watcher:
+            threading.Thread(target=self._poll, args=(watcher,), daemon=True,
+                             name='submission-watcher-{0}'.format(submission_id)).start()
+
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            watcher = self._watchers.get(subscription.submission_id)
+            if not watcher:
+                return
+
+            watcher.subscriptions.discard(subscription)
+            if not watcher.subscriptions:
+                del self._watchers[subscription.submission_id]
+                watcher.stopped.set()
+
+    def close(self):
+        """
+        Stops polling every watched submission and closes all subscriptions, e.g so that a server shutting down isn't
+        kept waiting on open event streams. Subscribers reconnect elsewhere, or once the server is back
+        """
+        with self._lock:
+            subscriptions = [subscription for watcher in self._watchers.values()
+                             for subscription in watcher.subscriptions]
+            for watcher in self._watchers.values():
+                watcher.stopped.set()
+            self._watchers.clear()
+
+        for subscription in subscriptions:
+            subscription.close()
+
+    def watched(self) -> list:
+        """
+        :return: ids of the submissions being polled
+        """
+        with self._lock:
+            return list(self._watchers.keys())
+
+    def _poll(self, watcher: _Watcher):
+        while not watcher.stopped.is_set():
+            try:
+                self.poll(watcher)
+            except Exception:
+                logger.exception('Failed to poll submission {0}'.format(watcher.submission_id))
+            watcher.stopped.wait(self.poll_interval)
+
+    def poll(self, watcher: _Watcher):
+        submission_envelope = self.fetch_submission(watcher.submission_id)
+        files_response = self.fetch_files(watcher.submission_id) if submission_envelope else None
+
+        with self._lock:
+            _publish_changes(watcher, submission_envelope, files_response)
+
+
+class AsyncSubmissionWatcherHub:
+    """
+    A SubmissionWatcherHub for subscribers on an asyncio event loop. Each watched submission is polled by a task on the
+    loop, so neither watched submissions nor subscribers hold a thread. A hub belongs to the loop it is first used on
+    """
+
+    def __init__(self, fetch_submission, fetch_files, poll_interval=None, max_pending_events=None):
+        """
+        :param fetch_submission: coroutine function fetching a submission envelope by submission id
+        :param fetch_files: coroutine function fetching a page of a submission's files by submission id
+        :param poll_interval: seconds between polls of a watched submission
+        :param max_pending_events: max events held for a subscriber that isn't keeping up
+        """
+        self.fetch_submission = fetch_submission
+        self.fetch_files = fetch_files
+        self.poll_interval = DEFAULT_POLL_INTERVAL if not poll_interval else poll_interval
+        self.max_pending_events = max_pending_events
+
+        self._watchers = dict()
+
+    def subscribe(self, submission_id) -> AsyncSubscription:
+        subscription = AsyncSubscription(submission_id, self.max_pending_events)
+
+        watcher = self._watchers.get(submission_id)
+        if watcher is None:
+            watcher = _Watcher(submission_id)
+            self._watchers[submission_id] = watcher
+            watcher.task = asyncio.ensure_future(self._poll(watcher))
+
+        watcher.subscriptions.add(subscription)
+        for event in watcher.state.snapshot():
+            subscription.publish(event)
+
+        return subscription
+
+    def unsubscribe(self, subscription: AsyncSubscription):
+        watcher = self._watchers.get(subscription.submission_id)
+        if not watcher:
+            return
+
+        watcher.subscriptions.discard(subscription)
+        if not watcher.subscriptions:
+            del self._watchers[subscription.submission_id]
+            watcher.task.cancel()
+
+    def close(self):
+        """
+        Stops polling every watched submission and closes all subscriptions
+        """
+        watchers = list(self._watchers.values())
+        self._watchers.clear()
+
+        for watcher in watchers:
+            watcher.task.cancel()
+            for subscription in watcher.subscriptions:
+                subscription.close()
+
+    def watched(self) -> list:
+        """
+        :return: ids of the submissions being polled
+        """
+        return list(self._watchers.keys())
+
+    def subscriber_count(self) -> int:
+        return sum(len(watcher.subscriptions) for watcher in self._watchers.values())
+
+    async def _poll(self, watcher: _Watcher):
+        while True:
+            try:
+                await self.poll(watcher)
+            except Exception:
+                logger.exception('Failed to poll submission {0}'.format(watcher.submission_id))
+            await asyncio.sleep(self.poll_interval)
+
+    async def poll(self, watcher: _Watcher):
+        submission_envelope = await self.fetch_submission(watcher.submission_id)
+        files_response = await self.fetch_files(watcher.submission_id) if submission_envelope else None
+        _publish_changes(watcher, submission_envelope, files_response)
@@ -0,0 +1,56 @@
+import logging
+import threading
+
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_REFRESH_WORKERS = 2
+DEFAULT_MAX_PENDING_REFRESHES = 100
+
+logger = logging.getLogger(__name__)
+
+
+class SummaryRefresher:
+    """
+    Recomputes stale summaries in the background on a bounded pool of workers.
+
+    A refresh that is already queued or running for a key isn't queued again, and refreshes beyond the pending bound
+    are dropped rather than queued; a later request for the stale summary will ask for it again
+    """
+
+    def __init__(self, max_workers=None, max_pending=None):
+        self.max_workers = DEFAULT_REFRESH_WORKERS if not max_workers else max_workers
+        self.max_pending = DEFAULT_MAX_PENDING_REFRESHES if not max_pending else max_pending
+
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        self._lock = threading.Lock()
+        self._pending = set()
+
+    def refresh(self, key, function, *args, **kwargs) -> bool:
+        """
+        :param key: identifies the summary being refreshed
+        :param function: recomputes and caches the summary
+        :return: True if a refresh was queued, False if one is already pending or too many are
+        """
+        with self._lock:
+            if key in self._pending or len(self._pending) >= self.max_pending:
+                return False
+            self._pending.add(key)
+
+        self._executor.submit(self._run, key, function, args, kwargs)
+        return True
+
+    def _run(self, key, function, args, kwargs):
+        try:
+            function(*args, **kwargs)
+        except Exception:
+            logger.exception('Background refresh of {0} failed'.format(key))
+        finally:
+            with self._lock:
+                self._pending.discard(key)
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
@@ -1,21 +1,42 @@
 from ingest.api.ingestapi import IngestApi
 from broker.common.submission_summary import SubmissionSummary
-from broker.common.project_summary import ProjectSummary
+from broker.common.project_summary import ProjectSummary, IncrementalProjectSummary
 from broker.common.entity_summary import EntitySummary
+from broker.common.util.json_summary_util import JSONSummaryUtil, EncodedSummary
 from .submission_summary_cache import SubmissionSummaryCache
+from .entity_fetcher import EntityFetcher, ENTITY_PAGE_SIZE
+from .single_flight import SingleFlight
+from .summary_refresher import SummaryRefresher
+from .scrape_path import compile_path
 from .exception.cache_miss_exception import CacheMissException
+from .exception.stale_cache_entry_exception import StaleCacheEntryException
 
 
+from typing import Callable
 from typing import Generator
 from typing import Iterable
-from functools import reduce
-from jsonpath_rw import jsonpath, parse
+from functools import reduce, lru_cache
+from expiringdict import ExpiringDict
 
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from sys import intern
+
+import copy
 import json
+import logging
 import os
+import threading
+import time
+
+DEFAULT_PROJECT_CONCURRENCY = 4
+MAX_PROJECT_SUMMARIES = 1000
+ONE_DAY = 60 * 60 * 24
+SCRAPE_CONFIG_PATH = os.path.join(os.path.dirname(__file__), 'scrape_config.json')
+
+logger = logging.getLogger(__name__)
 
 
-# TODO: consider storing generators here and generating the complete summary in one pass
 class SubmissionEntities:
     def __init__(self, biomaterials=None, projects=None, processes=None, protocols=None, files=None):
         self.biomaterials = biomaterials if biomaterials else []
@@ -23,23 +44,199 @@ class SubmissionEntities:
         self.processes = processes if processes else []
         self.protocols = protocols if protocols else []
         self.files = files if files else []
+        self.fetch_timings = None
+
+
+class SubmissionSummaryBuilder:
+    """
+    Builds a SubmissionSummary in a single pass over the entities of a submission. Each entity is counted towards the
+    breakdown of its entity type and fed to the scrape directives for that type, and is then dropped.
+
+    Different entity types may be added from different threads at once, as each type only touches its own summary
+    and scrape directives
+    """
+
+    SUMMARY_ATTRIBUTES = {'biomaterials': 'biomaterial_summary',
+                          'projects': 'project_summary',
+                          'processes': 'process_summary',
+                          'protocols': 'protocol_summary',
+                          'files': 'file_summary'}
+
+    def __init__(self, submission_scraper: 'SubmissionScraper'):
+        self.entity_summaries = {entity_type: EntitySummary() for entity_type in self.SUMMARY_ATTRIBUTES}
+        self.scrape = submission_scraper.start_scrape()
+
+    def add_entities(self, entity_type, entities: Iterable[dict]):
+        entity_summary = self.entity_summaries[entity_type]
+        for entity in entities:
+            specific_type = SummaryService.parse_specific_entity_type(entity)
+            SummaryService.count_entity(entity_summary, specific_type)
+            self.scrape.feed(entity_type, entity, specific_type)
+
+    def build(self) -> SubmissionSummary:
+        submission_summary = SubmissionSummary()
+        for (entity_type, attribute) in self.SUMMARY_ATTRIBUTES.items():
+            setattr(submission_summary, attribute, self.entity_summaries[entity_type])
+
+        submission_summary.scrape_result = self.scrape.result()
+        return submission_summary
+
 
 class SummaryService:
 
-    def __init__(self, ingest_api=None, submission_summary_cache=None):
+    def __init__(self, ingest_api=None, submission_summary_cache=None, fetch_concurrency=None,
+                 project_concurrency=None, submission_timeout=None, single_flight=None, summary_refresher=None):
+        """
+        :param ingest_api: client used to fetch submissions and their entities
+        :param submission_summary_cache: cache of computed submission summaries
+        :param fetch_concurrency: max number of entity types fetched at once for a submission; 1 fetches sequentially
+        :param project_concurrency: max number of submissions summarised at once for a project; 1 summarises
+        sequentially
+        :param submission_timeout: seconds a project summary waits on any one submission before leaving it out and
+        marking itself partial; waits indefinitely if not set
+        :param single_flight: coalesces concurrent summaries of the same submission or project; share one between
+        services to coalesce across them
+        :param summary_refresher: recomputes stale cached summaries in the background
+        """
         self.ingestapi = IngestApi() if not ingest_api else ingest_api
         self.submission_summary_cache = SubmissionSummaryCache() if not submission_summary_cache else submission_summary_cache
+        self.project_concurrency = DEFAULT_PROJECT_CONCURRENCY if not project_concurrency else project_concurrency
+        self.submission_timeout = submission_timeout
+        self.project_summaries = ExpiringDict(MAX_PROJECT_SUMMARIES, ONE_DAY)
+        self.project_summaries_lock = threading.Lock()
+        self.single_flight = SingleFlight() if not single_flight else single_flight
+        self.summary_refresher = SummaryRefresher() if not summary_refresher else summary_refresher
+        self.entity_fetcher = EntityFetcher(lambda uri, entity_type: self.get_entities_in_submission(uri, entity_type),
+                                            fetch_concurrency)
 
     def summary_for_project(self, project_resource) -> ProjectSummary:
-        project_summary = ProjectSummary()
+        """
+        Given a project resource, returns the combined summary of all submissions in the project.
+
+        The summary is maintained incrementally: only submissions that are new or whose update date has changed since
+        the project was last summarised are summarised again, and swapped into the project's previous summary.
+        Concurrent requests for the same project share a single computation
+
+        :param project_resource: the project resource from the ingest API
+        :return: a ProjectSummary for the project
+        """
+        if 'uuid' not in project_resource:
+            return self._summarise_project(project_resource)
+
+        project_uuid = project_resource['uuid']['uuid']
+        return self.single_flight.do(('project', project_uuid), self._summarise_project, project_resource)
+
+    def _summarise_project(self, project_resource) -> ProjectSummary:
+        project_submissions = list(self.get_submissions_in_project(project_resource))
+        incremental_summary = self.incremental_summary_for_project(project_resource)
+
+        with incremental_summary.lock:
+            changed_submissions = [submission for submission in project_submissions
+                                   if not incremental_summary.is_current(self.uuid_from_submission(submission),
+                                                                         submission['updateDate'])]
+
+        if self.project_concurrency > 1:
+            submission_summaries = self.summaries_for_submissions(changed_submissions)
+        else:
+            submission_summaries = ((submission, self.summary_for_submission(submission))
+                                    for submission in changed_submissions)
+
+        left_out = set(self.uuid_from_submission(submission) for submission in changed_submissions)
+        for (submission, summary) in submission_summaries:
+            with incremental_summary.lock:
+                incremental_summary.put_submission_summary(self.uuid_from_submission(submission),
+                                                           submission['updateDate'], summary)
+            left_out.discard(self.uuid_from_submission(submission))
+
+        with incremental_summary.lock:
+            incremental_summary.retain_submissions([self.uuid_from_submission(submission)
+                                                    for submission in project_submissions])
+            incremental_summary.set_left_out(left_out)
+            return incremental_summary.snapshot()
+
+    def encoded_summary_for_project(self, project_resource) -> EncodedSummary:
+        """
+        :param project_resource: the project resource from the ingest API
+        :return: the project's summary encoded as JSON, encoded only once for as long as the summary doesn't change.
+        It has no last modified date: the summary changes when a submission leaves the project, or one left out is
+        added with an older update date, and each process keeps a summary of its own, changing at different times
+        """
+        project_summary = self.summary_for_project(project_resource)
+        incremental_summary = self.incremental_summary_for_project(project_resource)
+
+        def encode(summary):
+            return EncodedSummary(JSONSummaryUtil.encode(summary))
+
+        with incremental_summary.lock:
+            return incremental_summary.encoded_snapshot(project_summary, encode)
+
+    def incremental_summary_for_project(self, project_resource) -> IncrementalProjectSummary:
+        """
+        :return: the incremental summary kept for the project, or a new one if the project has no uuid to keep it by
+        """
+        if 'uuid' not in project_resource:
+            return IncrementalProjectSummary()
+
+        project_uuid = project_resource['uuid']['uuid']
+        with self.project_summaries_lock:
+            incremental_summary = self.project_summaries.get(project_uuid)
+            if not incremental_summary:
+                incremental_summary = IncrementalProjectSummary()
+                self.project_summaries[project_uuid] = incremental_summary
+            return incremental_summary
+
+    def summaries_for_submissions(self, submission_resources: Iterable[dict]) -> Generator[tuple, None, None]:
+        """
+        Summarises submissions on a bounded pool of workers, yielding each summary as soon as it completes.
 
-        project_submissions = self.get_submissions_in_project(project_resource)
-        submission_summaries = [self.summary_for_submission(submission) for submission in project_submissions]
+        A submission still being summarised after the submission timeout is left out and logged rather than waited
+        on; its summary carries on in the background and is cached once complete
 
-        for summary in submission_summaries:
-            project_summary.addSubmissionSummary(summary)
+        :param submission_resources: submission envelopes to summarise
+        :return: a generator of (submission resource, SubmissionSummary) tuples, in order of completion
+        """
+        executor = ThreadPoolExecutor(max_workers=self.project_concurrency)
 
-        return project_summary
+        def summarise(submission_resource, start_times):
+            start_times.append(time.monotonic())
+            return self.summary_for_submission(submission_resource)
+
+        pending = dict()
+        try:
+            for submission_resource in submission_resources:
+                start_times = []
+                pending[executor.submit(summarise, submission_resource, start_times)] = (submission_resource, start_times)
+
+            while pending:
+                done, _ = wait(pending, timeout=self._time_until_next_timeout(pending.values()),
+                               return_when=FIRST_COMPLETED)
+                for future in done:
+                    (submission_resource, _) = pending.pop(future)
+                    yield submission_resource, future.result()
+
+                for (future, (submission_resource, start_times)) in list(pending.items()):
+                    if self._has_timed_out(start_times):
+                        pending.pop(future)
+                        logger.warning('Summary of submission {0} timed out after {1}s, leaving it out of the project '
+                                       'summary'.format(self.uuid_from_submission(submission_resource),
+                                                        self.submission_timeout))
+        finally:
+            for future in pending:
+                future.cancel()
+            executor.shutdown(wait=False)
+
+    def _time_until_next_timeout(self, pending_submissions):
+        if self.submission_timeout is None:
+            return None
+
+        now = time.monotonic()
+        remaining = [start_times[0] + self.submission_timeout - now for (_, start_times) in pending_submissions
+                     if start_times]
+        return max(min(remaining), 0) if remaining else self.submission_timeout
+
+    def _has_timed_out(self, start_times):
+        return self.submission_timeout is not None and bool(start_times) and \
+               time.monotonic() - start_times[0] >= self.submission_timeout
 
     def summary_for_submission(self, submission_resource) -> SubmissionSummary:
         """
@@ -51,34 +248,68 @@ class SummaryService:
         In addition, an attempt will be made to parse specific information from the submission such as the project
         title, # of cells, organ, donor, ...
 
+        On a cache miss, concurrent requests for the same version of the submission share a single computation. If
+        the cached summary has expired but is within the cache's stale grace window, a copy of it marked as stale is
+        returned straight away and the summary is recomputed in the background
+
         :param submission_uri: URI string for the submission
         :return: A SubmissionSummary for this submission
         """
         submission_uuid = self.uuid_from_submission(submission_resource)
 
+        flight_key = ('submission', submission_uuid, submission_resource['updateDate'])
+
         try:
-            submission_summary = self.submission_summary_cache.get(submission_uuid)
+            submission_summary = self.submission_summary_cache.get(submission_uuid, submission_resource['updateDate'])
             return submission_summary
+        except StaleCacheEntryException as stale_entry:
+            self.summary_refresher.refresh(flight_key, self.single_flight.do, flight_key, self._summarise_submission,
+                                           submission_resource)
+
+            stale_summary = copy.copy(stale_entry.summary)
+            stale_summary.is_stale = True
+            return stale_summary
         except CacheMissException:
-            submission_summary = SubmissionSummary()
-            submission_uri = submission_resource['_links']['self']['href']
+            return self.single_flight.do(flight_key, self._summarise_submission, submission_resource)
 
-            submissions_entities = self.get_all_entities_in_submission(submission_uri)
-            submission_summary = self.add_entity_count_breakdown(submission_summary, submissions_entities)
+    def encoded_summary_for_submission(self, submission_resource) -> EncodedSummary:
+        """
+        :param submission_resource: the submission resource from the ingest API
+        :return: the submission's summary encoded as JSON; a cached summary is only encoded once
+        """
+        submission_summary = self.summary_for_submission(submission_resource)
+        return self.submission_summary_cache.encoded(self.uuid_from_submission(submission_resource),
+                                                     submission_summary, JSONSummaryUtil.encode_submission_summary)
 
-            scrape_config_path = os.path.join(os.path.dirname(__file__), 'scrape_config.json')  # TODO: pass config in
-            submission_scraper = SubmissionScraper.from_file(scrape_config_path)
+    def _summarise_submission(self, submission_resource) -> SubmissionSummary:
+        submission_uuid = self.uuid_from_submission(submission_resource)
+        submission_uri = submission_resource['_links']['self']['href']
 
-            submission_summary = self.add_specific_submission_information(submission_summary,
-                                                                          submissions_entities,
-                                                                          submission_scraper) # TODO: pass a scrape-config
+        submission_scraper = SubmissionScraper.from_file(SCRAPE_CONFIG_PATH)  # TODO: pass config in
 
-            submission_summary.create_date = submission_resource['submissionDate']
-            submission_summary.last_updated_date = submission_resource['updateDate']
-            submission_summary.submission_status = submission_resource['submissionState']
+        submission_summary = self.stream_submission_summary(submission_uri, submission_scraper)
 
-            self.submission_summary_cache.insert(submission_uuid, submission_summary)
-            return submission_summary
+        submission_summary.create_date = submission_resource['submissionDate']
+        submission_summary.last_updated_date = submission_resource['updateDate']
+        submission_summary.submission_status = submission_resource['submissionState']
+
+        self.submission_summary_cache.insert(submission_uuid, submission_summary,
+                                             submission_resource['updateDate'],
+                                             submission_resource['submissionState'])
+        return submission_summary
+
+    def stream_submission_summary(self, submission_uri, submission_scraper) -> SubmissionSummary:
+        """
+        Summarises a submission in a single pass over its entities. Each page of entities is counted and scraped as it
+        arrives and is then dropped, so memory use stays flat regardless of the size of the submission
+
+        :param submission_uri: URI string for the submission
+        :param submission_scraper: scraper primed with the scrape directives to apply
+        :return: a SubmissionSummary with entity breakdowns and scrape results, but no envelope information
+        """
+        summary_builder = SubmissionSummaryBuilder(submission_scraper)
+        self.entity_fetcher.fetch_all(submission_uri, summary_builder.add_entities)
+        return summary_builder.build()
 
     def add_entity_count_breakdown(self, submission_summary, submission_entities):
         submission_summary.biomaterial_summary = self.generate_summary_for_entity(submission_entities.biomaterials)
@@ -102,14 +333,19 @@ class SummaryService:
         return submission_summary
 
     def get_entities_in_submission(self, submission_uri, entity_type) -> Generator[dict, None, None]:
-        yield from self.ingestapi.getEntities(submission_uri, entity_type, 1000)
+        yield from self.ingestapi.getEntities(submission_uri, entity_type, ENTITY_PAGE_SIZE)
+
+    def get_all_entities_in_submission(self, submission_uri) -> SubmissionEntities:
+        entities_by_type, timings = self.entity_fetcher.fetch_all(submission_uri,
+                                                                  lambda entity_type, entities: list(entities))
 
-    def get_all_entities_in_submission(self, submission_uri):
-        return SubmissionEntities(list(self.get_entities_in_submission(submission_uri, 'biomaterials')),
-                                  list(self.get_entities_in_submission(submission_uri, 'projects')),
-                                  list(self.get_entities_in_submission(submission_uri, 'processes')),
-                                  list(self.get_entities_in_submission(submission_uri, 'protocols')),
-                                  list(self.get_entities_in_submission(submission_uri, 'files')))
+        submission_entities = SubmissionEntities(entities_by_type['biomaterials'],
+                                                 entities_by_type['projects'],
+                                                 entities_by_type['processes'],
+                                                 entities_by_type['protocols'],
+                                                 entities_by_type['files'])
+        submission_entities.fetch_timings = timings
+        return submission_entities
 
     def get_submissions_in_project(self, project_resource) -> Generator[dict, None, None]:
         yield from self.ingestapi.getRelatedEntities('submissionEnvelopes', project_resource, 'submissionEnvelopes')
@@ -126,18 +362,21 @@ class SummaryService:
         """
         entity_summary = EntitySummary()
 
-        entity_specific_types = dict()
         for entity in entities:
-            specific_type = SummaryService.parse_specific_entity_type(entity)
-            if specific_type not in entity_specific_types:
-                entity_specific_types[specific_type] = {'count': 0}
+            SummaryService.count_entity(entity_summary, SummaryService.parse_specific_entity_type(entity))
 
-            entity_specific_types[specific_type]['count'] += 1
-            entity_summary.count += 1
-
-        entity_summary.breakdown = entity_specific_types
         return entity_summary
 
+    @staticmethod
+    def count_entity(entity_summary: EntitySummary, specific_type: str) -> EntitySummary:
+        """
+        counts one entity of the given specific type towards an entity summary
+        :param entity_summary: the summary to add the entity to
+        :param specific_type: the specific type of the entity (e.g donor, cell_suspension, ...)
+        :return: the updated summary
+        """
+        return entity_summary.add_entity(specific_type)
+
     @staticmethod
     def parse_specific_entity_type(entity) -> str:
         """
@@ -147,11 +386,16 @@ class SummaryService:
         :return: the specific type of the entity as specified in the entity's 'describedBy', or 'unknown' if the
         'describedBy' field is not present
         """
-        if 'content' not in entity and 'describedBy' not in entity['content']:
+        if 'content' not in entity or 'describedBy' not in entity['content']:
             return 'unknown'
         else:
-            entity_described_by = entity['content']['describedBy']
-            return entity_described_by.split('/')[-1]
+            return SummaryService.specific_type_from_schema(entity['content']['describedBy'])
+
+    @staticmethod
+    @lru_cache(maxsize=1024)
+    def specific_type_from_schema(described_by: str) -> str:
+        # a submission only references a handful of schemas, so the split is cached per schema URL
+        return intern(described_by.split('/')[-1])
 
     @staticmethod
     def uuid_from_submission(submission_resource) -> str:
@@ -173,68 +417,163 @@ class ScrapeConfig:
 
 class SubmissionScraper:
 
+    # maps the entity types of a submission to the entity type named in scrape directives, in scrape result order
+    DIRECTIVE_ENTITY_TYPES = {'biomaterials': 'biomaterial',
+                              'processes': 'process',
+                              'protocols': 'protocol',
+                              'files': 'file',
+                              'projects': 'project'}
+
     class Directive:
         """
         A directive will instruct the scraper on where and how to find info to be scraped. Can be constructed
         with an optional reducer function to combine matching scraped data. The reducer function should take a
-        collection of matching field-values as param and return a single value
+        collection of matching field-values as param and return a single value.
+
+        If the directive's post_process is known, matching values are reduced as they are found instead of being
+        collected first, so a directive only holds on to its running result
         """
 
-        def __init__(self, placeholder=None, entity_type=None, identifier=None, paths=None, reducer=None):
+        def __init__(self, placeholder=None, entity_type=None, identifier=None, paths=None, reducer=None,
+                     post_process=None):
             self.placeholder = placeholder
             self.entity_type = entity_type
             self.identifier = identifier
             self.paths = paths
             self.reducer = reducer
-            self.parsers = [parse(path) for path in self.paths]
-            self.apply = None
+            self.post_process = post_process
+            self.path_matchers = [compile_path(path) for path in self.paths]
 
         def build(self):
-            self.apply = self.generateApplyFunction()
+            if not self.identifier and not self.path_matchers:
+                raise Exception("Can't generate a parse directive without either an identifier or path matcher")
 
-        def generateApplyFunction(self):
-            """
-            If an identifier is specified, we want the following algorithm:
-            - return entities matching the identifier
+        def new_accumulator(self) -> 'SubmissionScraper.Accumulator':
+            return SubmissionScraper.accumulator_for(self.post_process, self.reducer)
 
-            If a path is specified, we want the algorithm to additionally:
-            - return matched fields within eligible entities
-            :return:
+        def consumer_for(self, accumulator: 'SubmissionScraper.Accumulator') -> Callable[[dict], None]:
+            """
+            Returns a function accumulating the values of an entity already known to match this directive's
+            identifier
             """
-            parsers = self.parsers
-            identifier = self.identifier
-
-            def identify(entities):  # TODO: move parse_specific_entity_type
-                return list(filter(lambda entity: SummaryService.parse_specific_entity_type(entity) == self.identifier, entities))
-
-            def pathMatch(entities):
-                found_values = []
-                for entity in entities:
-                    for parser in parsers:
-                        found_values += [match.value for match in parser.find(entity['content'])]
-                return found_values
-
-            def combined_function():
-                if identifier:
-                    if parsers and (len(parsers) > 0):
-                        return lambda entities: pathMatch(identify(entities))
-                    else:
-                        return lambda entities: identify(entities)
-                elif parsers and (len(parsers) > 0):
-                    return lambda entities: pathMatch(entities)
-                else:
-                    raise Exception("Can't generate a parse directive without either an identifier or path matcher")
-
-            return combined_function()
-
-
-    class GroupedDirectives:
+            path_matchers = self.path_matchers
+            add = accumulator.add
+
+            if not path_matchers:
+                return add
+            elif len(path_matchers) == 1:
+                path_matcher = path_matchers[0]
+
+                def consume(entity):
+                    for value in path_matcher(entity['content']):
+                        add(value)
+            else:
+                def consume(entity):
+                    content = entity['content']
+                    for path_matcher in path_matchers:
+                        for value in path_matcher(content):
+                            add(value)
+
+            return consume
+
+    class Accumulator:
+        """
+        Collects every value and reduces them when the result is requested
+        """
+
+        def __init__(self, reducer):
+            self.reducer = reducer
+            self.values = []
+
+        def add(self, value):
+            self.values.append(value)
+
+        def result(self):
+            return self.reducer(self.values)
+
+    class SumAccumulator(Accumulator):
+        def __init__(self):
+            self.total = 0
+
+        def add(self, value):
+            self.total += value
+
+        def result(self):
+            return self.total
+
+    class CountAccumulator(Accumulator):
         def __init__(self):
-            self.biomaterial_directives = []
-            self.processes_directives = []
-            self.protocol_directives = []
-            self.file_directives = []
-            self.project_directives = []
+            self.count = 0
+
+        def add(self, value):
+            self.count += 1
+
+        def result(self):
+            return self.count
+
+    class UniqueAccumulator(Accumulator):
+        def __init__(self):
+            self.values = set()
+
+        def add(self, value):
+            self.values.add(value)
+
+        def result(self):
+            return list(self.values)
+
+    class Scrape:
+        """
+        A scrape in progress. Entities are fed in one at a time and each directive for the entity's type accumulates
+        its matching values, so an entity isn't needed once it has been fed.
+
+        Directives are bucketed by entity type and identifier up front, so an entity is only offered to the
+        directives identifying its specific type and to those without an identifier
+        """
+
+        def __init__(self, grouped_directives: dict):
+            self.accumulators = {entity_type: [(directive, directive.new_accumulator()) for directive in directives]
+                                 for (entity_type, directives) in grouped_directives.items()}
+            self.buckets = {entity_type: self.bucket_by_identifier(directive_accumulators)
+                            for (entity_type, directive_accumulators) in self.accumulators.items()
+                            if directive_accumulators}
+
+        @staticmethod
+        def bucket_by_identifier(directive_accumulators) -> dict:
+            unidentified = [directive.consumer_for(accumulator) for (directive, accumulator) in directive_accumulators
+                            if not directive.identifier]
+
+            buckets = {None: unidentified}
+            for (directive, accumulator) in directive_accumulators:
+                if directive.identifier:
+                    if directive.identifier not in buckets:
+                        buckets[directive.identifier] = list(unidentified)
+                    buckets[directive.identifier].append(directive.consumer_for(accumulator))
+            return buckets
+
+        def feed(self, entity_type, entity, specific_type=None):
+            """
+            :param entity_type: the type of the entity in the submission (e.g biomaterials, files, ...)
+            :param entity: the entity to scrape
+            :param specific_type: the specific type of the entity, parsed from the entity if not given
+            """
+            buckets = self.buckets.get(entity_type)
+            if buckets:
+                if specific_type is None:
+                    specific_type = SummaryService.parse_specific_entity_type(entity)
+
+                for consume in buckets.get(specific_type, buckets[None]):
+                    consume(entity)
+
+        def result(self) -> dict:
+            scrape_result = dict()
+            for directive_accumulators in self.accumulators.values():
+                for (directive, accumulator) in directive_accumulators:
+                    scrape_result[directive.placeholder] = accumulator.result()
+
+            return scrape_result
+
+    _scrapers_from_file = dict()
+    _scrapers_from_file_lock = threading.Lock()
 
     def __init__(self, directives=None):
         self.directives = directives if directives else []
@@ -242,6 +581,8 @@ class SubmissionScraper:
             directive.build()
         self.grouped_directives = self.group_directives(self.directives)
 
+    def start_scrape(self) -> 'SubmissionScraper.Scrape':
+        return SubmissionScraper.Scrape(self.grouped_directives)
 
     def scrape(self, submission_entities: SubmissionEntities) -> dict:
         """
@@ -249,52 +590,46 @@ class SubmissionScraper:
         :param submission_entities:
         :return:
         """
+        scrape = self.start_scrape()
+        for entity_type in SubmissionScraper.DIRECTIVE_ENTITY_TYPES:
+            for entity in getattr(submission_entities, entity_type):
+                scrape.feed(entity_type, entity)
 
-        #  gets scrape dicts for each entity type, combines all into a single dict
-
-        scrapes = [self.apply_directives(submission_entities.biomaterials, self.grouped_directives.biomaterial_directives),
-                   self.apply_directives(submission_entities.processes, self.grouped_directives.processes_directives),
-                   self.apply_directives(submission_entities.protocols, self.grouped_directives.protocol_directives),
-                   self.apply_directives(submission_entities.files, self.grouped_directives.file_directives),
-                   self.apply_directives(submission_entities.projects, self.grouped_directives.project_directives)]
-
-        return reduce(lambda scrape_a, scrape_b: {**scrape_a, **scrape_b}, scrapes)
+        return scrape.result()
 
     @staticmethod
-    def apply_directives(entities, directives):
+    def group_directives(directives: Iterable[Directive]) -> dict:
         """
-        Applies scrape directives: for each, calls it matcher and reduces output using directive's reducer function
-        A dictionary of results is returned
-
-        :param entities:
+        groups directives by the entity type of the submission they apply to
         :param directives:
-        :return:
+        :return: a dict of submission entity type (e.g biomaterials, files, ...) to a list of directives
         """
-        scrape_result = dict()
-
-        for directive in directives:
-            found_values = directive.apply(entities)
-            scrape_result[directive.placeholder] = directive.reducer(found_values)
-
-        return scrape_result
+        return {entity_type: [directive for directive in directives if directive.entity_type == directive_entity_type]
+                for (entity_type, directive_entity_type) in SubmissionScraper.DIRECTIVE_ENTITY_TYPES.items()}
 
     @staticmethod
-    def group_directives(directives: Iterable[Directive]):
-        grouped_directives = SubmissionScraper.GroupedDirectives()
+    def from_file(file_path):
+        """
+        Returns a scraper for the scrape config at file_path. The config is only read and compiled on first use and
+        whenever the file has changed since, otherwise the previously built scraper is returned
+        :param file_path: path to a scrape config JSON file
+        :return: a SubmissionScraper for the config
+        """
+        file_path = os.path.abspath(file_path)
+        file_stat = os.stat(file_path)
+        file_version = (file_stat.st_mtime_ns, file_stat.st_size)
 
-        grouped_directives.biomaterial_directives = filter(lambda directive: directive.entity_type == 'biomaterial',directives)
-        grouped_directives.project_directives = filter(lambda directive: directive.entity_type == 'project', directives)
-        grouped_directives.protocol_directives = filter(lambda directive: directive.entity_type == 'protocol', directives)
-        grouped_directives.processes_directives = filter(lambda directive: directive.entity_type == 'process', directives)
-        grouped_directives.file_directives = filter(lambda directive: directive.entity_type == 'file', directives)
+        with SubmissionScraper._scrapers_from_file_lock:
+            cached = SubmissionScraper._scrapers_from_file.get(file_path)
+            if cached and cached[0] == file_version:
+                return cached[1]
 
-        return grouped_directives
+            scrape_configs = SubmissionScraper.scrape_configs_from_file(file_path)
+            directives = SubmissionScraper.directives_from_scrape_configs(scrape_configs)
+            submission_scraper = SubmissionScraper(list(directives))
 
-    @staticmethod
-    def from_file(file_path):
-        scrape_configs = SubmissionScraper.scrape_configs_from_file(file_path)
-        directives = SubmissionScraper.directives_from_scrape_configs(scrape_configs)
-        return SubmissionScraper(list(directives))
+            SubmissionScraper._scrapers_from_file[file_path] = (file_version, submission_scraper)
+            return submission_scraper
 
     @staticmethod
     def scrape_configs_from_dicts(configs: Iterable[dict]) -> Generator[ScrapeConfig, None, None]:
@@ -323,7 +658,20 @@ class SubmissionScraper:
                                                                      scrape_config.entity_type,
                                                                      scrape_config.identifier,
                                                                      scrape_config.path,
-                                                                     SubmissionScraper.reducer_for(scrape_config.post_process)), scrape_configs)
+                                                                     SubmissionScraper.reducer_for(scrape_config.post_process),
+                                                                     scrape_config.post_process), scrape_configs)
+
+    @staticmethod
+    def accumulator_for(post_process_func: str, reducer=None) -> 'SubmissionScraper.Accumulator':
+        if post_process_func == "sum":
+            return SubmissionScraper.SumAccumulator()
+        elif post_process_func == "count":
+            return SubmissionScraper.CountAccumulator()
+        elif post_process_func == "unique":
+            return SubmissionScraper.UniqueAccumulator()
+        else:
+            reducer = reducer if reducer else SubmissionScraper.reducer_for(post_process_func)
+            return SubmissionScraper.Accumulator(reducer)
 
     @staticmethod
     def reducer_for(post_process_func: str):
@@ -1,11 +1,17 @@
 from broker.service.summary_service import SummaryService
-from broker.common.util.tsv_summary_util import TSVSummaryUtil
+from broker.service.batch_summarizer import BatchSummarizer
+from broker.common.util.tsv_summary_util import TSVSummaryUtil, SUMMARY_ROW_HEADERS
 from ingest.api.ingestapi import IngestApi
 
+from concurrent.futures import ThreadPoolExecutor
+
+import sys
 import uuid
 import jsonpickle
 import argparse
 
+DEFAULT_WORKERS = 4
+
 
 def generate_submission_summary(uuid, ingest_url):
     ingest_api = IngestApi(ingest_url)
@@ -31,21 +37,57 @@ def check_uuid(uuid_str):
         raise argparse.ArgumentTypeError("%s is an invalid uuid value" % uuid_str)
 
 
-if __name__ == '__main__':
-    parser = argparse.ArgumentParser(description='Process some integers.')
-    parser.add_argument('ingest_api', metavar='H', nargs=1, help='the url of the ingest API (e.g http://api.ingest.dev.data.humancellatlas.org)')
-    parser.add_argument('summary_type', metavar='T', nargs=1, choices=['project', 'submission'], help='the type of summary (project or submission)')
-    parser.add_argument('uuid', metavar='U', nargs=1, type=check_uuid,help='the uuid of the project/submission')
-    parser.add_argument('output_format', metavar='O', nargs=1, choices=['json', 'tsv'], help='summary output format')
+def read_uuids(lines):
+    """
+    :param lines: lines of a file listing one uuid per line; blank lines and lines starting with # are skipped
+    :return: a generator of the listed uuids, checked as they are read
+    """
+    for line in lines:
+        line = line.strip()
+        if line and not line.startswith('#'):
+            yield check_uuid(line)
+
+
+def generate_bulk_summaries(ingest_url, summary_type, uuids, output_format, output, workers=None) -> int:
+    """
+    Summarises many submissions or projects with one ingest client and summary cache, on a pool of workers, writing
+    each summary to the output as soon as it completes: as a line of JSON, or as TSV rows
+    :param uuids: uuids of the submissions or projects
+    :param output: a text file to write to
+    :param workers: number of summaries computed at once
+    :return: the number of uuids that couldn't be summarised
+    """
+    summary_service = SummaryService(IngestApi(ingest_url))
+    encoded = output_format == 'json'
+
+    if not encoded:
+        output.writelines(TSVSummaryUtil.tsv_lines([], SUMMARY_ROW_HEADERS))
+
+    failures = 0
+    with ThreadPoolExecutor(max_workers=DEFAULT_WORKERS if not workers else workers) as executor:
+        batch_summarizer = BatchSummarizer(summary_service, executor)
+        if summary_type == 'project':
+            results = batch_summarizer.summarize(project_uuids=uuids, encoded=encoded)
+        else:
+            results = batch_summarizer.summarize(submission_uuids=uuids, encoded=encoded)
 
+        for result in results:
+            if result.error is not None:
+                failures += 1
+                print('Failed to summarise {0} {1}: {2}'.format(result.summary_type, result.uuid, result.error),
+                      file=sys.stderr)
 
-    args = parser.parse_args()
+            if encoded:
+                output.write(result.to_ndjson().decode('utf-8'))
+            elif result.error is None:
+                output.writelines(TSVSummaryUtil.tsv_lines(TSVSummaryUtil.summary_rows(result.summary_type, result.uuid,
+                                                                                        result.summary)))
+            output.flush()
+
+    return failures
 
-    uuid_str = args.uuid[0]
-    summary_type = args.summary_type[0]
-    ingest_url = args.ingest_api[0]
-    output_format = args.output_format[0]
 
+def generate_summary(ingest_url, summary_type, uuid_str, output_format):
     summary = generate_project_summary(uuid_str, ingest_url) if summary_type == 'project' else generate_submission_summary(uuid_str, ingest_url)
 
     if output_format == 'json':
@@ -57,4 +99,45 @@ if __name__ == '__main__':
             TSVSummaryUtil.submission_summary_to_tsv(summary)
 
 
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Summarise HCA submissions or projects. With a single uuid, prints '
+                                                 'the JSON summary, or writes report.tsv and scrape.tsv. With several '
+                                                 'uuids, a uuid file, or any of the bulk options, streams a summary '
+                                                 'per uuid as it completes')
+    parser.add_argument('ingest_api', metavar='H', nargs=1, help='the url of the ingest API (e.g http://api.ingest.dev.data.humancellatlas.org)')
+    parser.add_argument('summary_type', metavar='T', nargs=1, choices=['project', 'submission'], help='the type of summary (project or submission)')
+    parser.add_argument('uuid', metavar='U', nargs='*', type=check_uuid, help='the uuid(s) of the projects/submissions; read from stdin if none are given')
+    parser.add_argument('output_format', metavar='O', nargs=1, choices=['json', 'tsv'], help='summary output format')
+    parser.add_argument('--uuid-file', help='file listing one uuid per line, - for stdin')
+    parser.add_argument('--workers', type=int, help='number of summaries computed at once (default {0})'.format(DEFAULT_WORKERS))
+    parser.add_argument('--output', help='file to write the summaries to, instead of stdout')
+
+    args = parser.parse_args()
+
+    summary_type = args.summary_type[0]
+    ingest_url = args.ingest_api[0]
+    output_format = args.output_format[0]
+
+    is_bulk = len(args.uuid) != 1 or args.uuid_file or args.workers or args.output
+    if not is_bulk:
+        generate_summary(ingest_url, summary_type, args.uuid[0], output_format)
+        sys.exit(0)
+
+    uuids = list(args.uuid)
+    try:
+        if args.uuid_file and args.uuid_file != '-':
+            with open(args.uuid_file) as uuid_file:
+                uuids.extend(read_uuids(uuid_file))
+        elif args.uuid_file or not args.uuid:
+            uuids.extend(read_uuids(sys.stdin))
+    except argparse.ArgumentTypeError as e:
+        parser.error(str(e))
+
+    output = open(args.output, 'w', newline='') if args.output else sys.stdout
+    try:
+        failures = generate_bulk_summaries(ingest_url, summary_type, uuids, output_format, output, args.workers)
+    finally:
+        if output is not sys.stdout:
+            output.close()
 
+    sys.exit(1 if failures else 0)
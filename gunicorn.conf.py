@@ -0,0 +1,66 @@
+# Production server settings for the broker: gunicorn --config gunicorn.conf.py
+import multiprocessing
+import os
+import signal
+import threading
+
+wsgi_app = 'broker.brokerapi.broker_api:app'
+bind = '0.0.0.0:{0}'.format(os.environ.get('PORT', 5000))
+
+# one worker process per core by default; each serves requests on a pool of threads. Every submission events stream
+# served here holds one of them, so a worker serves only SUBMISSION_EVENTS_MAX_STREAMS of them at once, which must stay
+# below the number of threads; set SUBMISSION_EVENTS_URL to serve them from the asyncio broker instead
+workers = int(os.environ.get('GUNICORN_WORKERS', multiprocessing.cpu_count()))
+threads = int(os.environ.get('GUNICORN_THREADS', 8))
+worker_class = 'gthread'
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 120))
+
+# on SIGTERM, workers get GUNICORN_GRACEFUL_TIMEOUT seconds to finish in-flight requests, imports and summary refreshes
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 120))
+
+# the app is loaded once, before the workers are forked, so they share its code and whatever it has loaded; pools of
+# workers, such as the import scheduler's, are created in each worker on first use rather than inherited
+preload_app = True
+
+# set PREWARM_SUBMISSIONS to summarise that many of the most recent submissions before the workers are forked, for at
+# most PREWARM_TIMEOUT seconds
+prewarm_submissions = int(os.environ.get('PREWARM_SUBMISSIONS', 0))
+prewarm_timeout = int(os.environ.get('PREWARM_TIMEOUT', 60))
+
+accesslog = '-'
+
+
+def when_ready(server):
+    from broker.brokerapi import broker_api
+    from broker.service.summary_service import SubmissionScraper, SCRAPE_CONFIG_PATH
+
+    SubmissionScraper.from_file(SCRAPE_CONFIG_PATH)
+    if prewarm_submissions:
+        try:
+            broker_api.prewarm_summaries(prewarm_submissions, prewarm_timeout)
+        except Exception:
+            server.log.exception('Failed to pre-warm summaries')
+
+
+def post_worker_init(worker):
+    from broker.brokerapi import broker_api
+
+    # open event streams would otherwise keep the worker waiting out the whole graceful timeout
+    handle_exit = worker.handle_exit
+
+    def drain(sig, frame):
+        handle_exit(sig, frame)
+        threading.Thread(target=broker_api.submission_watchers.close, daemon=True).start()
+
+    signal.signal(signal.SIGTERM, drain)
+
+
+def worker_exit(server, worker):
+    if worker.pid != os.getpid():
+        return  # the master is cleaning up after a worker that is already gone
+
+    from broker.brokerapi import broker_api
+
+    # runs in the worker once it has stopped serving; imports already accepted are finished rather than dropped
+    broker_api.import_scheduler.shutdown(wait=True)
+    broker_api.summary_refresher.shutdown(wait=True)
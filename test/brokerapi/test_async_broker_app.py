@@ -0,0 +1,122 @@
+import json
+
+from unittest.mock import patch
+
+from aiohttp.test_utils import AioHTTPTestCase, TestServer
+
+from benchmarks.stand_in_ingest_api import generate_project
+from broker.brokerapi import async_broker_api
+from broker.brokerapi.async_broker_api import create_app
+
+
+class AsyncBrokerAppTest(AioHTTPTestCase):
+
+    async def asyncSetUp(self):
+        self.stand_in = generate_project(submissions=2, entities=10)
+        self.ingest_server = TestServer(self.stand_in.create_app())
+        await self.ingest_server.start_server()
+        await super().asyncSetUp()
+
+    async def asyncTearDown(self):
+        await super().asyncTearDown()
+        await self.ingest_server.close()
+
+    async def get_application(self):
+        return create_app(ingest_url=str(self.ingest_server.make_url('')))
+
+    async def test_submission_summary_conditional_get(self):
+        # when:
+        response = await self.client.get('/submissions/submission-0/summary')
+
+        # then:
+        self.assertEqual(200, response.status)
+        summary = await response.json()
+        self.assertEqual(10, summary['biomaterial_summary']['count'])
+        etag = response.headers['ETag']
+        last_modified = response.headers['Last-Modified']
+        self.assertEqual('Thu, 19 Jul 2018 13:55:13 GMT', last_modified)
+
+        # when:
+        response = await self.client.get('/submissions/submission-0/summary', headers={'If-None-Match': etag})
+
+        # then:
+        self.assertEqual(304, response.status)
+        self.assertEqual(etag, response.headers['ETag'])
+
+        # when:
+        requests = self.stand_in.requests
+        response = await self.client.get('/submissions/submission-0/summary',
+                                         headers={'If-Modified-Since': last_modified})
+
+        # then: only the submission is looked up, as its summary is cached
+        self.assertEqual(304, response.status)
+        self.assertEqual(etag, response.headers['ETag'])
+        self.assertEqual(requests + 1, self.stand_in.requests)
+
+        # when:
+        response = await self.client.get('/submissions/submission-0/summary',
+                                         headers={'If-None-Match': '"another-etag"'})
+
+        # then:
+        self.assertEqual(200, response.status)
+
+    async def test_project_summary(self):
+        # when:
+        response = await self.client.get('/projects/project-uuid/summary')
+
+        # then:
+        self.assertEqual(200, response.status)
+        summary = await response.json()
+        self.assertEqual(20, summary['biomaterial_summary']['count'])
+        etag = response.headers['ETag']
+        self.assertNotIn('Last-Modified', response.headers)
+
+        # when:
+        response = await self.client.get('/projects/project-uuid/summary', headers={'If-None-Match': etag})
+
+        # then:
+        self.assertEqual(304, response.status)
+
+        # when: without a Last-Modified date, If-Modified-Since can't match
+        response = await self.client.get('/projects/project-uuid/summary',
+                                         headers={'If-Modified-Since': 'Thu, 19 Jul 2018 13:55:13 GMT'})
+
+        # then:
+        self.assertEqual(200, response.status)
+
+        # when:
+        response = await self.client.get('/summaries/cache')
+
+        # then:
+        self.assertEqual(2, (await response.json())['size'])
+
+    async def test_submission_events(self):
+        # given:
+        with patch.object(async_broker_api, 'SUBMISSION_EVENTS_MAX_AGE', 0.5):
+            # when:
+            response = await self.client.get('/submissions/submission-0/events')
+
+            # then:
+            self.assertEqual(200, response.status)
+            self.assertEqual('text/event-stream', response.headers['Content-Type'])
+            self.assertEqual('*', response.headers['Access-Control-Allow-Origin'])
+            body = (await response.read()).decode('utf-8')
+
+        messages = body.split('\n\n')
+        self.assertEqual('retry: 5000', messages[0])
+        (submission_event, files_event) = messages[1:3]
+        self.assertTrue(submission_event.startswith('event: submission\n'))
+        self.assertEqual('Valid', json.loads(submission_event.split('data: ')[1])['submissionState'])
+        self.assertTrue(files_event.startswith('event: files\n'))
+        self.assertEqual(10, len(json.loads(files_event.split('data: ')[1])['changed']))
+        # the stream ends after its max age, and the page opens another
+        self.assertEqual(['event: end\ndata: {}', ''], messages[-2:])
+        self.assertEqual([], self.app[async_broker_api.submission_watchers_key].watched())
+
+    async def test_submission_events_beyond_max_streams_are_turned_away(self):
+        with patch.object(async_broker_api, 'SUBMISSION_EVENTS_MAX_STREAMS', 0):
+            # when:
+            response = await self.client.get('/submissions/submission-0/events')
+
+        # then:
+        self.assertEqual(204, response.status)
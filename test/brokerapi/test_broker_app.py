@@ -1,8 +1,16 @@
+import io
+import os
+import threading
+import time
+
 from unittest import TestCase
 from unittest.mock import patch
 
 from broker.brokerapi import broker_api
 from broker.brokerapi.broker_api import app
+from broker.common.submission_summary import SubmissionSummary
+from broker.common.util.json_summary_util import EncodedSummary
+from broker.service.summary_service import SummaryService
 
 class BrokerAppTest(TestCase):
 
@@ -27,3 +35,374 @@ class BrokerAppTest(TestCase):
 
             # then:
             self.assertEqual(500, response.status_code)
+
+    def test_upload_is_streamed_to_unique_file(self):
+        with patch.object(broker_api, 'ingest_clients') as ingest_clients, \
+                patch.object(broker_api, '_submit_spreadsheet_data') as submit_spreadsheet_data, \
+                patch.object(broker_api, 'recent_uploads', broker_api.RecentUploads(60)):
+            ingest_clients.client_for_token.return_value.createSubmission.side_effect = ['submission-url-1',
+                                                                                         'submission-url-2']
+            ingest_clients.client.return_value.getObjectUuid.return_value = 'submission-uuid'
+
+            # when:
+            responses = [self.client.post('/api_upload', headers={'Authorization': 'auth'},
+                                          data={'file': (io.BytesIO(content), 'metadata.xlsx')},
+                                          content_type='multipart/form-data')
+                         for content in [b'a spreadsheet', b'another spreadsheet', b'a spreadsheet']]
+
+            # then: the identical re-upload is answered with the submission created for it
+            self.assertEqual([201, 201, 201], [response.status_code for response in responses])
+            self.assertEqual(2, ingest_clients.client_for_token.return_value.createSubmission.call_count)
+            self.assertEqual(2, submit_spreadsheet_data.call_count)
+
+            paths = [submit_call[0][1] for submit_call in submit_spreadsheet_data.call_args_list]
+            try:
+                self.assertNotEqual(paths[0], paths[1])
+                with open(paths[1], 'rb') as spreadsheet:
+                    self.assertEqual(b'another spreadsheet', spreadsheet.read())
+            finally:
+                for path in paths:
+                    os.remove(path)
+
+    def test_upload_failing_to_queue_is_cleaned_up(self):
+        recent_uploads = broker_api.RecentUploads(60)
+
+        with patch.object(broker_api, 'ingest_clients') as ingest_clients, \
+                patch.object(broker_api, '_submit_spreadsheet_data') as submit_spreadsheet_data, \
+                patch.object(broker_api, 'recent_uploads', recent_uploads):
+            ingest_clients.client_for_token.return_value.createSubmission.return_value = 'submission-url'
+            submit_spreadsheet_data.side_effect = RuntimeError('cannot schedule new futures after shutdown')
+
+            # when:
+            response = self.client.post('/api_upload', headers={'Authorization': 'auth'},
+                                        data={'file': (io.BytesIO(b'a spreadsheet'), 'metadata.xlsx')},
+                                        content_type='multipart/form-data')
+
+            # then: the upload is gone, and uploading it again imports it again
+            self.assertEqual(500, response.status_code)
+            (path, upload_key) = (submit_spreadsheet_data.call_args[0][1], submit_spreadsheet_data.call_args[0][4])
+            self.assertFalse(os.path.exists(path))
+            self.assertIsNone(recent_uploads.get(upload_key))
+
+    def test_upload_too_large(self):
+        with patch.object(broker_api, 'spreadsheet_max_size', 10), \
+                patch.object(broker_api, 'ingest_clients') as ingest_clients:
+            # when:
+            response = self.client.post('/api_upload', headers={'Authorization': 'auth'},
+                                        data={'file': (io.BytesIO(b'a large spreadsheet'), 'metadata.xlsx')},
+                                        content_type='multipart/form-data')
+
+            # then:
+            self.assertEqual(413, response.status_code)
+            ingest_clients.client_for_token.return_value.createSubmission.assert_not_called()
+
+    def test_failed_import_is_cleaned_up(self):
+        recent_uploads = broker_api.RecentUploads(60)
+        import_scheduler = broker_api.ImportScheduler(max_workers=1, max_queue=0)
+        upload = broker_api.SpreadsheetUpload('metadata.xlsx')
+        upload.write(b'a spreadsheet')
+        path = upload.claim()
+        recent_uploads.register('upload-key', 'submission-url')
+
+        with patch.object(broker_api, 'recent_uploads', recent_uploads), \
+                patch.object(broker_api, 'import_scheduler', import_scheduler), \
+                patch.object(broker_api, '_do_import') as do_import:
+            do_import.side_effect = ValueError('Invalid spreadsheet')
+
+            trace = broker_api.ImportTrace('metadata.xlsx')
+            trace.submission_url = 'submission-url'
+
+            # when:
+            broker_api._submit_spreadsheet_data(None, path, 'submission-url', None, 'upload-key', trace=trace)
+            import_scheduler.shutdown()
+
+        # then:
+        self.assertFalse(os.path.exists(path))
+        self.assertIsNone(recent_uploads.get('upload-key'))
+        self.assertEqual(0, import_scheduler.pending())
+
+        # when:
+        response = self.client.get('/imports/traces?sort=wall_time')
+
+        # then:
+        self.assertEqual(200, response.status_code)
+        reported_trace = response.get_json()[0]
+        self.assertEqual('submission-url', reported_trace['submission_url'])
+        self.assertEqual('Invalid spreadsheet', reported_trace['error'])
+
+    def test_upload_turned_away_when_import_queue_is_full(self):
+        import_scheduler = broker_api.ImportScheduler(max_workers=1, max_queue=0, retry_after=42)
+        reservation = import_scheduler.reserve()
+
+        with patch.object(broker_api, 'import_scheduler', import_scheduler), \
+                patch.object(broker_api, 'ingest_clients') as ingest_clients:
+            # when:
+            response = self.client.post('/api_upload', headers={'Authorization': 'auth'},
+                                        data={'file': (io.BytesIO(b'a spreadsheet'), 'metadata.xlsx')},
+                                        content_type='multipart/form-data')
+
+            # then:
+            self.assertEqual(503, response.status_code)
+            self.assertEqual('42', response.headers['Retry-After'])
+            ingest_clients.client_for_token.return_value.createSubmission.assert_not_called()
+
+        reservation.cancel()
+        import_scheduler.shutdown()
+
+    def test_submission_summary_conditional_get(self):
+        submission = {'updateDate': '2018-07-19T13:55:13.392Z'}
+        encoded_summary = EncodedSummary(b'{"summary": 1}', '2018-07-19T13:55:13.392Z')
+
+        with patch.object(broker_api, 'ingest_clients') as ingest_clients, \
+                patch.object(SummaryService, 'encoded_summary_for_submission') as encoded_summary_for_submission:
+            ingest_clients.client.return_value.getSubmissionByUuid.return_value = submission
+            encoded_summary_for_submission.return_value = encoded_summary
+
+            # when:
+            response = self.client.get('/submissions/submission-uuid/summary')
+
+            # then:
+            self.assertEqual(200, response.status_code)
+            self.assertEqual(b'{"summary": 1}', response.data)
+            etag = response.headers['ETag']
+            last_modified = response.headers['Last-Modified']
+            self.assertEqual('Thu, 19 Jul 2018 13:55:13 GMT', last_modified)
+
+            # when:
+            response = self.client.get('/submissions/submission-uuid/summary', headers={'If-None-Match': etag})
+
+            # then:
+            self.assertEqual(304, response.status_code)
+            self.assertEqual(b'', response.data)
+            self.assertEqual(etag, response.headers['ETag'])
+
+            # when:
+            response = self.client.get('/submissions/submission-uuid/summary',
+                                       headers={'If-Modified-Since': last_modified})
+
+            # then: with the entity tag the full response would have had
+            self.assertEqual(304, response.status_code)
+            self.assertEqual(etag, response.headers['ETag'])
+
+            # when:
+            response = self.client.get('/submissions/submission-uuid/summary',
+                                       headers={'If-None-Match': '"another-etag"'})
+
+            # then:
+            self.assertEqual(200, response.status_code)
+
+    def test_stale_summary_has_no_last_modified(self):
+        encoded_summary = EncodedSummary(b'{"is_stale": true}')
+
+        with patch.object(broker_api, 'ingest_clients') as ingest_clients, \
+                patch.object(SummaryService, 'encoded_summary_for_project') as encoded_summary_for_project:
+            ingest_clients.client.return_value.getProjectByUuid.return_value = {}
+            encoded_summary_for_project.return_value = encoded_summary
+
+            # when:
+            response = self.client.get('/projects/project-uuid/summary')
+
+            # then:
+            self.assertEqual(200, response.status_code)
+            self.assertIn('ETag', response.headers)
+            self.assertNotIn('Last-Modified', response.headers)
+
+    def test_batch_summaries(self):
+        with patch.object(broker_api, 'ingest_clients') as ingest_clients, \
+                patch.object(broker_api, 'summary_service', None), \
+                patch.object(SummaryService, 'encoded_summary_for_submission') as encoded_summary_for_submission:
+            ingest_api = ingest_clients.client.return_value
+            ingest_api.getSubmissionByUuid.side_effect = lambda uuid: {'uuid': {'uuid': uuid}}
+            ingest_api.getProjectByUuid.side_effect = Exception('404 Client Error')
+            encoded_summary_for_submission.return_value = EncodedSummary(b'{"summary": 1}')
+
+            # when:
+            response = self.client.post('/summaries/batch', json={'submissions': ['submission-uuid'],
+                                                                  'projects': ['project-uuid']})
+
+            # then:
+            self.assertEqual(200, response.status_code)
+            self.assertEqual('application/x-ndjson', response.mimetype)
+            lines = sorted(response.data.splitlines())
+            self.assertEqual([b'{"type": "project", "uuid": "project-uuid", "error": "404 Client Error"}',
+                              b'{"type": "submission", "uuid": "submission-uuid", "summary": {"summary": 1}}'], lines)
+
+            # when:
+            response = self.client.post('/summaries/batch', json={'submissions': 'submission-uuid'})
+
+            # then:
+            self.assertEqual(400, response.status_code)
+
+            # when:
+            with patch.object(broker_api, 'BATCH_MAX_SIZE', 1):
+                response = self.client.post('/summaries/batch', json={'submissions': ['uuid-1', 'uuid-2']})
+
+            # then:
+            self.assertEqual(400, response.status_code)
+
+    def test_submission_summary_tsv_is_streamed(self):
+        submission_summary = SubmissionSummary()
+        submission_summary.biomaterial_summary.add_entity('donor_organism', 3)
+
+        with patch.object(broker_api, 'ingest_clients'), \
+                patch.object(SummaryService, 'summary_for_submission') as summary_for_submission:
+            summary_for_submission.return_value = submission_summary
+
+            # when:
+            response = self.client.get('/submissions/submission-uuid/summary.tsv', buffered=False)
+
+            # then:
+            self.assertEqual(200, response.status_code)
+            self.assertEqual('text/tab-separated-values', response.mimetype)
+            self.assertIsNone(response.content_length)
+            self.assertEqual(['type\tuuid\tkind\tname\tvalue\n',
+                              'submission\tsubmission-uuid\tcount\tdonor_organism\t3\n'],
+                             [chunk.decode('utf-8') for chunk in response.response])
+
+    def test_summary_service_is_shared_between_requests(self):
+        with patch.object(broker_api, 'ingest_clients') as ingest_clients, \
+                patch.object(broker_api, 'summary_service', None):
+            summary_service = broker_api._summary_service()
+
+            self.assertIs(summary_service, broker_api._summary_service())
+            self.assertIs(ingest_clients.client.return_value, summary_service.ingestapi)
+            self.assertIs(broker_api.submission_summary_cache, summary_service.submission_summary_cache)
+            # so that one slow submission doesn't hold up a project's summary
+            self.assertEqual(30, summary_service.submission_timeout)
+            self.assertEqual(broker_api.project_summary_concurrency, summary_service.project_concurrency)
+
+    def test_prewarm_summaries(self):
+        submissions = [{'uuid': {'uuid': 'submission-{0}'.format(index)}} for index in range(3)]
+
+        with patch.object(broker_api, 'ingest_clients') as ingest_clients, \
+                patch.object(SummaryService, 'encoded_summary_for_submission') as encoded_summary_for_submission:
+            ingest_clients.client.return_value.getSubmissions.return_value = submissions
+            encoded_summary_for_submission.side_effect = [None, Exception('Ingest API error'), None]
+
+            # when:
+            summarised = broker_api.prewarm_summaries(5)
+
+            # then: a failed submission doesn't stop the rest
+            self.assertEqual(2, summarised)
+            self.assertEqual(submissions, [summary_call[0][0] for summary_call
+                                           in encoded_summary_for_submission.call_args_list])
+
+            # when:
+            summarised = broker_api.prewarm_summaries(5, timeout=0)
+
+            # then:
+            self.assertEqual(0, summarised)
+
+    def test_submission_view_resources_are_cached_by_update_date(self):
+        submission = {
+            'submissionState': 'Valid',
+            'uuid': {'uuid': 'submission-uuid'},
+            '_links': {'self': {'href': 'http://ingest/submissionEnvelopes/submission-id'}},
+            'submissionDate': '2018-07-19T13:55:13.392Z',
+            'updateDate': '2018-07-19T13:55:13.392Z',
+            'stagingDetails': {}
+        }
+
+        with patch.object(broker_api, 'ingest_clients') as ingest_clients, \
+                patch.object(broker_api, 'submission_view_cache', broker_api.ExpiringDict(10, 60)):
+            ingest_api = ingest_clients.client.return_value
+            ingest_api.getSubmissionIfModifiedSince.return_value = submission
+            ingest_api.getProjects.return_value = {'_embedded': {'projects': [
+                {'uuid': {'uuid': 'project-uuid'}, 'content': {'name': 'A project', 'description': ''}}]}}
+            ingest_api.getFiles.return_value = {}
+            ingest_api.getBundleManifests.return_value = {}
+
+            # when:
+            first_response = self.client.get('/submissions/submission-id')
+            second_response = self.client.get('/submissions/submission-id')
+
+            # then:
+            self.assertEqual(200, first_response.status_code)
+            self.assertIn(b'A project', second_response.data)
+            ingest_api.getProjects.assert_called_once_with('submission-id')
+            ingest_api.getFiles.assert_called_once_with('submission-id')
+            ingest_api.getBundleManifests.assert_called_once_with('submission-id')
+
+            # when:
+            submission['updateDate'] = '2018-07-20T09:00:00.000Z'
+            self.client.get('/submissions/submission-id')
+
+            # then:
+            self.assertEqual(2, ingest_api.getProjects.call_count)
+
+    def test_submission_view_resources_are_fetched_concurrently(self):
+        def slow_fetch(submission_id):
+            time.sleep(0.5)
+            return {}
+
+        with patch.object(broker_api, 'ingest_clients') as ingest_clients:
+            ingest_api = ingest_clients.client.return_value
+            ingest_api.getProjects.side_effect = slow_fetch
+            ingest_api.getFiles.side_effect = slow_fetch
+            ingest_api.getBundleManifests.side_effect = slow_fetch
+
+            # when:
+            start = time.monotonic()
+            resources = broker_api._get_submission_view_resources(ingest_api, 'submission-id', None)
+
+            # then:
+            self.assertEqual(({}, {}, {}), resources)
+            self.assertLess(time.monotonic() - start, 1.4)
+
+    def test_submission_events(self):
+        submission_watchers = broker_api.SubmissionWatcherHub(
+            lambda submission_id: {'submissionState': 'Valid', 'updateDate': 'update-date', '_links': {}},
+            lambda submission_id: {}, poll_interval=60)
+
+        with patch.object(broker_api, 'submission_watchers', submission_watchers):
+            # when:
+            response = self.client.get('/submissions/submission-id/events', buffered=False)
+            events = iter(response.response)
+
+            # then:
+            self.assertEqual('text/event-stream', response.mimetype)
+            self.assertEqual(b'retry: 60000\n\n', next(events))
+            self.assertTrue(next(events).startswith(b'event: submission\ndata: {"submissionState": "Valid"'))
+            self.assertEqual(['submission-id'], submission_watchers.watched())
+
+            # when:
+            response.close()
+
+            # then:
+            self.assertEqual([], submission_watchers.watched())
+
+    def test_submission_events_beyond_max_streams_are_turned_away(self):
+        submission_watchers = broker_api.SubmissionWatcherHub(lambda submission_id: None, lambda submission_id: {},
+                                                              poll_interval=60)
+
+        with patch.object(broker_api, 'submission_watchers', submission_watchers), \
+                patch.object(broker_api, 'submission_event_streams', threading.BoundedSemaphore(1)):
+            response = self.client.get('/submissions/submission-id/events', buffered=False)
+
+            # when:
+            turned_away = self.client.get('/submissions/submission-id/events', buffered=False)
+
+            # then: no content, so that the page polls instead
+            self.assertEqual(204, turned_away.status_code)
+
+            # when:
+            response.close()
+            response = self.client.get('/submissions/submission-id/events', buffered=False)
+
+            # then:
+            self.assertEqual(200, response.status_code)
+            response.close()
+
+    def test_submission_events_end_after_max_age(self):
+        submission_watchers = broker_api.SubmissionWatcherHub(lambda submission_id: None, lambda submission_id: {},
+                                                              poll_interval=60)
+
+        with patch.object(broker_api, 'submission_watchers', submission_watchers), \
+                patch.object(broker_api, 'SUBMISSION_EVENTS_MAX_AGE', 0):
+            # when:
+            response = self.client.get('/submissions/submission-id/events', buffered=False)
+
+            # then:
+            self.assertEqual([b'retry: 60000\n\n', b'event: end\ndata: {}\n\n'], list(response.response))
+            response.close()
+            self.assertEqual([], submission_watchers.watched())
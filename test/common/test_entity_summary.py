@@ -1,6 +1,9 @@
 from unittest import TestCase
 from broker.common.entity_summary import EntitySummary
 
+import json
+import jsonpickle
+
 
 class EntitySummaryTest(TestCase):
 
@@ -30,3 +33,97 @@ class EntitySummaryTest(TestCase):
         # assert original summary wasn't modified by the add
         assert entity_summary.count == 1008
         assert len(entity_summary.breakdown.items()) == 3
+
+    def test_add_does_not_modify_breakdown_of_either_summary(self):
+        entity_summary = EntitySummary()
+        entity_summary.breakdown['reanimated_donor'] = {'count': 5}
+        entity_summary.count = 5
+
+        another_entity_summary = EntitySummary()
+        another_entity_summary.breakdown['reanimated_donor'] = {'count': 11}
+        another_entity_summary.breakdown['nanomachine'] = {'count': 2000}
+        another_entity_summary.count = 2011
+
+        added_together = entity_summary + another_entity_summary
+        added_together += another_entity_summary
+
+        assert added_together.breakdown['reanimated_donor']['count'] == 27
+        assert entity_summary.breakdown['reanimated_donor']['count'] == 5
+        assert another_entity_summary.breakdown['reanimated_donor']['count'] == 11
+        assert another_entity_summary.breakdown['nanomachine']['count'] == 2000
+
+    def test_subtract_entity_summary(self):
+        entity_summary = EntitySummary()
+        entity_summary.breakdown['reanimated_donor'] = {'count': 16}
+        entity_summary.breakdown['nanomachine'] = {'count': 3000}
+        entity_summary.count = 3016
+
+        another_entity_summary = EntitySummary()
+        another_entity_summary.breakdown['reanimated_donor'] = {'count': 11}
+        another_entity_summary.breakdown['nanomachine'] = {'count': 3000}
+        another_entity_summary.count = 3011
+
+        subtracted = entity_summary - another_entity_summary
+        assert subtracted.count == 5
+        assert subtracted.breakdown['reanimated_donor']['count'] == 5
+        assert 'nanomachine' not in subtracted.breakdown
+
+        # assert original summaries weren't modified by the subtraction
+        assert entity_summary.breakdown['reanimated_donor']['count'] == 16
+        assert entity_summary.breakdown['nanomachine']['count'] == 3000
+
+    def test_add_in_place(self):
+        entity_summary = EntitySummary()
+        entity_summary.add_entity('reanimated_donor', 5)
+
+        another_entity_summary = EntitySummary()
+        another_entity_summary.add_entity('reanimated_donor', 11)
+        another_entity_summary.add_entity('nanomachine')
+
+        summary_before_add = entity_summary
+        entity_summary += another_entity_summary
+
+        assert entity_summary is summary_before_add
+        assert entity_summary.count == 17
+        assert entity_summary.breakdown['reanimated_donor']['count'] == 16
+        assert entity_summary.breakdown['nanomachine']['count'] == 1
+        assert another_entity_summary.count == 12
+        assert another_entity_summary.breakdown['reanimated_donor']['count'] == 11
+
+    def test_breakdown_writes_through(self):
+        entity_summary = EntitySummary()
+        entity_summary.breakdown['reanimated_donor'] = {'count': 5}
+        entity_summary.breakdown['reanimated_donor']['count'] += 2
+
+        assert entity_summary.counts['reanimated_donor'] == 7
+        assert dict(entity_summary.breakdown['reanimated_donor']) == {'count': 7}
+        assert list(entity_summary.breakdown.keys()) == ['reanimated_donor']
+
+    def test_merge_summaries(self):
+        entity_summaries = []
+        for i in range(0, 7):
+            entity_summary = EntitySummary()
+            entity_summary.add_entity('reanimated_donor', i)
+            entity_summary.add_entity('nanomachine_{0}'.format(i % 2))
+            entity_summaries.append(entity_summary)
+
+        merged_summary = EntitySummary.merge(entity_summaries)
+
+        assert merged_summary.count == 21 + 7
+        assert merged_summary.breakdown['reanimated_donor']['count'] == 21
+        assert merged_summary.breakdown['nanomachine_0']['count'] == 4
+        assert merged_summary.breakdown['nanomachine_1']['count'] == 3
+
+        # assert merged summaries weren't modified by the merge
+        assert [entity_summary.count for entity_summary in entity_summaries] == [i + 1 for i in range(0, 7)]
+        assert EntitySummary.merge([]).count == 0
+
+    def test_json_shape(self):
+        entity_summary = EntitySummary()
+        entity_summary.add_entity('reanimated_donor', 5)
+        entity_summary.add_entity('nanomachine', 2)
+
+        encoded_summary = json.loads(jsonpickle.encode(entity_summary, unpicklable=False))
+        assert encoded_summary == {'count': 7, 'breakdown': {'reanimated_donor': {'count': 5},
+                                                             'nanomachine': {'count': 2}}}
+        assert list(encoded_summary.keys()) == ['count', 'breakdown']
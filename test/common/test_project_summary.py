@@ -1,6 +1,6 @@
 from unittest import TestCase
 from broker.common.submission_summary import SubmissionSummary
-from broker.common.project_summary import ProjectSummary
+from broker.common.project_summary import ProjectSummary, IncrementalProjectSummary
 
 
 class EntityServiceTest(TestCase):
@@ -35,3 +35,78 @@ class EntityServiceTest(TestCase):
 
         assert project_summary.file_summary.count == 150
         assert len(project_summary.file_summary.breakdown.items()) == 1
+
+    def test_incremental_summary_replaces_changed_submission(self):
+        incremental_summary = IncrementalProjectSummary()
+
+        first_submission_summary = SubmissionSummary()
+        first_submission_summary.file_summary.breakdown['cell_montage_file'] = {'count': 150}
+        first_submission_summary.file_summary.count = 150
+
+        second_submission_summary = SubmissionSummary()
+        second_submission_summary.file_summary.breakdown['cell_montage_file'] = {'count': 50}
+        second_submission_summary.file_summary.count = 50
+
+        incremental_summary.put_submission_summary('submission-1', 'update-date-1', first_submission_summary)
+        incremental_summary.put_submission_summary('submission-2', 'update-date-1', second_submission_summary)
+        assert incremental_summary.project_summary.file_summary.count == 200
+        assert incremental_summary.is_current('submission-1', 'update-date-1')
+        assert not incremental_summary.is_current('submission-1', 'update-date-2')
+
+        updated_submission_summary = SubmissionSummary()
+        updated_submission_summary.file_summary.breakdown['cell_montage_file'] = {'count': 160}
+        updated_submission_summary.file_summary.count = 160
+
+        incremental_summary.put_submission_summary('submission-1', 'update-date-2', updated_submission_summary)
+        assert incremental_summary.project_summary.file_summary.count == 210
+        assert incremental_summary.project_summary.file_summary.breakdown['cell_montage_file']['count'] == 210
+
+        incremental_summary.retain_submissions(['submission-1'])
+        assert incremental_summary.project_summary.file_summary.count == 160
+        assert not incremental_summary.is_current('submission-2', 'update-date-1')
+
+        # assert the submission summaries weren't modified by being added and subtracted
+        assert first_submission_summary.file_summary.breakdown['cell_montage_file']['count'] == 150
+        assert second_submission_summary.file_summary.breakdown['cell_montage_file']['count'] == 50
+
+    def test_incremental_project_summary_snapshot(self):
+        incremental_summary = IncrementalProjectSummary()
+
+        submission_summary = SubmissionSummary()
+        submission_summary.file_summary.add_entity('cell_montage_file', 150)
+        incremental_summary.put_submission_summary('submission-1', 'update-date-1', submission_summary)
+
+        snapshot = incremental_summary.snapshot()
+        assert snapshot is incremental_summary.snapshot()
+        assert snapshot.file_summary.count == 150
+
+        encode_calls = []
+
+        def encode(summary):
+            encode_calls.append(summary)
+            return b'encoded'
+
+        assert incremental_summary.encoded_snapshot(snapshot, encode) == b'encoded'
+        assert incremental_summary.encoded_snapshot(snapshot, encode) == b'encoded'
+        assert len(encode_calls) == 1
+
+        # a change to the project's submissions takes a new snapshot, which is encoded again
+        incremental_summary.retain_submissions([])
+        new_snapshot = incremental_summary.snapshot()
+        assert new_snapshot is not snapshot
+        assert new_snapshot.file_summary.count == 0
+        assert snapshot.file_summary.count == 150
+
+        incremental_summary.encoded_snapshot(new_snapshot, encode)
+        assert len(encode_calls) == 2
+
+    def test_incremental_project_summary_left_out_submissions(self):
+        incremental_summary = IncrementalProjectSummary()
+        incremental_summary.put_submission_summary('submission-1', 'update-date-1', SubmissionSummary())
+        assert not incremental_summary.snapshot().is_partial
+
+        incremental_summary.set_left_out(['submission-2'])
+        assert incremental_summary.snapshot().is_partial
+
+        incremental_summary.set_left_out([])
+        assert not incremental_summary.snapshot().is_partial
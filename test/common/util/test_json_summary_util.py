@@ -0,0 +1,31 @@
+from unittest import TestCase
+
+from broker.common.util.json_summary_util import JSONSummaryUtil
+from broker.common.submission_summary import SubmissionSummary
+from broker.common.project_summary import ProjectSummary
+
+import jsonpickle
+
+
+class JSONSummaryUtilTest(TestCase):
+
+    def test_encode_submission_summary_as_jsonpickle_does(self):
+        submission_summary = SubmissionSummary()
+        submission_summary.biomaterial_summary.add_entity('donor_organism', 3)
+        submission_summary.file_summary.add_entity('sequence_file', 20)
+        submission_summary.scrape_result = {'project_title': ['A title'], 'total_cell_count': 1000}
+        submission_summary.submission_status = 'Valid'
+        submission_summary.create_date = '2018-05-01T10:00:00Z'
+        submission_summary.last_updated_date = '2018-05-02T10:00:00Z'
+        submission_summary.is_stale = True
+
+        assert JSONSummaryUtil.encode(submission_summary) == \
+            jsonpickle.encode(submission_summary, unpicklable=False).encode('utf-8')
+
+    def test_encode_project_summary_as_jsonpickle_does(self):
+        project_summary = ProjectSummary()
+        project_summary.protocol_summary.add_entity('dissociation_protocol', 2)
+        project_summary.process_summary.add_entity('process', 5)
+
+        assert JSONSummaryUtil.encode(project_summary) == \
+            jsonpickle.encode(project_summary, unpicklable=False).encode('utf-8')
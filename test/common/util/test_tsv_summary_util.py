@@ -0,0 +1,63 @@
+import io
+
+from unittest import TestCase
+
+from broker.common.project_summary import ProjectSummary
+from broker.common.submission_summary import SubmissionSummary
+from broker.common.util.tsv_summary_util import TSVSummaryUtil, SUMMARY_ROW_HEADERS
+
+
+class TSVSummaryUtilTest(TestCase):
+
+    def setUp(self):
+        self.submission_summary = SubmissionSummary()
+        self.submission_summary.protocol_summary.add_entity('library_preparation_protocol', 2)
+        self.submission_summary.biomaterial_summary.add_entity('donor_organism', 3)
+        self.submission_summary.biomaterial_summary.add_entity('cell_suspension', 1)
+        self.submission_summary.scrape_result = {'num_donors': 3, 'organ': ['brain']}
+
+    def test_entity_count_tuples_are_produced_lazily(self):
+        breakdowns = TSVSummaryUtil.breakdowns_from_submission_summary(self.submission_summary)
+
+        # when:
+        entity_count_tuples = TSVSummaryUtil.entity_count_tuples_from_breakdowns(breakdowns)
+
+        # then:
+        self.assertEqual(('library_preparation_protocol', 2), next(entity_count_tuples))
+        self.assertEqual([('donor_organism', 3), ('cell_suspension', 1)], list(entity_count_tuples))
+
+    def test_submission_summary_to_tsv_files(self):
+        report_file = io.StringIO()
+        scrape_file = io.StringIO()
+
+        # when:
+        TSVSummaryUtil.submission_summary_to_tsv(self.submission_summary, report_file, scrape_file)
+
+        # then:
+        self.assertEqual('entity\tcount\r\nlibrary_preparation_protocol\t2\r\ndonor_organism\t3\r\ncell_suspension\t1\r\n',
+                         report_file.getvalue())
+        self.assertEqual("num_donors\t3\r\norgan\t['brain']\r\n", scrape_file.getvalue())
+
+    def test_summary_rows_as_tsv_lines(self):
+        # when:
+        lines = list(TSVSummaryUtil.tsv_lines(TSVSummaryUtil.summary_rows('submission', 'submission-uuid',
+                                                                          self.submission_summary),
+                                              SUMMARY_ROW_HEADERS))
+
+        # then: one line per row
+        self.assertEqual(['type\tuuid\tkind\tname\tvalue\n',
+                          'submission\tsubmission-uuid\tcount\tlibrary_preparation_protocol\t2\n',
+                          'submission\tsubmission-uuid\tcount\tdonor_organism\t3\n',
+                          'submission\tsubmission-uuid\tcount\tcell_suspension\t1\n',
+                          'submission\tsubmission-uuid\tscrape\tnum_donors\t3\n',
+                          "submission\tsubmission-uuid\tscrape\torgan\t['brain']\n"], lines)
+
+    def test_project_summary_rows(self):
+        project_summary = ProjectSummary().addSubmissionSummary(self.submission_summary)
+
+        # when:
+        rows = list(TSVSummaryUtil.summary_rows('project', 'project-uuid', project_summary))
+
+        # then:
+        self.assertEqual(['count'] * 3, [row[2] for row in rows])
+        self.assertEqual(['project', 'project-uuid', 'count', 'donor_organism', 3], rows[1])
@@ -0,0 +1,155 @@
+import asyncio
+import json
+import threading
+
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import MagicMock
+
+import aiohttp
+from aiohttp.test_utils import TestServer
+
+from benchmarks.stand_in_ingest_api import StandInIngestApi, generate_entities, generate_project, ENTITY_TYPES
+from broker.common.util.json_summary_util import JSONSummaryUtil
+from broker.service.async_ingest_api import AsyncIngestApi
+from broker.service.async_summary_service import AsyncSummaryService
+from broker.service.submission_summary_cache import SubmissionSummaryCache
+from broker.service.summary_service import SummaryService
+from broker.service.exception.cache_miss_exception import CacheMissException
+
+
+class AsyncSummaryServiceTest(IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.stand_in = generate_project(submissions=3, entities=25)
+        self.server = TestServer(self.stand_in.create_app())
+        await self.server.start_server()
+
+        self.session = aiohttp.ClientSession()
+        self.ingest_api = AsyncIngestApi(self.session, str(self.server.make_url('')))
+
+    async def asyncTearDown(self):
+        await self.session.close()
+        await self.server.close()
+
+    async def test_entities_are_paged(self):
+        submission = await self.ingest_api.get_submission_by_uuid('submission-0')
+
+        # when:
+        pages = [page async for page in self.ingest_api.get_entities(submission['_links']['self']['href'],
+                                                                     'biomaterials', 10)]
+
+        # then:
+        self.assertEqual([10, 10, 5], [len(page) for page in pages])
+        self.assertEqual(generate_entities('biomaterials', 25), [entity for page in pages for entity in page])
+
+    async def test_submission_search_link_is_looked_up_once(self):
+        await self.ingest_api.get_submission_by_uuid('submission-0')
+        requests = self.stand_in.requests
+
+        # when:
+        submission = await self.ingest_api.get_submission_by_uuid('submission-1')
+
+        # then:
+        self.assertEqual('submission-1', submission['uuid']['uuid'])
+        self.assertEqual(requests + 1, self.stand_in.requests)
+
+    async def test_submission_summary_matches_threaded_summary(self):
+        submission = await self.ingest_api.get_submission_by_uuid('submission-0')
+        entities = self.stand_in.submissions['submission-0']
+
+        threaded_ingest_api = MagicMock()
+        threaded_ingest_api.getEntities.side_effect = lambda uri, entity_type, page_size: iter(entities[entity_type])
+
+        # when:
+        summary = await AsyncSummaryService(self.ingest_api).summary_for_submission(submission)
+
+        # then:
+        threaded_summary = SummaryService(threaded_ingest_api).summary_for_submission(submission)
+        self.assertEqual(JSONSummaryUtil.encode(threaded_summary), JSONSummaryUtil.encode(summary))
+        self.assertEqual(25, summary.biomaterial_summary.count)
+        donors = [entity for entity in entities['biomaterials']
+                  if entity['content']['describedBy'].endswith('/donor_organism')]
+        self.assertEqual(len(donors), summary.scrape_result['num_donors'])
+
+    async def test_concurrent_submission_summaries_fetch_once(self):
+        summary_service = AsyncSummaryService(self.ingest_api)
+        submission = await self.ingest_api.get_submission_by_uuid('submission-0')
+        requests = self.stand_in.requests
+
+        # when:
+        summaries = await asyncio.gather(*[summary_service.summary_for_submission(submission) for _ in range(5)])
+
+        # then: the submission and one page of each entity type
+        self.assertTrue(all(summary is summaries[0] for summary in summaries))
+        self.assertEqual(requests + 2 * len(ENTITY_TYPES), self.stand_in.requests)
+        self.assertFalse(summary_service.in_flight(('submission', 'submission-0', submission['updateDate'])))
+
+    async def test_summary_store_is_used_off_the_event_loop(self):
+        store_threads = []
+
+        def get(uuid, version=None):
+            store_threads.append(threading.get_ident())
+            raise CacheMissException(uuid)
+
+        store = MagicMock()
+        store.get.side_effect = get
+        store.put.side_effect = lambda *args: store_threads.append(threading.get_ident())
+        summary_service = AsyncSummaryService(self.ingest_api, SubmissionSummaryCache(store=store))
+        submission = await self.ingest_api.get_submission_by_uuid('submission-0')
+
+        # when:
+        await summary_service.summary_for_submission(submission)
+
+        # then: the summary was looked up and written through to the store, neither on the loop's thread
+        self.assertEqual(2, len(store_threads))
+        self.assertNotIn(threading.get_ident(), store_threads)
+
+    async def test_project_summary(self):
+        summary_service = AsyncSummaryService(self.ingest_api)
+        project = await self.ingest_api.get_project_by_uuid('project-uuid')
+
+        # when:
+        summary = await summary_service.summary_for_project(project)
+
+        # then:
+        self.assertEqual(75, summary.biomaterial_summary.count)
+        self.assertEqual(3, len(summary_service.incremental_summary_for_project(project).contributions))
+
+        # when:
+        requests = self.stand_in.requests
+        encoded_summary = await summary_service.encoded_summary_for_project(project)
+
+        # then: only the project's submissions are listed again
+        self.assertEqual(requests + 1, self.stand_in.requests)
+        self.assertEqual(JSONSummaryUtil.encode(summary), encoded_summary.body)
+        # a project summary may change without any submission's update date advancing
+        self.assertIsNone(encoded_summary.last_modified)
+
+    async def test_project_summary_leaves_out_timed_out_submissions(self):
+        slow_stand_in = StandInIngestApi({'submission-0': {}}, {'project-uuid': ['submission-0']})
+        server = TestServer(slow_stand_in.create_app())
+        await server.start_server()
+        ingest_api = AsyncIngestApi(self.session, str(server.make_url('')))
+
+        try:
+            project = await ingest_api.get_project_by_uuid('project-uuid')
+            slow_stand_in.latency = 0.5
+            summary_service = AsyncSummaryService(ingest_api, submission_timeout=0.1)
+
+            # when:
+            summary = await summary_service.summary_for_project(project)
+
+            # then: the summary is marked partial
+            self.assertEqual({}, summary_service.incremental_summary_for_project(project).contributions)
+            self.assertEqual(0, summary.biomaterial_summary.count)
+            self.assertTrue(summary.is_partial)
+            encoded_summary = await summary_service.encoded_summary_for_project(project)
+            self.assertTrue(json.loads(encoded_summary.body)['is_partial'])
+
+            # and: the submission is still summarised in the background, and then makes the summary complete
+            await asyncio.sleep(1.5)
+            self.assertEqual(1, summary_service.submission_summary_cache.stats()['size'])
+            summary = await summary_service.summary_for_project(project)
+            self.assertFalse(summary.is_partial)
+        finally:
+            await server.close()
@@ -0,0 +1,82 @@
+import json
+import threading
+
+from concurrent.futures import ThreadPoolExecutor
+from unittest import TestCase
+from unittest.mock import MagicMock
+
+from broker.common.submission_summary import SubmissionSummary
+from broker.common.util.json_summary_util import EncodedSummary
+from broker.service.batch_summarizer import BatchSummarizer, BatchResult
+from broker.service.submission_summary_cache import SubmissionSummaryCache
+
+
+class BatchSummarizerTest(TestCase):
+
+    def setUp(self):
+        self.executor = ThreadPoolExecutor(max_workers=2)
+        self.summary_service = MagicMock()
+        self.summary_service.submission_summary_cache = SubmissionSummaryCache()
+        self.summary_service.ingestapi.getSubmissionByUuid.side_effect = lambda uuid: {'uuid': {'uuid': uuid}}
+        self.summary_service.ingestapi.getProjectByUuid.side_effect = lambda uuid: {'uuid': {'uuid': uuid}}
+
+    def tearDown(self):
+        self.executor.shutdown()
+
+    def test_cached_summaries_come_first(self):
+        cached_summary = SubmissionSummary()
+        cached_summary.submission_status = 'Valid'
+        self.summary_service.submission_summary_cache.insert('cached-uuid', cached_summary, 'update-date')
+
+        release = threading.Event()
+
+        def encoded_summary_for_submission(submission):
+            release.wait(5)
+            return EncodedSummary('{{"uuid": "{0}"}}'.format(submission['uuid']['uuid']).encode('utf-8'))
+
+        self.summary_service.encoded_summary_for_submission.side_effect = encoded_summary_for_submission
+        self.summary_service.encoded_summary_for_project.return_value = EncodedSummary(b'{"project": true}')
+
+        # when:
+        results = BatchSummarizer(self.summary_service, self.executor).summarize(
+            ['uncached-uuid', 'cached-uuid', 'uncached-uuid'], ['project-uuid'])
+
+        # then: the cached summary doesn't wait for the others
+        first_result = next(results)
+        self.assertEqual('cached-uuid', first_result.uuid)
+        self.assert_summary_status(first_result, 'Valid')
+
+        # when:
+        release.set()
+        rest = list(results)
+
+        # then: each uuid is summarised once, and a cached submission isn't even looked up
+        self.assertEqual({('submission', 'uncached-uuid'), ('project', 'project-uuid')},
+                         {(result.summary_type, result.uuid) for result in rest})
+        self.assertEqual(1, self.summary_service.encoded_summary_for_submission.call_count)
+        self.summary_service.ingestapi.getSubmissionByUuid.assert_called_once_with('uncached-uuid')
+
+    def test_failed_items_are_reported(self):
+        self.summary_service.encoded_summary_for_submission.side_effect = [Exception('404 Client Error')]
+
+        # when:
+        results = list(BatchSummarizer(self.summary_service, self.executor).summarize(['missing-uuid']))
+
+        # then:
+        self.assertEqual(1, len(results))
+        self.assertEqual({'type': 'submission', 'uuid': 'missing-uuid', 'error': '404 Client Error'},
+                         json.loads(results[0].to_ndjson()))
+
+    def test_result_to_ndjson(self):
+        result = BatchResult('project', 'project-uuid', encoded_summary=EncodedSummary(b'{"count": 1}'))
+
+        # when:
+        line = result.to_ndjson()
+
+        # then:
+        self.assertTrue(line.endswith(b'}\n'))
+        self.assertEqual(1, line.count(b'\n'))
+        self.assertEqual({'type': 'project', 'uuid': 'project-uuid', 'summary': {'count': 1}}, json.loads(line))
+
+    def assert_summary_status(self, result, submission_status):
+        self.assertEqual(submission_status, json.loads(result.to_ndjson())['summary']['submission_status'])
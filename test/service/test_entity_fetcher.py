@@ -0,0 +1,49 @@
+from unittest import TestCase
+from time import sleep
+
+from broker.service.entity_fetcher import EntityFetcher, ENTITY_TYPES, prefetch
+
+
+class EntityFetcherTest(TestCase):
+
+    def test_fetch_all_entity_types_concurrently(self):
+        def slow_get_entities(submission_uri, entity_type):
+            for i in range(0, 3):
+                sleep(0.1)
+                yield {'type': entity_type, 'index': i}
+
+        fetcher = EntityFetcher(slow_get_entities, concurrency=5)
+        entities_by_type, timings = fetcher.fetch_all('mock-submission-uri', lambda entity_type, entities: list(entities))
+
+        assert set(entities_by_type.keys()) == set(ENTITY_TYPES)
+        for entity_type in ENTITY_TYPES:
+            assert len(entities_by_type[entity_type]) == 3
+            assert all(entity['type'] == entity_type for entity in entities_by_type[entity_type])
+
+        assert set(timings.per_type.keys()) == set(ENTITY_TYPES)
+        assert timings.wall_clock < timings.summed
+
+    def test_fetch_all_sequentially(self):
+        fetched_types = []
+
+        def get_entities(submission_uri, entity_type):
+            fetched_types.append(entity_type)
+            yield {'type': entity_type}
+
+        fetcher = EntityFetcher(get_entities, concurrency=1)
+        entities_by_type, timings = fetcher.fetch_all('mock-submission-uri', lambda entity_type, entities: list(entities))
+
+        assert fetched_types == ENTITY_TYPES
+        assert len(entities_by_type['files']) == 1
+
+    def test_fetch_error_is_raised_to_caller(self):
+        def failing_get_entities(submission_uri, entity_type):
+            yield {'type': entity_type}
+            raise IOError('connection reset')
+
+        fetcher = EntityFetcher(failing_get_entities, concurrency=5)
+        with self.assertRaises(IOError):
+            fetcher.fetch_all('mock-submission-uri', lambda entity_type, entities: list(entities))
+
+    def test_prefetch_preserves_order(self):
+        assert list(prefetch(iter(range(0, 100)), 10)) == list(range(0, 100))
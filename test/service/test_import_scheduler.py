@@ -0,0 +1,110 @@
+import os
+import threading
+
+from unittest import TestCase
+from unittest.mock import patch
+
+from broker.service.import_scheduler import ImportScheduler
+from broker.service.exception.import_queue_full_exception import ImportQueueFullException
+
+
+def import_in_worker_process(fail):
+    if fail:
+        raise ValueError('Invalid spreadsheet')
+    return os.getpid()
+
+
+class ImportSchedulerTest(TestCase):
+
+    def test_imports_beyond_workers_and_queue_are_turned_away(self):
+        import_scheduler = ImportScheduler(max_workers=1, max_queue=1, retry_after=10)
+        release_imports = threading.Event()
+
+        try:
+            first_import = import_scheduler.submit('submission-1', release_imports.wait)
+            second_import = import_scheduler.submit('submission-2', release_imports.wait)
+
+            with self.assertRaises(ImportQueueFullException) as queue_full:
+                import_scheduler.submit('submission-3', release_imports.wait)
+            assert queue_full.exception.retry_after == 10
+            assert import_scheduler.pending() == 2
+
+            release_imports.set()
+            first_import.result(timeout=5)
+            second_import.result(timeout=5)
+
+            # once done, imports give their places back
+            assert import_scheduler.submit('submission-3', lambda: 'imported').result(timeout=5) == 'imported'
+            assert import_scheduler.pending() == 0
+        finally:
+            release_imports.set()
+            import_scheduler.shutdown()
+
+    def test_cancelled_reservation_gives_its_place_back(self):
+        import_scheduler = ImportScheduler(max_workers=1, max_queue=0)
+
+        reservation = import_scheduler.reserve()
+        with self.assertRaises(ImportQueueFullException):
+            import_scheduler.reserve()
+
+        reservation.cancel()
+        reservation.cancel()
+        assert import_scheduler.pending() == 0
+
+        with self.assertRaises(RuntimeError):
+            reservation.submit('submission-1', lambda: None)
+
+        import_scheduler.reserve().cancel()
+        import_scheduler.shutdown()
+
+    def test_failed_import_gives_its_place_back(self):
+        import_scheduler = ImportScheduler(max_workers=1, max_queue=0)
+
+        def fail():
+            raise ValueError('Invalid spreadsheet')
+
+        failed_import = import_scheduler.submit('submission-1', fail)
+        with self.assertRaises(ValueError):
+            failed_import.result(timeout=5)
+
+        assert import_scheduler.pending() == 0
+        import_scheduler.shutdown()
+
+    def test_imports_in_worker_processes(self):
+        import_scheduler = ImportScheduler(max_workers=1, max_queue=1, use_processes=True)
+
+        try:
+            imported = import_scheduler.submit('submission-1', import_in_worker_process, False)
+            assert imported.result(timeout=60) != os.getpid()
+
+            failed_import = import_scheduler.submit('submission-2', import_in_worker_process, True)
+            with self.assertRaises(ValueError):
+                failed_import.result(timeout=60)
+
+            assert import_scheduler.pending() == 0
+        finally:
+            import_scheduler.shutdown()
+
+    def test_each_process_gets_a_pool_of_its_own(self):
+        import_scheduler = ImportScheduler(max_workers=1, max_queue=1, use_processes=True)
+        parent_pid = os.getpid()
+
+        # then: no pool exists to be inherited before the first import
+        assert import_scheduler._executor is None
+
+        executor = import_scheduler.executor
+        try:
+            assert import_scheduler.executor is executor
+
+            # when: used from a forked worker
+            with patch('broker.service.import_scheduler.os.getpid', return_value=parent_pid + 1):
+                worker_executor = import_scheduler.executor
+                import_scheduler.shutdown()
+
+            # then: the worker's pool is its own, and shutting down in the worker leaves the parent's alone
+            assert worker_executor is not executor
+            with self.assertRaises(RuntimeError):
+                worker_executor.submit(import_in_worker_process, False)
+            assert executor.submit(import_in_worker_process, False).result(timeout=60) != parent_pid
+        finally:
+            executor.shutdown()
@@ -0,0 +1,109 @@
+import time
+
+from unittest import TestCase
+
+from broker.service.import_trace import ImportTrace, ImportTraceHistory, PhaseTrace, TimedCalls
+
+
+class ImportTraceTest(TestCase):
+
+    def test_trace_phases(self):
+        trace = ImportTrace('metadata.xlsx', trace_memory=True)
+
+        with trace.phase('parse'):
+            rows = [list(range(100)) for _ in range(1000)]
+
+        with self.assertRaises(ValueError):
+            with trace.phase('submit'):
+                raise ValueError('Invalid spreadsheet')
+
+        assert [phase.name for phase in trace.phases] == ['parse', 'submit']
+        parse_phase = trace.phases[0]
+        assert parse_phase.wall_time > 0
+        assert parse_phase.cpu_time >= 0
+        assert parse_phase.peak_memory > 100 * 1000
+        assert trace.wall_time == sum(phase.wall_time for phase in trace.phases)
+        assert len(rows) == 1000
+
+    def test_memory_not_traced_unless_asked(self):
+        trace = ImportTrace(trace_memory=False)
+        with trace.phase('save'):
+            pass
+
+        assert trace.phases[0].peak_memory is None
+
+    def test_add_phases_and_to_dict(self):
+        trace = ImportTrace('metadata.xlsx', trace_memory=False)
+        trace.submission_url = 'submission-url'
+        with trace.phase('save'):
+            pass
+
+        worker_trace = ImportTrace(trace_memory=False)
+        worker_trace.row_counts = {'Donor organism': 3, 'Sequence file': 10}
+        worker_trace.entity_count = 13
+        with worker_trace.phase('parse'):
+            pass
+
+        trace.add_phases(worker_trace)
+
+        trace_dict = trace.to_dict()
+        assert [phase['name'] for phase in trace_dict['phases']] == ['save', 'parse']
+        assert trace_dict['row_counts'] == {'Donor organism': 3, 'Sequence file': 10}
+        assert trace_dict['row_count'] == 13
+        assert trace_dict['entity_count'] == 13
+        assert trace_dict['submission_url'] == 'submission-url'
+        assert trace_dict['filename'] == 'metadata.xlsx'
+
+
+    def test_split_phase(self):
+        trace = ImportTrace(trace_memory=False)
+        trace.phases.append(PhaseTrace('parse', 5, 3))
+
+        trace.split_phase('submit', 4, 1)
+
+        assert [(phase.name, phase.wall_time, phase.cpu_time) for phase in trace.phases] == [('parse', 1, 2),
+                                                                                          ('submit', 4, 1)]
+
+
+class TimedCallsTest(TestCase):
+
+    def test_only_calls_with_prefixes_are_timed(self):
+        class Client:
+            url = 'ingest-url'
+
+            def createEntity(self, entity):
+                time.sleep(0.01)
+                return entity
+
+            def getEntity(self, entity):
+                time.sleep(0.2)
+                return entity
+
+        timed_calls = TimedCalls(Client(), ['create', 'link'])
+
+        assert timed_calls.createEntity('biomaterial') == 'biomaterial'
+        assert timed_calls.createEntity('file') == 'file'
+        assert timed_calls.getEntity('project') == 'project'
+        assert timed_calls.url == 'ingest-url'
+
+        assert 0.02 <= timed_calls.wall_time < 0.2
+        assert timed_calls.call_count('create') == 2
+        assert timed_calls.call_count('get') == 0
+
+
+class ImportTraceHistoryTest(TestCase):
+
+    def test_recent_and_slowest(self):
+        history = ImportTraceHistory(max_traces=3)
+
+        traces = []
+        for wall_time in [5, 1, 3, 2]:
+            trace = ImportTrace(trace_memory=False)
+            trace.phases.append(PhaseTrace('parse', wall_time, wall_time))
+            traces.append(trace)
+            history.record(trace)
+
+        # the oldest trace was dropped
+        assert history.recent() == [traces[3], traces[2], traces[1]]
+        assert history.slowest() == [traces[2], traces[3], traces[1]]
+        assert history.slowest(limit=1) == [traces[2]]
@@ -0,0 +1,43 @@
+from unittest import TestCase
+from unittest.mock import patch
+
+from broker.service import ingest_client_factory
+from broker.service.ingest_client_factory import IngestClientFactory
+
+
+class IngestClientFactoryTest(TestCase):
+
+    def test_root_links_are_discovered_once(self):
+        with patch.object(ingest_client_factory, 'IngestApi') as ingest_api:
+            shared_client = ingest_api.return_value
+            shared_client.url = 'http://ingest'
+            shared_client.ingest_api_root = {'submissionEnvelopes': {'href': 'http://ingest/submissionEnvelopes'}}
+
+            ingest_clients = IngestClientFactory('http://ingest')
+
+            assert ingest_clients.client() is shared_client
+            assert ingest_clients.client() is shared_client
+            ingest_api.assert_called_once_with('http://ingest')
+
+            token_client = ingest_clients.client_for_token('token')
+            ingest_api.assert_called_with('http://ingest', ingest_api_root=shared_client.ingest_api_root)
+            token_client.set_token.assert_called_once_with('token')
+
+    def test_failed_discovery_is_retried(self):
+        with patch.object(ingest_client_factory, 'IngestApi') as ingest_api:
+            ingest_api.side_effect = [ConnectionError('Ingest API is down'), ingest_api.return_value]
+
+            ingest_clients = IngestClientFactory()
+
+            with self.assertRaises(ConnectionError):
+                ingest_clients.client()
+            assert ingest_clients.client() is ingest_api.return_value
+
+    def test_reset(self):
+        with patch.object(ingest_client_factory, 'IngestApi') as ingest_api:
+            ingest_clients = IngestClientFactory()
+            ingest_clients.client()
+            ingest_clients.reset()
+            ingest_clients.client()
+
+            assert ingest_api.call_count == 2
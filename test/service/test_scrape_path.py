@@ -0,0 +1,31 @@
+from unittest import TestCase
+from jsonpath_rw import parse
+
+from broker.service.scrape_path import compile_path
+
+
+class ScrapePathTest(TestCase):
+
+    def test_compiled_paths_match_jsonpath(self):
+        documents = [
+            {'organ': {'text': 'heart'}, 'organ_part': [{'text': 'atrium'}]},
+            {'genus_species': [{'text': 'Homo sapiens'}, {'ontology': 'NCBITaxon:9606'}, 'str', [{'text': 'nested'}]]},
+            {'genus_species': {'text': 'Mus musculus'}},
+            {'genus_species': 'Homo sapiens'},
+            {'project_core': {'project_title': None}},
+            {'contributors': [{'contact_name': 'Jane', 'email': 'jane@example.org'}, {'contact_name': 'John'}]},
+            {'total_estimated_cells': 10000},
+            {}
+        ]
+        paths = ['organ.text', 'organ_part.text', 'genus_species[*].text', 'project_core.project_title',
+                 'contributors[*].contact_name', 'contributors[*].email', 'total_estimated_cells']
+
+        for path in paths:
+            compiled_path = compile_path(path)
+            parser = parse(path)
+            for document in documents:
+                assert compiled_path(document) == [match.value for match in parser.find(document)], path
+
+    def test_unsupported_syntax_falls_back_to_jsonpath(self):
+        compiled_path = compile_path('genus_species[0].text')
+        assert compiled_path({'genus_species': [{'text': 'Homo sapiens'}, {'text': 'Mus musculus'}]}) == ['Homo sapiens']
@@ -0,0 +1,66 @@
+from unittest import TestCase
+from threading import Thread, Event
+from time import sleep
+
+from broker.service.single_flight import SingleFlight
+
+
+class SingleFlightTest(TestCase):
+
+    def test_concurrent_calls_share_one_computation(self):
+        single_flight = SingleFlight()
+        calls = []
+        release = Event()
+
+        def compute():
+            calls.append(1)
+            release.wait()
+            return 'mock-summary'
+
+        results = []
+        callers = [Thread(target=lambda: results.append(single_flight.do('mock-uuid', compute))) for i in range(0, 10)]
+        for caller in callers:
+            caller.start()
+
+        while not single_flight.in_flight('mock-uuid'):
+            sleep(0.01)
+        sleep(0.2)
+        release.set()
+
+        for caller in callers:
+            caller.join()
+
+        assert len(calls) == 1
+        assert results == ['mock-summary'] * 10
+        assert not single_flight.in_flight('mock-uuid')
+
+    def test_error_shared_with_waiting_callers(self):
+        single_flight = SingleFlight()
+        release = Event()
+
+        def compute():
+            release.wait()
+            raise IOError('upstream unavailable')
+
+        errors = []
+
+        def call():
+            try:
+                single_flight.do('mock-uuid', compute)
+            except IOError as e:
+                errors.append(e)
+
+        callers = [Thread(target=call) for i in range(0, 3)]
+        for caller in callers:
+            caller.start()
+        sleep(0.2)
+        release.set()
+        for caller in callers:
+            caller.join()
+
+        assert len(errors) == 3
+
+    def test_calls_after_completion_compute_again(self):
+        single_flight = SingleFlight()
+        assert single_flight.do('mock-uuid', lambda: 1) == 1
+        assert single_flight.do('mock-uuid', lambda: 2) == 2
@@ -0,0 +1,98 @@
+import os
+import pickle
+import tempfile
+import time
+
+from unittest import TestCase
+from unittest.mock import patch
+
+import openpyxl
+
+from broker.service import spreadsheet_import
+from broker.service.spreadsheet_import import run_import, count_spreadsheet_rows, FIRST_DATA_ROW
+from broker.service.exception.import_failed_exception import ImportFailedException
+
+
+class UnpicklableError(Exception):
+
+    def __init__(self, http_code, message):
+        super(UnpicklableError, self).__init__(message)
+        self.http_code = http_code
+
+
+def save_spreadsheet(directory, rows_by_worksheet) -> str:
+    workbook = openpyxl.Workbook()
+    workbook.remove(workbook.active)
+    for (title, rows) in rows_by_worksheet.items():
+        worksheet = workbook.create_sheet(title)
+        for (index, row) in enumerate(rows):
+            for (column, value) in enumerate(row, start=1):
+                worksheet.cell(row=FIRST_DATA_ROW + index, column=column, value=value)
+        worksheet.cell(row=1, column=1, value='header')
+
+    path = os.path.join(directory, 'metadata.xlsx')
+    workbook.save(path)
+    return path
+
+
+class SpreadsheetImportTest(TestCase):
+
+    def test_run_import(self):
+        with tempfile.TemporaryDirectory() as directory, \
+                patch.object(spreadsheet_import, 'ingest_clients') as ingest_clients, \
+                patch.object(spreadsheet_import, 'XlsImporter') as xls_importer:
+            path = save_spreadsheet(directory, {'Donor organism': [['donor-1'], ['donor-2'], [None]],
+                                                'Sequence file': [['file-1']]})
+            ingest_api = ingest_clients.client_for_token.return_value
+            ingest_api.createBiomaterial.side_effect = lambda *args: time.sleep(0.05)
+
+            def import_file(path, submission_url, project_uuid):
+                submit_calls = xls_importer.call_args[0][0]
+                for biomaterial in ('donor-1', 'donor-2'):
+                    submit_calls.createBiomaterial(submission_url, biomaterial)
+                submit_calls.linkEntity('donor-1', 'donor-2')
+                submit_calls.getSchemas()
+
+            xls_importer.return_value.import_file.side_effect = import_file
+
+            trace = run_import(path, 'submission-url', 'project-uuid', 'token')
+
+            ingest_clients.client_for_token.assert_called_once_with('token')
+            submit_calls = xls_importer.call_args[0][0]
+            assert submit_calls.target is ingest_api
+            xls_importer.return_value.import_file.assert_called_once_with(path, 'submission-url', 'project-uuid')
+            assert ingest_api.createBiomaterial.call_count == 2
+            ingest_api.linkEntity.assert_called_once_with('donor-1', 'donor-2')
+
+            # the time spent submitting entities is taken out of the parse phase
+            assert [phase.name for phase in trace.phases] == ['count_rows', 'parse', 'submit']
+            (_, parse_phase, submit_phase) = trace.phases
+            assert submit_phase.wall_time >= 0.1
+            assert parse_phase.wall_time < submit_phase.wall_time
+
+            trace_dict = trace.to_dict()
+            assert trace_dict['row_counts'] == {'Donor organism': 2, 'Sequence file': 1}
+            assert trace_dict['row_count'] == 3
+            assert trace_dict['entity_count'] == 2
+
+    def test_count_spreadsheet_rows(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = save_spreadsheet(directory, {'Project': [['project-1']], 'Specimen': [['specimen-1', ''], ['', None],
+                                                                                          [None, 'specimen-3']]})
+
+            assert count_spreadsheet_rows(path) == {'Project': 1, 'Specimen': 2}
+
+    def test_failed_import_raises_picklable_error(self):
+        with patch.object(spreadsheet_import, 'ingest_clients'), \
+                patch.object(spreadsheet_import, 'XlsImporter') as xls_importer:
+            xls_importer.return_value.import_file.side_effect = UnpicklableError(400, 'Invalid spreadsheet')
+
+            with self.assertRaises(ImportFailedException) as import_failed:
+                run_import('/tmp/missing-metadata.xlsx', 'submission-url', None, 'token')
+
+        unpickled_error = pickle.loads(pickle.dumps(import_failed.exception))
+        assert unpickled_error.submission_url == 'submission-url'
+        assert 'Invalid spreadsheet' in unpickled_error.details
+        assert str(unpickled_error) == 'Import into submission-url failed'
+        assert [phase.name for phase in unpickled_error.trace.phases] == ['count_rows', 'parse', 'submit']
+        assert unpickled_error.trace.row_counts == {}
@@ -0,0 +1,80 @@
+import hashlib
+import os
+
+from unittest import TestCase
+
+from broker.service.spreadsheet_storage import SpreadsheetUpload, RecentUploads
+from broker.service.exception.spreadsheet_too_large_exception import SpreadsheetTooLargeException
+
+
+class SpreadsheetUploadTest(TestCase):
+
+    def test_uploads_of_the_same_file_name_do_not_collide(self):
+        first_upload = SpreadsheetUpload('metadata.xlsx')
+        second_upload = SpreadsheetUpload('metadata.xlsx')
+        try:
+            first_upload.write(b'first spreadsheet')
+            second_upload.write(b'second spreadsheet')
+
+            first_path = first_upload.claim()
+            second_path = second_upload.claim()
+
+            assert first_path != second_path
+            assert first_path.endswith('_metadata.xlsx')
+            with open(first_path, 'rb') as first_file:
+                assert first_file.read() == b'first spreadsheet'
+            with open(second_path, 'rb') as second_file:
+                assert second_file.read() == b'second spreadsheet'
+        finally:
+            first_upload.discard()
+            second_upload.discard()
+
+    def test_upload_is_hashed_while_written(self):
+        upload = SpreadsheetUpload('metadata.xlsx')
+        try:
+            upload.write(b'a spread')
+            upload.write(b'sheet')
+
+            assert upload.size == 13
+            assert upload.sha256 == hashlib.sha256(b'a spreadsheet').hexdigest()
+        finally:
+            upload.discard()
+
+    def test_upload_over_max_size_is_discarded(self):
+        upload = SpreadsheetUpload('metadata.xlsx', max_size=10)
+        upload.write(b'0123456789')
+
+        with self.assertRaises(SpreadsheetTooLargeException):
+            upload.write(b'0')
+
+        assert not os.path.exists(upload.path)
+
+    def test_discard_removes_file(self):
+        upload = SpreadsheetUpload('metadata.xlsx')
+        upload.write(b'a spreadsheet')
+        upload.discard()
+
+        assert not os.path.exists(upload.path)
+        upload.discard()
+
+
+class RecentUploadsTest(TestCase):
+
+    def test_register_and_forget(self):
+        recent_uploads = RecentUploads(60)
+        upload_key = ('sha256', 'token', 'project-uuid')
+        assert recent_uploads.get(upload_key) is None
+
+        recent_uploads.register(upload_key, 'submission-url')
+        assert recent_uploads.get(upload_key) == 'submission-url'
+        assert recent_uploads.get(('sha256', 'another-token', 'project-uuid')) is None
+
+        recent_uploads.forget(upload_key)
+        assert recent_uploads.get(upload_key) is None
+
+    def test_disabled(self):
+        recent_uploads = RecentUploads(0)
+        upload_key = ('sha256', 'token', None)
+        recent_uploads.register(upload_key, 'submission-url')
+
+        assert recent_uploads.get(upload_key) is None
@@ -4,6 +4,7 @@ from time import sleep
 from broker.service.submission_summary_cache import SubmissionSummaryCache
 from broker.common.submission_summary import SubmissionSummary
 from broker.service.exception.cache_miss_exception import CacheMissException
+from broker.service.exception.stale_cache_entry_exception import StaleCacheEntryException
 
 TWO_SECONDS = 2
 
@@ -33,3 +34,92 @@ class SubmissionSummaryCacheTest(TestCase):
             assert False
         except CacheMissException:
             pass
+
+    def test_cache_invalidated_by_new_version(self):
+        summary_cache = SubmissionSummaryCache(10)
+
+        mock_submission_uuid = 'mock-submission-uuid'
+        summary_cache.insert(mock_submission_uuid, SubmissionSummary(), 'mock-update-date', 'Valid')
+
+        assert summary_cache.get(mock_submission_uuid, 'mock-update-date')
+
+        with self.assertRaises(CacheMissException):
+            summary_cache.get(mock_submission_uuid, 'mock-later-update-date')
+
+        with self.assertRaises(CacheMissException):
+            summary_cache.get(mock_submission_uuid, 'mock-update-date')
+
+        assert summary_cache.stats() == {'size': 0, 'hits': 1, 'stale_hits': 0, 'store_hits': 0,
+                                        'misses': 2, 'invalidations': 1}
+
+    def test_terminal_submissions_do_not_expire(self):
+        summary_cache = SubmissionSummaryCache(10, TWO_SECONDS)
+
+        summary_cache.insert('complete-submission-uuid', SubmissionSummary(), 'mock-update-date', 'Complete')
+        summary_cache.insert('valid-submission-uuid', SubmissionSummary(), 'mock-update-date', 'Valid')
+
+        sleep(3)
+
+        assert summary_cache.get('complete-submission-uuid', 'mock-update-date')
+        with self.assertRaises(CacheMissException):
+            summary_cache.get('valid-submission-uuid', 'mock-update-date')
+
+    def test_least_recently_used_evicted(self):
+        summary_cache = SubmissionSummaryCache(2)
+
+        summary_cache.insert('first-submission-uuid', SubmissionSummary(), state='Complete')
+        summary_cache.insert('second-submission-uuid', SubmissionSummary(), state='Complete')
+        summary_cache.get('first-submission-uuid')
+        summary_cache.insert('third-submission-uuid', SubmissionSummary(), state='Complete')
+
+        assert summary_cache.get('first-submission-uuid')
+        assert summary_cache.get('third-submission-uuid')
+        with self.assertRaises(CacheMissException):
+            summary_cache.get('second-submission-uuid')
+
+    def test_expired_summary_served_as_stale_within_grace(self):
+        summary_cache = SubmissionSummaryCache(10, 1, stale_grace=TWO_SECONDS)
+
+        mock_submission_summary = SubmissionSummary()
+        summary_cache.insert('mock-submission-uuid', mock_submission_summary, 'mock-update-date', 'Valid')
+
+        sleep(1.5)
+
+        with self.assertRaises(StaleCacheEntryException) as stale_entry:
+            summary_cache.get('mock-submission-uuid', 'mock-update-date')
+        assert stale_entry.exception.summary is mock_submission_summary
+
+        sleep(2)
+
+        try:
+            summary_cache.get('mock-submission-uuid', 'mock-update-date')
+            assert False
+        except StaleCacheEntryException:
+            assert False
+        except CacheMissException:
+            pass
+
+    def test_encoded_summary_is_kept_with_cached_summary(self):
+        summary_cache = SubmissionSummaryCache()
+        submission_summary = SubmissionSummary()
+        summary_cache.insert('submission-uuid', submission_summary, 'update-date-1')
+
+        encode_calls = []
+
+        def encode(summary):
+            encode_calls.append(summary)
+            return b'encoded'
+
+        cached_summary = summary_cache.get('submission-uuid', 'update-date-1')
+        assert summary_cache.encoded('submission-uuid', cached_summary, encode) == b'encoded'
+        assert summary_cache.encoded('submission-uuid', cached_summary, encode) == b'encoded'
+        assert len(encode_calls) == 1
+
+        # a summary other than the cached one, e.g a stale copy, is encoded every time
+        summary_cache.encoded('submission-uuid', SubmissionSummary(), encode)
+        assert len(encode_calls) == 2
+
+        # re-inserting the submission drops the old encoding
+        summary_cache.insert('submission-uuid', SubmissionSummary(), 'update-date-2')
+        summary_cache.encoded('submission-uuid', summary_cache.get('submission-uuid', 'update-date-2'), encode)
+        assert len(encode_calls) == 3
@@ -0,0 +1,100 @@
+from unittest import TestCase
+from multiprocessing import Process
+
+import os
+import tempfile
+import zlib
+
+from broker.service.submission_summary_store import SubmissionSummaryStore
+from broker.service.submission_summary_cache import SubmissionSummaryCache
+from broker.common.submission_summary import SubmissionSummary
+from broker.service.exception.cache_miss_exception import CacheMissException
+
+
+def _insert_summary(store_path, uuid, file_count):
+    submission_summary = SubmissionSummary()
+    submission_summary.file_summary.count = file_count
+    SubmissionSummaryCache(store=SubmissionSummaryStore(store_path)).insert(uuid, submission_summary,
+                                                                            'mock-update-date', 'Complete')
+
+
+class SubmissionSummaryStoreTest(TestCase):
+
+    def setUp(self):
+        self.store_dir = tempfile.TemporaryDirectory()
+        self.store_path = os.path.join(self.store_dir.name, 'summaries.db')
+
+    def tearDown(self):
+        self.store_dir.cleanup()
+
+    def test_summary_survives_restart(self):
+        submission_summary = SubmissionSummary()
+        submission_summary.file_summary.breakdown['sequence_file'] = {'count': 20}
+        submission_summary.file_summary.count = 20
+        submission_summary.scrape_result = {'num_fastqs': 20}
+
+        SubmissionSummaryCache(store=SubmissionSummaryStore(self.store_path)).insert('mock-submission-uuid',
+                                                                                     submission_summary,
+                                                                                     'mock-update-date', 'Complete')
+
+        restarted_cache = SubmissionSummaryCache(store=SubmissionSummaryStore(self.store_path))
+        stored_summary = restarted_cache.get('mock-submission-uuid', 'mock-update-date')
+
+        assert stored_summary.file_summary.count == 20
+        assert stored_summary.file_summary.breakdown['sequence_file']['count'] == 20
+        assert stored_summary.scrape_result == {'num_fastqs': 20}
+        assert restarted_cache.stats()['store_hits'] == 1
+
+        restarted_cache.get('mock-submission-uuid', 'mock-update-date')
+        assert restarted_cache.stats()['hits'] == 1
+
+    def test_stored_summary_invalidated_by_new_version(self):
+        store = SubmissionSummaryStore(self.store_path, compress=False)
+        store.put('mock-submission-uuid', SubmissionSummary(), 'mock-update-date')
+
+        with self.assertRaises(CacheMissException):
+            store.get('mock-submission-uuid', 'mock-later-update-date')
+
+        with self.assertRaises(CacheMissException):
+            store.get('mock-submission-uuid')
+
+    def test_unreadable_summary_is_deleted_and_missed(self):
+        _insert_summary(self.store_path, 'mock-submission-uuid', 20)
+        _insert_summary(self.store_path, 'another-submission-uuid', 20)
+
+        store = SubmissionSummaryStore(self.store_path)
+        store._connection().execute("UPDATE submission_summary SET summary = X'00' WHERE uuid = 'mock-submission-uuid'")
+        store.put('another-submission-uuid', SubmissionSummary(), 'mock-update-date')
+        store._connection().execute("UPDATE submission_summary SET summary = ? WHERE uuid = 'another-submission-uuid'",
+                                    (zlib.compress(b'\x80\x04c__main__\nMissingSummary\n.'),))
+
+        for uuid in ('mock-submission-uuid', 'another-submission-uuid'):
+            restarted_cache = SubmissionSummaryCache(store=SubmissionSummaryStore(self.store_path))
+            with self.assertRaises(CacheMissException):
+                restarted_cache.get(uuid, 'mock-update-date')
+
+            # the row is gone, so that the summary is computed and stored again
+            row = store._connection().execute('SELECT * FROM submission_summary WHERE uuid = ?', (uuid,)).fetchone()
+            assert row is None
+
+    def test_expired_summary_not_served(self):
+        store = SubmissionSummaryStore(self.store_path)
+        store.put('mock-submission-uuid', SubmissionSummary(), 'mock-update-date', expires_at=0)
+
+        with self.assertRaises(CacheMissException):
+            store.get('mock-submission-uuid', 'mock-update-date')
+
+    def test_shared_between_processes(self):
+        SubmissionSummaryStore(self.store_path)
+
+        writers = [Process(target=_insert_summary, args=(self.store_path, 'mock-submission-uuid-{0}'.format(i), i))
+                   for i in range(0, 4)]
+        for writer in writers:
+            writer.start()
+        for writer in writers:
+            writer.join()
+
+        store = SubmissionSummaryStore(self.store_path)
+        for i in range(0, 4):
+            (stored_summary, _, _) = store.get('mock-submission-uuid-{0}'.format(i), 'mock-update-date')
+            assert stored_summary.file_summary.count == i
@@ -0,0 +1,181 @@
+import asyncio
+import json
+import threading
+
+from unittest import TestCase, IsolatedAsyncioTestCase
+
+from broker.service.submission_watcher import SubmissionWatcherHub, SubmissionState, Subscription, SubmissionEvent, \
+    AsyncSubmissionWatcherHub
+
+
+def file_resource(url, validation_state):
+    return {'_links': {'self': {'href': url}}, 'uuid': {'uuid': url + '-uuid'}, 'fileName': url + '.fastq.gz',
+            'validationState': validation_state}
+
+
+def files_response(*files):
+    return {'_embedded': {'files': list(files)}, 'page': {'totalElements': len(files)}}
+
+
+class SubmissionStateTest(TestCase):
+
+    def test_only_changes_are_reported(self):
+        state = SubmissionState()
+        submission_envelope = {'submissionState': 'Draft', 'updateDate': 'update-date-1', '_links': {}}
+
+        assert state.update_submission(submission_envelope) == {'submissionState': 'Draft',
+                                                                'updateDate': 'update-date-1', '_links': {}}
+        assert state.update_submission(submission_envelope) is None
+
+        submission_envelope = {'submissionState': 'Valid', 'updateDate': 'update-date-2',
+                               '_links': {'submit': {'href': 'submit-url'}}}
+        assert state.update_submission(submission_envelope)['_links'] == {'submit': {'href': 'submit-url'}}
+
+        files_delta = state.update_files(files_response(file_resource('file-1', 'Draft'),
+                                                        file_resource('file-2', 'Draft')))
+        assert [file_summary['url'] for file_summary in files_delta['changed']] == ['file-1', 'file-2']
+        assert state.update_files(files_response(file_resource('file-1', 'Draft'),
+                                                 file_resource('file-2', 'Draft'))) is None
+
+        files_delta = state.update_files(files_response(file_resource('file-1', 'Valid')))
+        assert [file_summary['validationState'] for file_summary in files_delta['changed']] == ['Valid']
+        assert files_delta['removed'] == ['file-2']
+        assert files_delta['page'] == {'totalElements': 1}
+
+        assert [event.name for event in state.snapshot()] == ['submission', 'files']
+
+
+class SubscriptionTest(TestCase):
+
+    def test_subscriber_falling_behind_loses_oldest_events(self):
+        subscription = Subscription('submission-id', max_pending_events=2)
+        for index in range(3):
+            subscription.publish(SubmissionEvent('submission', index))
+
+        assert subscription.next_event(timeout=0).data == 1
+        assert subscription.next_event(timeout=0).data == 2
+        assert subscription.next_event(timeout=0) is None
+
+    def test_event_to_sse(self):
+        event = SubmissionEvent('submission', {'submissionState': 'Valid'})
+        assert event.to_sse() == 'event: submission\ndata: {"submissionState": "Valid"}\n\n'
+
+
+class SubmissionWatcherHubTest(TestCase):
+
+    def test_one_poller_per_submission(self):
+        submission_polls = []
+        polled = threading.Event()
+        submission_envelope = {'submissionState': 'Draft', 'updateDate': 'update-date-1', '_links': {}}
+
+        def fetch_submission(submission_id):
+            submission_polls.append(submission_id)
+            polled.set()
+            return submission_envelope
+
+        hub = SubmissionWatcherHub(fetch_submission,
+                                   lambda submission_id: files_response(file_resource('file-1', 'Draft')),
+                                   poll_interval=60)
+
+        first_subscription = hub.subscribe('submission-id')
+        second_subscription = hub.subscribe('submission-id')
+
+        for subscription in (first_subscription, second_subscription):
+            assert subscription.next_event(timeout=5).name == 'submission'
+            files_event = subscription.next_event(timeout=5)
+            assert files_event.name == 'files'
+            assert json.loads(files_event.to_sse().split('data: ')[1])['changed'][0]['url'] == 'file-1'
+
+        assert polled.wait(5)
+        assert submission_polls == ['submission-id']
+
+        # a late subscriber is brought up to date without polling again
+        late_subscription = hub.subscribe('submission-id')
+        assert late_subscription.next_event(timeout=0).data['submissionState'] == 'Draft'
+        assert late_subscription.next_event(timeout=0).name == 'files'
+        assert submission_polls == ['submission-id']
+
+        # only changes are published
+        submission_envelope = {'submissionState': 'Valid', 'updateDate': 'update-date-2', '_links': {}}
+        hub.poll(hub._watchers['submission-id'])
+        assert first_subscription.next_event(timeout=0).data['submissionState'] == 'Valid'
+        assert first_subscription.next_event(timeout=0) is None
+
+        for subscription in (first_subscription, second_subscription, late_subscription):
+            hub.unsubscribe(subscription)
+        assert hub.watched() == []
+
+    def test_close_ends_subscriptions(self):
+        hub = SubmissionWatcherHub(lambda submission_id: None, lambda submission_id: None, poll_interval=60)
+        subscription = hub.subscribe('submission-id')
+        next_events = []
+
+        waiter = threading.Thread(target=lambda: next_events.append(subscription.next_event(timeout=30)))
+        waiter.start()
+
+        # when:
+        hub.close()
+        waiter.join(5)
+
+        # then:
+        assert not waiter.is_alive()
+        assert next_events == [None]
+        assert subscription.closed
+        assert hub.watched() == []
+
+
+class AsyncSubmissionWatcherHubTest(IsolatedAsyncioTestCase):
+
+    async def test_one_polling_task_per_submission(self):
+        submission_polls = []
+        submission_envelope = {'submissionState': 'Draft', 'updateDate': 'update-date-1', '_links': {}}
+
+        async def fetch_submission(submission_id):
+            submission_polls.append(submission_id)
+            return submission_envelope
+
+        async def fetch_files(submission_id):
+            return files_response(file_resource('file-1', 'Draft'))
+
+        hub = AsyncSubmissionWatcherHub(fetch_submission, fetch_files, poll_interval=60)
+
+        first_subscription = hub.subscribe('submission-id')
+        second_subscription = hub.subscribe('submission-id')
+        assert hub.subscriber_count() == 2
+
+        for subscription in (first_subscription, second_subscription):
+            assert (await subscription.next_event(timeout=5)).name == 'submission'
+            assert (await subscription.next_event(timeout=5)).name == 'files'
+        assert submission_polls == ['submission-id']
+
+        # only changes are published
+        submission_envelope = {'submissionState': 'Valid', 'updateDate': 'update-date-2', '_links': {}}
+        await hub.poll(hub._watchers['submission-id'])
+        assert (await first_subscription.next_event(timeout=0.1)).data['submissionState'] == 'Valid'
+        assert await first_subscription.next_event(timeout=0.1) is None
+
+        # the polling task is cancelled once nobody is watching
+        task = hub._watchers['submission-id'].task
+        hub.unsubscribe(first_subscription)
+        hub.unsubscribe(second_subscription)
+        await asyncio.sleep(0)
+        assert task.cancelled()
+        assert hub.watched() == []
+        assert hub.subscriber_count() == 0
+
+    async def test_close_ends_subscriptions(self):
+        async def fetch_nothing(submission_id):
+            return None
+
+        hub = AsyncSubmissionWatcherHub(fetch_nothing, fetch_nothing, poll_interval=60)
+        subscription = hub.subscribe('submission-id')
+        next_event = asyncio.ensure_future(subscription.next_event(timeout=30))
+        await asyncio.sleep(0)
+
+        # when:
+        hub.close()
+
+        # then:
+        assert await asyncio.wait_for(next_event, 5) is None
+        assert subscription.closed
+        assert hub.watched() == []
@@ -0,0 +1,27 @@
+from unittest import TestCase
+from threading import Event
+
+from broker.service.summary_refresher import SummaryRefresher
+
+
+class SummaryRefresherTest(TestCase):
+
+    def test_refreshes_deduplicated_and_bounded(self):
+        summary_refresher = SummaryRefresher(max_workers=1, max_pending=2)
+        release = Event()
+        refreshed = []
+
+        def refresh(key):
+            release.wait()
+            refreshed.append(key)
+
+        assert summary_refresher.refresh('first-uuid', refresh, 'first-uuid')
+        assert not summary_refresher.refresh('first-uuid', refresh, 'first-uuid')
+        assert summary_refresher.refresh('second-uuid', refresh, 'second-uuid')
+        assert not summary_refresher.refresh('third-uuid', refresh, 'third-uuid')
+
+        release.set()
+        summary_refresher.shutdown()
+
+        assert sorted(refreshed) == ['first-uuid', 'second-uuid']
+        assert summary_refresher.pending() == 0
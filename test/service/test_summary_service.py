@@ -1,9 +1,16 @@
 from unittest import TestCase
 from unittest.mock import patch
-from time import sleep
+from time import sleep, time
+from threading import Thread
 
-from broker.service.summary_service import SummaryService
+import json
+import os
+import tempfile
+
+from broker.service.summary_service import SummaryService, SubmissionScraper, SubmissionSummaryBuilder, \
+    SubmissionEntities
 from broker.service.submission_summary_cache import SubmissionSummaryCache
+from broker.common.submission_summary import SubmissionSummary
 
 class SummaryServiceTest(TestCase):
 
@@ -113,6 +120,121 @@ class SummaryServiceTest(TestCase):
                 assert project_summary.protocol_summary.count == 100  # ...
                 assert project_summary.biomaterial_summary.count == 100  # ...
 
+    def test_generate_project_summary_leaves_out_timed_out_submissions(self):
+        summary_service = SummaryService(patch('__main__.IngestApi'), project_concurrency=4, submission_timeout=0.5)
+        slow_submission_uuid = 'ffffffff-ffff-ffff-ffff-fffffffffff0'
+
+        with patch('broker.service.summary_service.SummaryService.get_submissions_in_project') as mock_get_project_submissions:
+            mock_get_project_submissions.return_value = self.generate_mock_submissions_in_project(5)
+
+            with patch('broker.service.summary_service.SummaryService.summary_for_submission') as mock_summary_for_submission:
+                def summary_for_submission_mock(submission_resource):
+                    if submission_resource['uuid']['uuid'] == slow_submission_uuid:
+                        sleep(2)
+
+                    submission_summary = SubmissionSummary()
+                    submission_summary.file_summary.count = 10
+                    return submission_summary
+
+                mock_summary_for_submission.side_effect = summary_for_submission_mock
+
+                start = time()
+                project_summary = summary_service.summary_for_project(dict())
+
+                assert time() - start < 1.5
+                assert project_summary.file_summary.count == 40  # the slow submission is left out
+                assert project_summary.is_partial
+                assert project_summary.to_dict()['is_partial']
+
+    def test_project_summary_only_resummarises_changed_submissions(self):
+        summary_service = SummaryService(patch('__main__.IngestApi'))
+        mock_project_resource = {'uuid': {'uuid': 'mock-project-uuid'}}
+        mock_submissions = list(self.generate_mock_submissions_in_project(3))
+
+        with patch('broker.service.summary_service.SummaryService.get_submissions_in_project') as mock_get_project_submissions:
+            mock_get_project_submissions.side_effect = lambda *args: iter(mock_submissions)
+
+            with patch('broker.service.summary_service.SummaryService.summary_for_submission') as mock_summary_for_submission:
+                def summary_for_submission_mock(submission_resource):
+                    submission_summary = SubmissionSummary()
+                    submission_summary.file_summary.breakdown['specific-file'] = {'count': 10}
+                    submission_summary.file_summary.count = 10
+                    return submission_summary
+
+                mock_summary_for_submission.side_effect = summary_for_submission_mock
+
+                project_summary = summary_service.summary_for_project(mock_project_resource)
+                assert project_summary.file_summary.count == 30
+                assert mock_summary_for_submission.call_count == 3
+
+                mock_submissions[0]['updateDate'] = 'mock-later-update-date'
+                project_summary = summary_service.summary_for_project(mock_project_resource)
+                assert project_summary.file_summary.count == 30
+                assert mock_summary_for_submission.call_count == 4
+
+                del mock_submissions[1]
+                project_summary = summary_service.summary_for_project(mock_project_resource)
+                assert project_summary.file_summary.count == 20
+                assert project_summary.file_summary.breakdown['specific-file']['count'] == 20
+                assert mock_summary_for_submission.call_count == 4
+
+    def test_concurrent_submission_summaries_fetch_once(self):
+        summary_service = SummaryService(patch('__main__.IngestApi'))
+        mock_submission = next(self.generate_mock_submissions_in_project(1))
+
+        with patch('broker.service.summary_service.SummaryService.get_entities_in_submission') as mock_get_entities:
+            def get_entities_in_submission_mock(*args, **kwargs):
+                sleep(0.5)
+                yield from self.generate_mock_entities(10, 'specific-type')
+
+            mock_get_entities.side_effect = get_entities_in_submission_mock
+
+            summaries = []
+            requests = [Thread(target=lambda: summaries.append(summary_service.summary_for_submission(mock_submission)))
+                        for i in range(0, 10)]
+            for request in requests:
+                request.start()
+            for request in requests:
+                request.join()
+
+            assert mock_get_entities.call_count == 5  # once for each entity type
+            assert len(summaries) == 10
+            assert all(summary is summaries[0] for summary in summaries)
+
+    def test_stale_summary_served_while_refreshed(self):
+        summary_cache = SubmissionSummaryCache(10, 1, stale_grace=10)
+        summary_service = SummaryService(patch('__main__.IngestApi'), summary_cache)
+        mock_submission = next(self.generate_mock_submissions_in_project(1))
+
+        with patch('broker.service.summary_service.SummaryService.get_entities_in_submission') as mock_get_entities:
+            mock_get_entities.side_effect = lambda *args: self.generate_mock_entities(10, 'specific-type')
+
+            submission_summary = summary_service.summary_for_submission(mock_submission)
+            assert not submission_summary.is_stale
+            assert mock_get_entities.call_count == 5
+
+            sleep(1.5)
+
+            def slow_get_entities_in_submission_mock(*args, **kwargs):
+                sleep(0.5)
+                yield from self.generate_mock_entities(20, 'specific-type')
+
+            mock_get_entities.side_effect = slow_get_entities_in_submission_mock
+
+            start = time()
+            stale_summary = summary_service.summary_for_submission(mock_submission)
+            assert time() - start < 0.5
+            assert stale_summary.is_stale
+            assert stale_summary.file_summary.count == 10
+            assert not submission_summary.is_stale  # the cached summary isn't marked
+
+            sleep(1.5)
+
+            refreshed_summary = summary_service.summary_for_submission(mock_submission)
+            assert not refreshed_summary.is_stale
+            assert refreshed_summary.file_summary.count == 20
+            assert mock_get_entities.call_count == 10
+
     def test_generates_summary_when_cache_expire(self):
         mock_ingest_api = patch('__main__.IngestApi')
         mock_project_resource = dict()
@@ -142,6 +264,78 @@ class SummaryServiceTest(TestCase):
                 summary_service.summary_for_project(mock_project_resource)
                 assert mock_get_entities.call_count == 100  # assert 50 more calls after cache expiry
 
+    def test_stream_submission_summary_in_single_pass(self):
+        summary_service = SummaryService(patch('__main__.IngestApi'))
+        submission_scraper = SubmissionScraper([
+            SubmissionScraper.Directive('num_donors', 'biomaterial', 'reanimated_donor', [],
+                                        SubmissionScraper.reducer_for('count'), 'count'),
+            SubmissionScraper.Directive('num_cells', 'biomaterial', None, ['total_estimated_cells'],
+                                        SubmissionScraper.reducer_for('sum'), 'sum')
+        ])
+
+        with patch('broker.service.summary_service.SummaryService.get_entities_in_submission') as mock_get_entities_in_submission:
+            def get_entities_in_submission_mock(*args, **kwargs):
+                if args[1] == 'biomaterials':
+                    for entity in self.generate_mock_entities(10, 'reanimated_donor'):
+                        entity['content']['total_estimated_cells'] = 5
+                        yield entity
+                    yield from self.generate_mock_entities(3, 'cell_suspension')
+
+            mock_get_entities_in_submission.side_effect = get_entities_in_submission_mock
+
+            submission_summary = summary_service.stream_submission_summary('mock-envelope-uri', submission_scraper)
+
+            assert submission_summary.biomaterial_summary.count == 13
+            assert submission_summary.biomaterial_summary.breakdown['reanimated_donor']['count'] == 10
+            assert submission_summary.biomaterial_summary.breakdown['cell_suspension']['count'] == 3
+            assert submission_summary.file_summary.count == 0
+            assert submission_summary.scrape_result == {'num_donors': 10, 'num_cells': 50}
+
+    def test_scrape_matches_batch_and_streamed_entities(self):
+        submission_scraper = SubmissionScraper([
+            SubmissionScraper.Directive('cell_type', 'biomaterial', 'cell_suspension', ['selected_cell_type[*].text'],
+                                        SubmissionScraper.reducer_for('unique'), 'unique'),
+            SubmissionScraper.Directive('num_fastqs', 'file', 'sequence_file', [],
+                                        SubmissionScraper.reducer_for('count'), 'count')
+        ])
+        biomaterials = list(self.generate_mock_entities(4, 'cell_suspension'))
+        for (index, biomaterial) in enumerate(biomaterials):
+            biomaterial['content']['selected_cell_type'] = [{'text': 'cell-type-{0}'.format(index % 2)}]
+        files = list(self.generate_mock_entities(7, 'sequence_file'))
+
+        summary_builder = SubmissionSummaryBuilder(submission_scraper)
+        summary_builder.add_entities('biomaterials', iter(biomaterials))
+        summary_builder.add_entities('files', iter(files))
+        streamed_result = summary_builder.build().scrape_result
+
+        batch_result = submission_scraper.scrape(SubmissionEntities(biomaterials=biomaterials, files=files))
+
+        assert sorted(batch_result['cell_type']) == sorted(streamed_result['cell_type'])
+        assert batch_result['num_fastqs'] == streamed_result['num_fastqs']
+        assert sorted(streamed_result['cell_type']) == ['cell-type-0', 'cell-type-1']
+        assert streamed_result['num_fastqs'] == 7
+
+    def test_scraper_from_file_reloaded_only_when_changed(self):
+        config = {'configs': [{'placeholder': 'num_donors', 'entity_type': 'biomaterial', 'identifier': 'donor',
+                               'paths': [], 'post_process': 'count'}]}
+
+        with tempfile.TemporaryDirectory() as config_dir:
+            config_path = os.path.join(config_dir, 'scrape_config.json')
+            with open(config_path, 'w') as config_file:
+                json.dump(config, config_file)
+
+            submission_scraper = SubmissionScraper.from_file(config_path)
+            assert SubmissionScraper.from_file(config_path) is submission_scraper
+
+            config['configs'][0]['placeholder'] = 'num_donor_organisms'
+            with open(config_path, 'w') as config_file:
+                json.dump(config, config_file)
+            os.utime(config_path, ns=(0, 0))
+
+            reloaded_scraper = SubmissionScraper.from_file(config_path)
+            assert reloaded_scraper is not submission_scraper
+            assert reloaded_scraper.directives[0].placeholder == 'num_donor_organisms'
+
     @staticmethod
     def generate_mock_submissions_in_project(count):
         if not (1 <= count <= 10):
@@ -0,0 +1,58 @@
+import io
+import json
+
+from unittest import TestCase
+from unittest.mock import patch
+
+import generate_summary
+from broker.common.submission_summary import SubmissionSummary
+from broker.common.util.json_summary_util import EncodedSummary
+
+SUBMISSION_UUIDS = ['0b5f5c4e-1a3e-4f7a-9c2d-000000000000', '0b5f5c4e-1a3e-4f7a-9c2d-000000000001']
+
+
+class GenerateSummaryTest(TestCase):
+
+    def test_read_uuids(self):
+        lines = io.StringIO('# submissions\n{0}\n\n  {1}  \n'.format(*SUBMISSION_UUIDS))
+
+        self.assertEqual(SUBMISSION_UUIDS, list(generate_summary.read_uuids(lines)))
+
+    def test_bulk_summaries(self):
+        submission_summary = SubmissionSummary()
+        submission_summary.biomaterial_summary.add_entity('donor_organism', 2)
+        submission_summary.scrape_result = {'num_donors': 2}
+
+        with patch.object(generate_summary, 'IngestApi') as ingest_api, \
+                patch.object(generate_summary.SummaryService, 'summary_for_submission') as summary_for_submission, \
+                patch.object(generate_summary.SummaryService, 'encoded_summary_for_submission'):
+            ingest_api.return_value.getSubmissionByUuid.side_effect = lambda uuid: {'uuid': {'uuid': uuid}}
+            summary_for_submission.side_effect = [submission_summary, Exception('404 Client Error')]
+            output = io.StringIO()
+
+            # when:
+            failures = generate_summary.generate_bulk_summaries('http://ingest', 'submission', SUBMISSION_UUIDS,
+                                                                'tsv', output, workers=1)
+
+        # then:
+        self.assertEqual(1, failures)
+        self.assertEqual(['type\tuuid\tkind\tname\tvalue',
+                          'submission\t{0}\tcount\tdonor_organism\t2'.format(SUBMISSION_UUIDS[0]),
+                          'submission\t{0}\tscrape\tnum_donors\t2'.format(SUBMISSION_UUIDS[0])],
+                         output.getvalue().splitlines())
+
+    def test_bulk_summaries_as_json_lines(self):
+        with patch.object(generate_summary, 'IngestApi') as ingest_api, \
+                patch.object(generate_summary.SummaryService, 'encoded_summary_for_submission') as encoded_summary:
+            ingest_api.return_value.getSubmissionByUuid.side_effect = lambda uuid: {'uuid': {'uuid': uuid}}
+            encoded_summary.return_value = EncodedSummary(b'{}')
+            output = io.StringIO()
+
+            # when:
+            failures = generate_summary.generate_bulk_summaries('http://ingest', 'submission', SUBMISSION_UUIDS,
+                                                                'json', output)
+
+        # then:
+        self.assertEqual(0, failures)
+        self.assertEqual(set(SUBMISSION_UUIDS),
+                         {json.loads(line)['uuid'] for line in output.getvalue().splitlines()})